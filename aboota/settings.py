@@ -80,6 +80,7 @@ INSTALLED_APPS = [
     "home",
     'kyc',
     'cryptopay',
+    'api',
 ]
 
 
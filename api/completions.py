@@ -0,0 +1,45 @@
+"""Per user done sets and cached catalogs for the task and game lists.
+
+The mobile app polls the task and game lists all the time. What a user has
+done is read with one query into a set on every request, as completed tasks
+are written from several places and the cache is per process, and the static
+part of each list is built once and shared by every user of the process.
+
+Catalogs are only invalidated by ``CACHE_SECONDS``: tasks and games are edited
+outside this app, so a new or deactivated task or game shows up in the lists
+within five minutes rather than immediately.
+"""
+from django.core.cache import cache
+from django.utils.crypto import get_random_string
+
+# Longest a cached catalog is trusted.
+CACHE_SECONDS = 300
+
+TASKS = 'tasks'
+GAMES = 'games'
+
+
+def done(username, load):
+    """Set of what ``username`` has done; ``load(username)`` returns the keys
+    from the database in one query."""
+    return frozenset(str(value) for value in load(username))
+
+
+def catalog(kind, build):
+    """``build()``, the serialized active catalog, cached for ``CACHE_SECONDS``."""
+    key = 'api:{}:catalog'.format(kind)
+    items = cache.get(key)
+    if items is None:
+        items = build()
+        cache.set(key, items, CACHE_SECONDS)
+    return items
+
+
+def unique_ids(count, taken):
+    """``count`` new random ids none of which ``taken(ids)`` reports used,
+    checked with one query per round instead of one per id."""
+    ids = set()
+    while len(ids) < count:
+        fresh = {get_random_string() for _ in range(count - len(ids))} - ids
+        ids |= fresh - set(taken(fresh))
+    return list(ids)
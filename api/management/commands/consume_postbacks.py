@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api import postbacks
+from api.views import record_postbacks
+
+
+class Command(BaseCommand):
+    help = "Apply the queued ad network postbacks in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=postbacks.BATCH_SIZE)
+        parser.add_argument('--forever', action='store_true', help="Keep polling the queue instead of stopping when it is empty")
+        parser.add_argument('--idle-seconds', type=float, default=1.0)
+        parser.add_argument('--requeue-failed', action='store_true',
+                            help="Retry the postbacks given up on after {} failures".format(postbacks.MAX_ATTEMPTS))
+
+    def handle(self, *args, **options):
+        if options['requeue_failed']:
+            self.stdout.write('{} failed postbacks requeued'.format(postbacks.requeue_failed()))
+        applied, failed = postbacks.consume(record_postbacks, options['batch_size'], options['idle_seconds'],
+                                            options['forever'], self.stdout)
+        self.stdout.write('done: {} postbacks applied, {} failed, {} given up on'.format(
+            applied, failed, postbacks.failed().count()))
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostbackEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unid', models.CharField(max_length=255, unique=True)),
+                ('task', models.CharField(max_length=255)),
+                ('ip', models.CharField(max_length=255)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed', models.BooleanField(db_index=True, default=False)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -1,3 +1,18 @@
 from django.db import models
 
-# Create your models here.
+
+class PostbackEvent(models.Model):
+    """An ad network callback as received, applied later by ``api.postbacks.consume``."""
+    unid = models.CharField(max_length=255, unique=True)
+    task = models.CharField(max_length=255)
+    ip = models.CharField(max_length=255)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed = models.BooleanField(default=False, db_index=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # failed attempts to apply the event, the last error and when to try again
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    retry_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.unid
@@ -0,0 +1,110 @@
+"""Ad network postbacks: received into a queue table, applied in batches.
+
+The networks retry hard, so the request only appends the raw callback to
+PostbackEvent and answers; a callback whose ``unid`` is already queued is
+dropped there. ``consume`` later applies the queued events a batch at a time.
+
+An event that cannot be applied stays in the queue with its ``error`` and is
+retried after a growing delay; after ``MAX_ATTEMPTS`` failures it is left
+aside until requeued with ``consume_postbacks --requeue-failed``.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PostbackEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+# Failed events are retried after RETRY_SECONDS, doubled on each further
+# failure, and given up on after MAX_ATTEMPTS (about four hours in all).
+RETRY_SECONDS = 60
+MAX_ATTEMPTS = 8
+
+
+def receive(task, ip, unid):
+    """Queue one callback; repeats of a queued ``unid`` are ignored."""
+    PostbackEvent.objects.bulk_create([PostbackEvent(task=task, ip=ip, unid=unid)], ignore_conflicts=True)
+
+
+def pending(now=None):
+    """Events due to be applied: not processed, not given up on, and past
+    their retry time."""
+    now = now or timezone.now()
+    return PostbackEvent.objects.filter(processed=False, attempts__lt=MAX_ATTEMPTS).filter(
+        Q(retry_at__isnull=True) | Q(retry_at__lte=now))
+
+
+def failed():
+    """Events given up on after ``MAX_ATTEMPTS`` failures."""
+    return PostbackEvent.objects.filter(processed=False, attempts__gte=MAX_ATTEMPTS)
+
+
+def requeue_failed():
+    """Give the events given up on a fresh set of attempts. Returns how many."""
+    return failed().update(attempts=0, retry_at=None)
+
+
+def consume_batch(apply, batch_size=BATCH_SIZE):
+    """Hand the oldest due events to ``apply(events)`` and mark them
+    processed, in one transaction. Returns ``(applied, failed)`` counts.
+
+    Rows are locked with SKIP LOCKED so several consumers can run at once. If
+    the batch fails, its events are applied one by one; those that still fail
+    stay unprocessed with their error and a later ``retry_at``.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        events = list(pending(now).select_for_update(skip_locked=True).order_by('pk')[:batch_size])
+        errors = _apply(apply, events) if events else {}
+        PostbackEvent.objects.filter(pk__in=[event.pk for event in events if event.pk not in errors]).update(
+            processed=True, processed_at=now, error='')
+        for event in events:
+            if event.pk in errors:
+                attempts = event.attempts + 1
+                PostbackEvent.objects.filter(pk=event.pk).update(
+                    attempts=attempts, error=errors[event.pk],
+                    retry_at=now + timedelta(seconds=RETRY_SECONDS * 2 ** (attempts - 1)))
+                if attempts >= MAX_ATTEMPTS:
+                    logger.error('postback %s failed %s times, giving up', event.unid, attempts)
+    return len(events) - len(errors), len(errors)
+
+
+def _apply(apply, events):
+    """Errors by event pk; when the batch fails each event gets its own savepoint."""
+    try:
+        with transaction.atomic():
+            apply(events)
+        return {}
+    except Exception as err:
+        if len(events) > 1:
+            errors = {}
+            for event in events:
+                errors.update(_apply(apply, [event]))
+            return errors
+        logger.exception('postback %s could not be applied', events[0].unid)
+        return {events[0].pk: '{}: {}'.format(type(err).__name__, err)}
+
+
+def consume(apply, batch_size=BATCH_SIZE, idle_seconds=1.0, forever=False, stdout=None):
+    """Apply due events until none are left, or keep polling the queue
+    every ``idle_seconds`` when ``forever``. Returns ``(applied, failed)``."""
+    applied = failures = 0
+    started = time.time()
+    while True:
+        count, errors = consume_batch(apply, batch_size)
+        applied += count
+        failures += errors
+        if (count or errors) and stdout is not None:
+            stdout.write('{} postbacks applied, {} failed, {:.0f}/s'.format(
+                applied, failures, applied / max(time.time() - started, 1e-6)))
+        if count + errors < batch_size:
+            if not forever:
+                return applied, failures
+            time.sleep(idle_seconds)
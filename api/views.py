@@ -14,10 +14,14 @@ from rest_framework.generics import ListAPIView, RetrieveAPIView
 from django.http import JsonResponse
 from users.models import User
 from level.models import UserTotal
+from level.team import referral_team
 from django.core import serializers
 from django.core.cache import cache
 # from .renderers import UserJSONRenderer
 from wallets.models import WalletHistory
+from task.models import Task, CompletedTask, Game, PlayedGame, Postback
+from . import completions, postbacks
+from .models import PostbackEvent
 
  
 User = get_user_model()
@@ -120,32 +124,18 @@ class LevelTeamView(RetrieveAPIView):
             'inactive': level.inactive_users
             }
             leveldata.append(data)
-        level1 = User.objects.filter(referal=str(username)).only('username')
-        level1n = []
-        for x in level1:
-            level1n.append(str(x))
-        level2n = []
-        for y in level1n:
-            level2 = User.objects.filter(referal=y).only('username')
-            for z in level2:
-                level2n.append(str(z))
-
-        all_users = level1n + level2n
+        team = referral_team(str(username), 2)
 
         usersdata = []
-        for user in all_users:
-            try:
-                user = User.objects.get(username=user)
-                data = {
-                'tags': ['users'],
-                'name': user.name,
-                'mobile': user.mobile,
-                'userid': user.username,
-                'by': user.referal
-                }
-                usersdata.append(data)
-            except Exception as e:
-                print(e)
+        for user in team.members:
+            data = {
+            'tags': ['users'],
+            'name': user.name,
+            'mobile': user.mobile,
+            'userid': user.username,
+            'by': user.referral
+            }
+            usersdata.append(data)
             
         return Response({'users': usersdata, 'levels': leveldata})
 
@@ -172,50 +162,60 @@ class Deposit(APIView):
         except Exception as e:
             return Response({"status": 0, "message": e})
 
+def completed_task_codes(username):
+    return CompletedTask.objects.filter(user=username).values_list('code', flat=True)
+
+
+def used_postback_ids(ids):
+    # a postback still in the queue has not reached Postback yet
+    return set(Postback.objects.filter(unid__in=ids).values_list('unid', flat=True)) | \
+        set(PostbackEvent.objects.filter(unid__in=ids).values_list('unid', flat=True))
+
+
+def task_catalog():
+    return [{
+        'tags': ['task'],
+        'name': '{}'.format(task.name),
+        'id': None,
+        'x': 0,
+        'amount': task.amount,
+        'desc': task.description,
+        'stars': task.stars,
+        'url': task.url,
+        'first': 'https://www.jrindia.co.in{}'.format(task.imageURL.url),
+        'second': 'https://www.jrindia.co.in{}'.format(task.mediumImageURL.url),
+        'taskid': task.pk
+        } for task in Task.objects.filter(active=True)]
+
+
+def game_catalog():
+    return [{
+        'tags': ['game'],
+        'name': '{}'.format(game.name),
+        'code': game.code,
+        'desc': game.description,
+        'stars': game.stars,
+        'url': game.url,
+        'first': 'https://www.jrindia.co.in{}'.format(game.imageURL.url),
+        } for game in Game.objects.filter(active=True)]
+
+
 class TaskView(RetrieveAPIView):
 
     permission_classes = (IsAuthenticated,)
     authentication_class = JSONWebTokenAuthentication
 
     def get(self, request):
-        def generateid():
-            txnid = get_random_string()
-            try:
-                txn = Postback.objects.get(unid = txnid)
-            except Postback.DoesNotExist:
-                txn = 0
-            if txn:
-                generateid()
-            else:
-                return '{}'.format(txnid)
+        username = str(request.user)
+        done = completions.done(username, completed_task_codes)
+        catalog = completions.catalog(completions.TASKS, task_catalog)
+        ids = completions.unique_ids(len(catalog), used_postback_ids)
 
-        username = request.user
-        tasks_all = Task.objects.filter(active=True)
-        
-        
         tasks = []
-        for task in tasks_all:
-            try:
-                x = CompletedTask.objects.get(code=task.pk, user=str(username))
-                x=1
-            except CompletedTask.DoesNotExist:
-                x=0
-            if True:
-                i = generateid()
-                data = {
-                'tags': ['task'],
-                'name': '{}'.format(task.name),
-                'id': i,
-                'x':x,
-                'amount': task.amount,
-                'desc': task.description,
-                'stars': task.stars,
-                'url': task.url+'{}'.format(i),
-                'first': 'https://www.jrindia.co.in{}'.format(task.imageURL.url),
-                'second': 'https://www.jrindia.co.in{}'.format(task.mediumImageURL.url),
-                'taskid': task.pk
-                }
-                tasks.append(data)
+        for item, i in zip(catalog, ids):
+            data = dict(item, id=i, url=item['url'] + i)
+            data['x'] = 1 if str(item['taskid']) in done else 0
+            tasks.append(data)
         return Response({ 'tasks': tasks})
 
 class GameView(RetrieveAPIView):
@@ -224,28 +224,7 @@ class GameView(RetrieveAPIView):
     authentication_class = JSONWebTokenAuthentication
 
     def get(self, request):
-        username = request.user
-        games_all = Game.objects.filter(active=True)
-        
-        
-        games = []
-        for game in games_all:
-            try:
-                x = PlayedGame.objects.get(name=game.name, user=str(username))
-                x=1
-            except PlayedGame.DoesNotExist:
-                x=0
-            if True:
-                data = {
-                'tags': ['game'],
-                'name': '{}'.format(game.name),
-                'code': game.code,
-                'desc': game.description,
-                'stars': game.stars,
-                'url': game.url,
-                'first': 'https://www.jrindia.co.in{}'.format(game.imageURL.url),
-                }
-                games.append(data)
+        games = completions.catalog(completions.GAMES, game_catalog)
         return Response({ 'games': games})
 
 class LoginAPIView(APIView):
@@ -265,24 +244,19 @@ class LoginAPIView(APIView):
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-def postback(request, sub1, ip):
-    model = Postback()
-    model.task = 'Chingari'
-    model.ip = ip
-    model.unid = sub1
+def record_postbacks(events):
+    """Apply a batch of queued postbacks, see ``api.postbacks.consume``."""
+    Postback.objects.bulk_create([Postback(task=event.task, ip=event.ip, unid=event.unid) for event in events])
 
-    model.save()
+
+def postback(request, sub1, ip):
+    postbacks.receive('Chingari', ip, sub1)
     message = "data sent succesfully sub1 {}, ip {}, ".format(sub1, ip)
     
     return render(request, 'ads/ads.html', {'message': message})
 
 def newpostback(request, sub1, sub2, ip):
-    model = Postback()
-    model.task = sub1
-    model.ip = ip
-    model.unid = sub2
-
-    model.save()
+    postbacks.receive(sub1, ip, sub2)
     message = "data sent succesfully sub1 {}, ip {}, {}".format(sub1, ip, sub2)
     
     return render(request, 'ads/ads.html', {'message': message})
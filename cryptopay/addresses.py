@@ -0,0 +1,73 @@
+from django.db import transaction
+
+from cryptopay.models import CryptoAddressIndex, CryptoCurrencyPayment, PooledAddress
+
+DEFAULT_POOL_SIZE = 20
+
+
+def reserve_indexes(crypto, count=1):
+    """
+    Atomically reserve ``count`` consecutive address indexes of a crypto
+    :param crypto: The crypto in config
+    :param count: How many indexes to reserve
+    :return: range of the reserved indexes
+    """
+    with transaction.atomic():
+        counter = CryptoAddressIndex.objects.select_for_update().filter(crypto=crypto).first()
+        if counter is None:
+            # first use, carry on after the addresses existing payments hold
+            counter, _ = CryptoAddressIndex.objects.get_or_create(
+                crypto=crypto,
+                defaults={"next_index": CryptoCurrencyPayment.get_address_used_count(crypto)},
+            )
+            counter = CryptoAddressIndex.objects.select_for_update().get(pk=counter.pk)
+        first = counter.next_index
+        counter.next_index = first + count
+        counter.save(update_fields=["next_index"])
+    return range(first, first + count)
+
+
+def take_pooled_address(crypto):
+    """
+    Hand out a pre derived address of a crypto, or None when the pool is empty
+    """
+    with transaction.atomic():
+        pooled = (
+            PooledAddress.objects.select_for_update(skip_locked=True)
+            .filter(crypto=crypto)
+            .order_by("index")
+            .first()
+        )
+        if pooled is None:
+            return None
+        pooled.delete()
+    return pooled.address
+
+
+def allocate_address(crypto, backend_obj):
+    """
+    A fresh address for a new payment: from the pool when it has one, else derived
+    from a newly reserved index
+    """
+    address = take_pooled_address(crypto)
+    if address is None:
+        index = reserve_indexes(crypto)[0]
+        address = backend_obj.generate_new_address(index=index)
+    return address
+
+
+def fill_pool(crypto, backend_obj, size=DEFAULT_POOL_SIZE):
+    """
+    Top the address pool of a crypto up to ``size`` addresses
+    :return: number of addresses added
+    """
+    missing = size - PooledAddress.objects.filter(crypto=crypto).count()
+    if missing <= 0:
+        return 0
+    # derive outside any transaction, the indexes are ours already
+    addresses = [
+        PooledAddress(crypto=crypto, index=index, address=backend_obj.generate_new_address(index=index))
+        for index in reserve_indexes(crypto, missing)
+    ]
+    PooledAddress.objects.bulk_create(addresses)
+    return len(addresses)
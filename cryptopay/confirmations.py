@@ -0,0 +1,67 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 50
+
+
+def _lookup(payment, confirmation_number, accept_confirmed_bal_without_hash_mins):
+    return dict(
+        address=payment.address,
+        total_crypto_amount=payment.crypto_amount,
+        confirmation_number=confirmation_number,
+        accept_confirmed_bal_without_hash_mins=accept_confirmed_bal_without_hash_mins,
+        tx_hash=payment.tx_hash,
+    )
+
+
+def confirm_payments(
+    backend_obj,
+    payments,
+    confirmation_number=1,
+    accept_confirmed_bal_without_hash_mins=20,
+    workers=DEFAULT_WORKERS,
+    batch_size=DEFAULT_BATCH_SIZE,
+):
+    """
+    Look up the blockchain status of many payments at once.
+
+    Lookups run on a pool of ``workers`` threads. A backend that has a
+    ``confirm_address_payments(lookups)`` method gets ``batch_size`` addresses per
+    call, any other backend one ``confirm_address_payment`` call per address.
+    A lookup that raises is logged and its result is None so the payment is left as it is.
+    :param backend_obj: The crypto backend
+    :param payments: Payments to check
+    :return: list of (payment, (status, value) or None) in the order of payments
+    """
+    payments = list(payments)
+    lookups = [
+        _lookup(payment, confirmation_number, accept_confirmed_bal_without_hash_mins)
+        for payment in payments
+    ]
+    confirm_many = getattr(backend_obj, "confirm_address_payments", None)
+    if confirm_many is not None:
+        batches = [
+            lookups[i : i + batch_size] for i in range(0, len(lookups), batch_size)
+        ]
+    else:
+        batches = [[lookup] for lookup in lookups]
+
+    def run(batch):
+        try:
+            if confirm_many is not None:
+                return list(confirm_many(batch))
+            return [backend_obj.confirm_address_payment(**batch[0])]
+        except Exception:
+            logger.exception(
+                "payment lookup failed for %s", ", ".join(l["address"] for l in batch)
+            )
+            return [None] * len(batch)
+
+    if not batches:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+        results = [result for batch in pool.map(run, batches) for result in batch]
+    return list(zip(payments, results))
@@ -0,0 +1,67 @@
+import hashlib
+import time
+from decimal import Decimal
+
+
+class FakeBackend:
+    """
+    Offline stand in for a merchant_wallet backend, for benchmarks and local runs.
+    Every lookup sleeps ``latency`` seconds like a blockchain API round trip would, a
+    multi-address lookup sleeps once for the whole batch. The status of an
+    address is derived from its hash so repeated runs give the same answers.
+    """
+
+    UNCONFIRMED_ADDRESS_BALANCE = 0
+    CONFIRMED_ADDRESS_BALANCE = 1
+    UNDERPAID_ADDRESS_BALANCE = -1
+    NO_HASH_ADDRESS_BALANCE = -2
+
+    RATES = {"USD": Decimal("30000"), "EUR": Decimal("28000"), "INR": Decimal("2500000")}
+
+    def __init__(self, public_key, latency=0.05, multi_address=True):
+        self.public_key = public_key
+        self.latency = latency
+        self.calls = 0
+        if not multi_address:
+            # look like a backend that only checks one address per call
+            self.confirm_address_payments = None
+
+    def generate_new_address(self, index):
+        digest = hashlib.sha256("{}/{}".format(self.public_key, index).encode()).hexdigest()
+        return "fake1" + digest[:33]
+
+    def convert_from_fiat(self, amount, currency="USD"):
+        return round(Decimal(amount) / self.RATES[currency], 8)
+
+    def convert_to_fiat(self, amount, currency):
+        return round(Decimal(amount) * self.RATES[currency], 2)
+
+    def _status(self, address, total_crypto_amount, tx_hash):
+        bucket = int(hashlib.sha256(address.encode()).hexdigest(), 16) % 4
+        if bucket == 0:
+            return self.UNCONFIRMED_ADDRESS_BALANCE, tx_hash or "tx" + address[-10:]
+        if bucket == 1:
+            return self.CONFIRMED_ADDRESS_BALANCE, total_crypto_amount
+        if bucket == 2:
+            return self.UNDERPAID_ADDRESS_BALANCE, Decimal(total_crypto_amount) / 2
+        return self.NO_HASH_ADDRESS_BALANCE, None
+
+    def confirm_address_payment(
+        self,
+        address,
+        total_crypto_amount,
+        confirmation_number=1,
+        accept_confirmed_bal_without_hash_mins=20,
+        tx_hash=None,
+    ):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._status(address, total_crypto_amount, tx_hash)
+
+    def confirm_address_payments(self, lookups):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [
+            self._status(l["address"], l["total_crypto_amount"], l["tx_hash"])
+            for l in lookups
+        ]
@@ -0,0 +1,46 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from cryptopay.confirmations import confirm_payments
+from cryptopay.fake_backend import FakeBackend
+from cryptopay.models import CryptoCurrencyPayment
+
+
+class Command(BaseCommand):
+    help = "Time payment confirmation lookups against the offline fake backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=500)
+        parser.add_argument("--latency", type=float, default=0.02)
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--batch-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        backend = FakeBackend("bench", latency=options["latency"])
+        payments = [
+            CryptoCurrencyPayment(
+                crypto="bench",
+                address=backend.generate_new_address(i),
+                crypto_amount=Decimal("0.001"),
+                fiat_amount=Decimal("30"),
+            )
+            for i in range(options["payments"])
+        ]
+        runs = (
+            ("one by one", FakeBackend("bench", options["latency"], False), 1),
+            ("thread pool", FakeBackend("bench", options["latency"], False), options["workers"]),
+            ("pool + multi-address", FakeBackend("bench", options["latency"]), options["workers"]),
+        )
+        for name, backend, workers in runs:
+            started = time.time()
+            confirm_payments(
+                backend, payments, workers=workers, batch_size=options["batch_size"]
+            )
+            elapsed = time.time() - started
+            self.stdout.write(
+                "{:<22} {:>7.2f}s {:>9.0f} payments/s {:>6} backend calls".format(
+                    name, elapsed, len(payments) / elapsed, backend.calls
+                )
+            )
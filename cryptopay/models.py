@@ -75,11 +75,12 @@ def create_new_payment(
     if not address and crypto_reuse_address is True:
         address = CryptoCurrencyPayment.get_crypto_reused_address(crypto)
         resuse_address = address is not None
+    if not address and address_index is not None:
+        address = backend_obj.generate_new_address(index=address_index)
     if not address:
-        address_generated_count = (
-            address_index or CryptoCurrencyPayment.get_address_used_count(crypto)
-        )
-        address = backend_obj.generate_new_address(index=address_generated_count)
+        from cryptopay.addresses import allocate_address
+
+        address = allocate_address(crypto, backend_obj)
     payment = CryptoCurrencyPayment(
         crypto=crypto,
         crypto_code=crypto_code,
@@ -206,3 +207,33 @@ class CryptoCurrencyPayment(models.Model):
         if self.paid_crypto_amount and self.remaining_crypto_amount:
             return True
         return False
+
+
+class CryptoAddressIndex(models.Model):
+    """
+    Next unused HD address index of a crypto. Indexes are reserved by locking this row,
+    so two payments never get the same index
+    """
+
+    crypto = models.CharField(max_length=50, unique=True)
+    next_index = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return "{} {}".format(self.crypto, self.next_index)
+
+
+class PooledAddress(models.Model):
+    """
+    An address derived ahead of time for a reserved index, handed out to the next new payment
+    """
+
+    crypto = models.CharField(max_length=50)
+    index = models.PositiveIntegerField()
+    address = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("crypto", "index")
+
+    def __str__(self):
+        return "{} {} {}".format(self.crypto, self.index, self.address)
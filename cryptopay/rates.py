@@ -0,0 +1,30 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+
+DEFAULT_RATE_TTL_SECONDS = 60
+
+# convert_from_fiat rounds to 8 places, ask for a big amount so the rate
+# keeps enough digits
+RATE_BASE = Decimal(10 ** 6)
+CRYPTO_PLACES = Decimal("0.00000001")
+
+
+def get_rate(crypto, backend_obj, fiat_currency, ttl=DEFAULT_RATE_TTL_SECONDS):
+    """
+    Crypto units per fiat unit for a (crypto, fiat) pair, cached for ``ttl`` seconds
+    :param crypto: The crypto in config
+    :param backend_obj: Backend of that crypto
+    :param fiat_currency: The fiat currency
+    :return: Decimal rate
+    """
+    key = "cryptopay:rate:{}:{}".format(crypto, fiat_currency)
+    rate = cache.get(key)
+    if rate is None:
+        rate = Decimal(str(backend_obj.convert_from_fiat(RATE_BASE, fiat_currency))) / RATE_BASE
+        cache.set(key, rate, ttl)
+    return rate
+
+
+def to_crypto(fiat_amount, rate):
+    return (Decimal(fiat_amount) * rate).quantize(CRYPTO_PLACES)
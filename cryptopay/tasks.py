@@ -2,7 +2,10 @@ from cryptopay.models import CryptoCurrencyPayment
 from django.utils import timezone
 from cryptopay.models import create_child_payment
 from datetime import timedelta
+from cryptopay.addresses import DEFAULT_POOL_SIZE, fill_pool
 from cryptopay.app_settings import get_active_backends, get_backend_config, get_backend_obj
+from cryptopay.confirmations import DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, confirm_payments
+from cryptopay.rates import DEFAULT_RATE_TTL_SECONDS, get_rate, to_crypto
 
 
 def update_payment_status():
@@ -16,6 +19,17 @@ def update_payment_status():
         crypto_task.update_crypto_currency_payment_status()
 
 
+def fill_address_pools():
+    """
+    Run this as a task periodically to keep addresses derived ahead for new payments
+    :return:
+    """
+    backends = get_active_backends()
+    for backend in backends:
+        pool_size = get_backend_config(backend).get("ADDRESS_POOL_SIZE", DEFAULT_POOL_SIZE)
+        fill_pool(backend, get_backend_obj(backend), pool_size)
+
+
 def cancel_unpaid_payment():
     """
     Run this as a task to cancel payment that have stayed in new for too long
@@ -66,12 +80,19 @@ class CryptoCurrencyPaymentTask:
         self.confirm_bal_without_hash_mins = get_backend_config(
             crypto, "IGNORE_CONFIRMED_BALANCE_WITHOUT_SAVED_HASH_MINS"
         )
+        config = get_backend_config(crypto)
+        self.confirmation_workers = config.get("CONFIRMATION_WORKERS", DEFAULT_WORKERS)
+        self.confirmation_batch_size = config.get(
+            "CONFIRMATION_BATCH_SIZE", DEFAULT_BATCH_SIZE
+        )
+        self.rate_ttl = config.get("RATE_CACHE_SECONDS", DEFAULT_RATE_TTL_SECONDS)
 
     def update_crypto_currency_payment_status(self):
         """
         Get all payment that are in new status or processing status and check their status on
         the blockchain for confirmation. Only payment that are still in this particular status
-        are checked
+        are checked. Addresses are looked up concurrently and the payments written back
+        with one bulk_update
 
         :return:
         """
@@ -83,15 +104,21 @@ class CryptoCurrencyPaymentTask:
                 CryptoCurrencyPayment.PAYMENT_PROCESSING,
             ],
             created_at__gte=yesterday_time,
-        ).all()
-        for payment in payments:
-            status, value = self.backend_obj.confirm_address_payment(
-                address=payment.address,
-                total_crypto_amount=payment.crypto_amount,
-                confirmation_number=self.confirmation_number,
-                accept_confirmed_bal_without_hash_mins=self.confirm_bal_without_hash_mins,
-                tx_hash=payment.tx_hash,
-            )
+        )
+        results = confirm_payments(
+            self.backend_obj,
+            payments,
+            confirmation_number=self.confirmation_number,
+            accept_confirmed_bal_without_hash_mins=self.confirm_bal_without_hash_mins,
+            workers=self.confirmation_workers,
+            batch_size=self.confirmation_batch_size,
+        )
+        now = timezone.now()
+        checked = []
+        for payment, result in results:
+            if result is None:
+                continue
+            status, value = result
             if status == self.backend_obj.UNCONFIRMED_ADDRESS_BALANCE:
                 payment.status = payment.PAYMENT_PROCESSING
                 payment.tx_hash = value
@@ -112,7 +139,14 @@ class CryptoCurrencyPaymentTask:
             else:
                 # unknown error occured cancel payment
                 payment.status = payment.PAYMENT_CANCELLED
-            payment.save()
+            # bulk_update does not touch auto_now fields
+            payment.updated_at = now
+            checked.append(payment)
+        CryptoCurrencyPayment.objects.bulk_update(
+            checked,
+            ["status", "tx_hash", "paid_crypto_amount", "child_payment", "updated_at"],
+            batch_size=500,
+        )
 
     def cancel_unpaid_payment(self):
         """
@@ -121,29 +155,41 @@ class CryptoCurrencyPaymentTask:
         :return:
         """
         yesterday_time = timezone.now() - timedelta(hours=self.unpaid_payment_hrs)
-        payments = CryptoCurrencyPayment.objects.filter(
+        CryptoCurrencyPayment.objects.filter(
+            crypto=self.crypto,
             status__in=[CryptoCurrencyPayment.PAYMENT_NEW],
             created_at__lte=yesterday_time,
-        )
-        for payment in payments:
-            payment.status = payment.PAYMENT_CANCELLED
-            payment.save()
+        ).update(status=CryptoCurrencyPayment.PAYMENT_CANCELLED, updated_at=timezone.now())
 
     def refresh_new_crypto_payment_amount(self):
         """
         Due to volatility of crypto prices, Payment prices can be refreshed regularly especially for payment in
-        new status
+        new status. The rate of each fiat currency is fetched once (and cached) and applied to all its payments
+        with bulk_update
         :return:
         """
-        leastupdate_time = timezone.now() - timedelta(
-            minutes=self.refresh_prices_every_mins
-        )
+        now = timezone.now()
+        leastupdate_time = now - timedelta(minutes=self.refresh_prices_every_mins)
         payments = CryptoCurrencyPayment.objects.filter(
-            status=CryptoCurrencyPayment.PAYMENT_NEW, updated_at__lte=leastupdate_time
+            crypto=self.crypto,
+            status=CryptoCurrencyPayment.PAYMENT_NEW,
+            updated_at__lte=leastupdate_time,
         )
-        for payment in payments:
-            amount = self.backend_obj.convert_from_fiat(
-                payment.fiat_amount, payment.fiat_currency
+        currencies = payments.order_by().values_list("fiat_currency", flat=True).distinct()
+        for fiat_currency in list(currencies):
+            rate = get_rate(self.crypto, self.backend_obj, fiat_currency, self.rate_ttl)
+            changed = []
+            for payment in payments.filter(fiat_currency=fiat_currency).only(
+                "id", "fiat_amount"
+            ).iterator():
+                payment.crypto_amount = to_crypto(payment.fiat_amount, rate)
+                payment.updated_at = now
+                changed.append(payment)
+                if len(changed) >= 500:
+                    CryptoCurrencyPayment.objects.bulk_update(
+                        changed, ["crypto_amount", "updated_at"]
+                    )
+                    changed = []
+            CryptoCurrencyPayment.objects.bulk_update(
+                changed, ["crypto_amount", "updated_at"]
             )
-            payment.crypto_amount = amount
-            payment.save()
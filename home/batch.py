@@ -0,0 +1,195 @@
+import multiprocessing
+import time
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import BatchCheckpoint
+
+
+class BatchRunner(object):
+    """Walks ``queryset`` in primary key order, ``chunk_size`` rows at a time.
+
+    Every chunk is handed to ``process_chunk`` inside its own transaction and
+    the last primary key done is then stored in a BatchCheckpoint named
+    ``name``. A run that stopped half way resumes after that key; a run that
+    finished starts over from the beginning next time.
+
+    With ``workers`` > 1 the chunks are processed by a pool of processes
+    running ``pool_task(pks)``; checkpoints still advance in key order.
+    """
+
+    def __init__(self, name, queryset, process_chunk, chunk_size=500, workers=0,
+                 pool_task=None, resume=True, checkpoint=True, stdout=None):
+        self.name = name
+        self.queryset = queryset.order_by('pk')
+        self.process_chunk = process_chunk
+        self.chunk_size = chunk_size
+        self.workers = workers if pool_task is not None else 0
+        self.pool_task = pool_task
+        self.resume = resume
+        self.checkpoint = checkpoint
+        self.stdout = stdout
+        self.rows = 0
+
+    def write(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def start(self):
+        if not self.checkpoint:
+            return None, 0
+        point, _ = BatchCheckpoint.objects.get_or_create(name=self.name)
+        if point.finished or not self.resume:
+            point.last_pk = 0
+            point.rows = 0
+            point.finished = False
+            point.started_at = timezone.now()
+            point.save()
+        elif point.last_pk:
+            self.write('{}: resuming after pk {} ({} rows done)'.format(self.name, point.last_pk, point.rows))
+        return point, point.last_pk
+
+    def keys(self, last_pk):
+        """Primary key chunks after ``last_pk``, read by keyset pagination."""
+        while True:
+            pks = list(self.queryset.filter(pk__gt=last_pk).values_list('pk', flat=True)[:self.chunk_size])
+            if not pks:
+                return
+            yield pks
+            last_pk = pks[-1]
+
+    def chunks(self, last_pk):
+        for pks in self.keys(last_pk):
+            yield pks, list(self.queryset.filter(pk__in=pks))
+
+    def done(self, point, pks, started):
+        self.rows += len(pks)
+        if point is not None:
+            point.last_pk = pks[-1]
+            point.rows += len(pks)
+            point.save(update_fields=['last_pk', 'rows', 'updated_at'])
+        elapsed = max(time.time() - started, 1e-6)
+        self.write('{}: {} rows, {:.0f} rows/s'.format(self.name, self.rows, self.rows / elapsed))
+
+    def run(self):
+        point, last_pk = self.start()
+        started = time.time()
+        if self.workers > 1:
+            # children must not share the parent's database connections
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(self.workers) as pool:
+                for pks in pool.imap(self.pool_task, self.keys(last_pk)):
+                    self.done(point, pks, started)
+        else:
+            for pks, rows in self.chunks(last_pk):
+                with transaction.atomic():
+                    self.process_chunk(rows)
+                    self.done(point, pks, started)
+        if point is not None:
+            point.finished = True
+            point.save(update_fields=['finished', 'updated_at'])
+        self.write('{}: finished, {} rows in {:.1f}s'.format(self.name, self.rows, time.time() - started))
+        return self.rows
+
+
+def _pool_task(module, options, pks):
+    command = import_module(module).Command()
+    command.options = options
+    rows = list(command.queryset().filter(pk__in=pks).order_by('pk'))
+    with transaction.atomic():
+        command.process_chunk(rows)
+    return pks
+
+
+class _PoolTask(object):
+    # a picklable callable for Pool.imap
+    def __init__(self, module, options):
+        self.module = module
+        self.options = options
+
+    def __call__(self, pks):
+        return _pool_task(self.module, self.options, pks)
+
+
+class BatchCommand(BaseCommand):
+    """Management command running on BatchRunner.
+
+    Subclasses define ``queryset()`` and ``process_chunk(rows)`` (or
+    ``process(row)``), or call ``run_stage()`` themselves from ``handle()``
+    when the job walks several tables. ``self.options`` holds the command
+    options. Set ``parallel`` when chunks are independent of each other so
+    ``--workers`` may fan them out.
+    """
+    chunk_size = 500
+    parallel = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=self.chunk_size)
+        parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint of an interrupted run")
+        if self.parallel:
+            parser.add_argument('--workers', type=int, default=0, help="Processes to spread the chunks over")
+
+    @property
+    def job_name(self):
+        return self.__module__.rsplit('.', 1)[-1]
+
+    def queryset(self):
+        raise NotImplementedError('subclasses of BatchCommand must provide a queryset() method')
+
+    def process(self, row):
+        raise NotImplementedError('subclasses of BatchCommand must provide a process() method')
+
+    def process_chunk(self, rows):
+        for row in rows:
+            self.process(row)
+
+    def fail(self, message):
+        """Stop the job on a row that cannot be processed.
+
+        The chunk holding the row is rolled back and its checkpoint stays on
+        the chunk before, so once the data is fixed the next run resumes at
+        that chunk instead of skipping it.
+        """
+        raise CommandError('{}: {}'.format(self.job_name, message))
+
+    def stage_name(self, stage):
+        return '{}:{}'.format(self.job_name, stage)
+
+    def begin(self, *stages):
+        """Start a job made of several ``run_stage()`` calls.
+
+        Returns True for a fresh run. When an earlier run stopped half way it
+        returns False and the stages that run finished are skipped, so only
+        work that is safe to repeat should happen outside the stages.
+        """
+        points = BatchCheckpoint.objects.filter(name__in=[self.stage_name(stage) for stage in stages])
+        self.resuming = not self.options['restart'] and points.filter(finished=False).exists()
+        if not self.resuming:
+            points.delete()
+        return not self.resuming
+
+    def run_stage(self, stage, queryset, process_chunk, pool_task=None):
+        name = self.stage_name(stage)
+        if getattr(self, 'resuming', False) and BatchCheckpoint.objects.filter(name=name, finished=True).exists():
+            self.stdout.write('{}: done in the interrupted run'.format(name))
+            return 0
+        return BatchRunner(
+            name, queryset, process_chunk,
+            chunk_size=self.options['chunk_size'],
+            workers=self.options.get('workers') or 0,
+            pool_task=pool_task,
+            resume=not self.options['restart'],
+            stdout=self.stdout,
+        ).run()
+
+    def handle(self, *args, **options):
+        self.options = options
+        pool_task = None
+        if self.parallel:
+            # only plain values travel to the workers, not stdout and friends
+            plain = {k: v for k, v in options.items() if isinstance(v, (str, int, float, bool, type(None)))}
+            pool_task = _PoolTask(self.__module__, plain)
+        self.run_stage('main', self.queryset(), self.process_chunk, pool_task)
@@ -0,0 +1,86 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from users import search
+from users.models import User, UserSearchTerm
+
+FIRST = ('raj', 'amit', 'sunil', 'priya', 'neha', 'vikram', 'anita', 'rahul', 'pooja', 'arjun', 'kavita', 'mohan')
+LAST = ('kumar', 'sharma', 'singh', 'verma', 'gupta', 'patel', 'reddy', 'yadav', 'das', 'nair', 'joshi', 'mehta')
+
+
+def percentile(times, fraction):
+    times = sorted(times)
+    return times[min(len(times) - 1, int(len(times) * fraction))] * 1000
+
+
+class Command(BaseCommand):
+    help = "Time user search on a table of synthetic users, rolled back afterwards"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--scan-queries', type=int, default=20,
+                            help="Queries timed with the old icontains scan, which is slow on big tables")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.populate(rng, options['users'])
+            queries = self.queries(rng, options['queries'])
+            self.report('icontains scan', queries[:options['scan_queries']], self.scan)
+            self.report('index, no cache', queries, self.uncached)
+            for query in queries:
+                search.search_ids(query)
+            self.report('index, warm cache', queries, search.search_ids)
+            transaction.set_rollback(True)
+        search.cache.clear()
+
+    def populate(self, rng, count):
+        started = time.time()
+        first_pk = (User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        for start in range(0, count, 5000):
+            users = [
+                User(pk=first_pk + i, username='bench{}'.format(first_pk + i),
+                     name='{} {}'.format(rng.choice(FIRST), rng.choice(LAST)).title(),
+                     email='bench{}@example.com'.format(first_pk + i),
+                     mobile='9{:09d}'.format(rng.randrange(10 ** 9)))
+                for i in range(start, min(start + 5000, count))
+            ]
+            User.objects.bulk_create(users)
+            UserSearchTerm.objects.bulk_create(
+                [UserSearchTerm(user_id=user.pk, kind=kind, term=term)
+                 for user in users for kind, term in search.terms_for(user)])
+        self.stdout.write('{} users indexed in {:.1f}s'.format(count, time.time() - started))
+
+    def queries(self, rng, count):
+        # what autocomplete sends: growing prefixes of real names and ids, and
+        # the number part of ids as typed in the panel
+        words = list(FIRST + LAST) + ['bench{}'.format(rng.randrange(1, 10 ** 6)) for _ in range(50)] + \
+            [str(rng.randrange(1, 10 ** 6)) for _ in range(25)]
+        queries = []
+        while len(queries) < count:
+            word = rng.choice(words)
+            queries.append(word[:rng.randint(1, len(word))])
+        return queries
+
+    def scan(self, query):
+        return list(User.objects.filter(Q(username__icontains=query) | Q(name__icontains=query))
+                    .values_list('pk', flat=True))
+
+    def uncached(self, query):
+        search.cache.clear()
+        return search.search_ids(query)
+
+    def report(self, name, queries, run):
+        times = []
+        for query in queries:
+            started = time.time()
+            run(query)
+            times.append(time.time() - started)
+        self.stdout.write('{:<18} {:>5} queries  p50 {:>8.2f}ms  p95 {:>8.2f}ms'.format(
+            name, len(times), percentile(times, 0.5), percentile(times, 0.95)))
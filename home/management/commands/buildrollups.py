@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from wallets import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per user, day and category income rollups from WalletHistory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild(options['chunk_size'])
+        self.stdout.write('{} income rollups written'.format(count))
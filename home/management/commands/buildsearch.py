@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the user search terms from the user table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = search.rebuild(options['chunk_size'])
+        self.stdout.write('{} search terms written'.format(count))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from level import tree
+from level.models import UserTree
+from users import uplines
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the level closure table and the stored referral paths"
+
+    def handle(self, *args, **options):
+        tree.rebuild()
+        self.stdout.write('{} tree links written'.format(UserTree.objects.count()))
+        uplines.rebuild()
+        self.stdout.write('{} referral paths written'.format(User.objects.exclude(referral_path='').count()))
@@ -1,61 +1,67 @@
+import time
+
 from django.core.management.base import BaseCommand
-from urllib.request import urlopen
-from bs4 import BeautifulSoup
-import json
+from django.db import transaction
+from django.db.models import F
+
+from users.identity import chunked
 from users.models import User
-from wallets.models import WalletHistories, Withdrawals, Paymentoptions
-from binary.models import BinaryTree
-import datetime
-from django.utils import timezone
+from wallets import categories, rollups
+from wallets.models import WalletHistory
 from zone.models import ZoneUpgrades
 
+# (pool amount, zone filters), the first filter with any upgrade picks the
+# achievers of that pool
+POOLS = (
+    (5000, ({'zone': 'zone1', 'income__lte': 300},
+            {'zone': 'zone2', 'income__lte': 600},
+            {'zone': 'zone3', 'income__lte': 5000})),
+    (9000, ({'zone': 'zone4', 'income__lte': 15000},
+            {'zone': 'zone5', 'income__lte': 50000})),
+)
+
+# Balance the royalty is credited to.
+BALANCE_FIELD = 'wallet'
+
+
 class Command(BaseCommand):
-    help = "Update Binary Data"
+    help = "Share the company royalty pools among the zone achievers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be credited")
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def achievers(self, filters):
+        for zone_filter in filters:
+            upgrades = ZoneUpgrades.objects.filter(**zone_filter)
+            if upgrades.exists():
+                return User.objects.filter(username__in=upgrades.values('user_id'))
+        return User.objects.none()
 
     def handle(self, *args, **options):
-        achievers1 = User.objects.filter(binary_directs__gte=25) & User.objects.filter(binary_directs__lte=50)
-        achievers2 = User.objects.filter(binary_directs__gte=50)
-        z1 = ZoneUpgrades.objects.filter(zone='zone1', income__lte=300) or ZoneUpgrades.objects.filter(zone='zone2', income__lte=600) or ZoneUpgrades.objects.filter(zone='zone3', income__lte=5000)
-        z2 = ZoneUpgrades.objects.filter(zone='zone4', income__lte=15000) or ZoneUpgrades.objects.filter(zone='zone5', income__lte=50000)
-        za = []
-        for p in z1:
-            try:
-                user = User.objects.get(username=p.user_id)
-                za.append(user)
-            except Exception as e:
-                pass
-        zb = []
-        for q in z2:
-            try:
-                user = User.objects.get(username=q.user_id)
-                zb.append(user)
-            except Exception as e:
-                pass
-        zaa = 5000/len(za)
-        zba = 9000/len(zb)
-
-        jobs = 0
-        print('{} Jobs to complete'.format(len(za)+len(zb)))
-        for user in za:
-            user.income += zaa
-            usewallet = WalletHistories()
-            usewallet.user_id = str(user)
-            usewallet.amount = zaa
-            usewallet.type = "credit"
-            usewallet.comment = "Company Royalty Income"
-            user.save()
-            usewallet.save()
-            print(jobs)
-            jobs += 1
-
-        for user in zb:
-            user.income += zba
-            usewallet = WalletHistories()
-            usewallet.user_id = str(user)
-            usewallet.amount = zba
-            usewallet.type = "credit"
-            usewallet.comment = "Company Royalty Income"
-            user.save()
-            usewallet.save()
-            print(jobs)
-            jobs += 1
\ No newline at end of file
+        started = time.time()
+        credited = 0
+        for pool, filters in POOLS:
+            usernames = list(self.achievers(filters).order_by('pk').values_list('username', flat=True))
+            if not usernames:
+                self.stdout.write('pool {}: no achievers'.format(pool))
+                continue
+            share = pool / len(usernames)
+            self.stdout.write('pool {}: {} achievers, {:.2f} each'.format(pool, len(usernames), share))
+            if options['dry_run']:
+                continue
+            with transaction.atomic():
+                for chunk in chunked(usernames, options['chunk_size']):
+                    User.objects.filter(username__in=chunk).update(**{BALANCE_FIELD: F(BALANCE_FIELD) + share})
+                    rows = [
+                        WalletHistory(user_id=username, amount=share, type='credit',
+                                      comment='Company Royalty Income', category=categories.ROYALTY)
+                        for username in chunk
+                    ]
+                    WalletHistory.objects.bulk_create(rows)
+                    rollups.add(rows)
+                    credited += len(chunk)
+                    elapsed = time.time() - started
+                    self.stdout.write('{} credited, {:.0f} users/s'.format(credited, credited / max(elapsed, 1e-6)))
+        self.stdout.write('done: {} credited in {:.1f}s{}'.format(
+            credited, time.time() - started, ' (dry run)' if options['dry_run'] else ''))
@@ -1,25 +1,34 @@
-from django.core.management.base import BaseCommand
-from urllib.request import urlopen
-from bs4 import BeautifulSoup
-import json
+from collections import defaultdict
+
+from django.db.models import F
+
+from home.batch import BatchCommand
 from users.models import User
+from wallets import categories
 from wallets.models import WalletHistory
 import datetime
 
-class Command(BaseCommand):
-	help = "Count Binary Data"
 
-	def handle(self, *args, **options):
-		start_date = datetime.datetime.now() + datetime.timedelta(-100)
-		end_date = datetime.datetime.now() + datetime.timedelta(-15)
-		w = WalletHistory.objects.filter(created_at__range=(start_date, end_date), comment__icontains="New Upgrade by").exclude(filter__icontains="payment done")
-		for x in w:
-			try:
-				user = User.objects.get(username=x.user_id)
-			except Exception as e:
-				user = 'blank'
-			if user != 'blank':
-				user.wallet += x.amount
-				user.save()
-				x.filter = 'payment done'
-				x.save()
\ No newline at end of file
+class Command(BatchCommand):
+    help = "Pay level commissions to the wallet once they are 15 days old"
+    parallel = True
+
+    def queryset(self):
+        start_date = datetime.datetime.now() + datetime.timedelta(-100)
+        end_date = datetime.datetime.now() + datetime.timedelta(-15)
+        return WalletHistory.objects.filter(
+            created_at__range=(start_date, end_date), category=categories.LEVEL_COMMISSION,
+        ).exclude(filter__icontains="payment done")
+
+    def process_chunk(self, rows):
+        amounts = defaultdict(int)
+        for x in rows:
+            # whole units per row, as the integer wallet truncated each save()
+            amounts[x.user_id] += int(x.amount)
+        users = set(User.objects.filter(username__in=list(amounts)).values_list('username', flat=True))
+        by_amount = defaultdict(list)
+        for username in users:
+            by_amount[amounts[username]].append(username)
+        for amount, usernames in by_amount.items():
+            User.objects.filter(username__in=usernames).update(wallet=F('wallet') + amount)
+        WalletHistory.objects.filter(pk__in=[x.pk for x in rows if x.user_id in users]).update(filter='payment done')
@@ -3,6 +3,7 @@ from urllib.request import urlopen
 from bs4 import BeautifulSoup
 import json
 from users.models import User
+from wallets import categories
 from wallets.models import WalletHistory
 import datetime
 from datetime import timedelta
@@ -47,6 +48,7 @@ class Command(BaseCommand):
 			for d in range(0,days_difference):
 				wallet = WalletHistory()
 				wallet.comment = "ROI Income"
+				wallet.category = categories.ROI
 				wallet.user_id = x.user
 				wallet.amount = roi
 				wallet.type = "credit"
@@ -1,8 +1,9 @@
-from django.core.management.base import BaseCommand
+from home.batch import BatchCommand
 from urllib.request import urlopen
 from bs4 import BeautifulSoup
 import json
 from users.models import User
+from wallets import categories
 from wallets.models import WalletHistories, Withdrawals, Paymentoptions
 from binary.models import BinaryTree
 import datetime
@@ -11,160 +12,138 @@ from binary.models import Shopping
 from pcard.models import ImageUploadModel
 from django.db.models import F, Sum
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = "Update Binary Data"
 
-    def handle(self, *args, **options):
-        all_shop = Shopping.objects.all()
-        all_user = User.objects.all()
-        all_user.update(imps_daily=0)
-        all_shop.update(today_level_income=0, today_self_income=0)
-        onhold_users = User.objects.all().annotate(on_hold=Sum(F('income') + F('binary_income') + F('added_amount') + F('received_amount'))).filter(on_hold__gte=10)
-        print(onhold_users.count())
-        for x in onhold_users:
+    def release_onhold(self, rows):
+        for x in rows:
             user_id = x
             y = x
             amount = 10
             if user_id.income <= amount:
                 amount = amount - user_id.income
                 user_id.income = 0
-                print("if1")
                 if user_id.binary_income <= amount:
                     amount = amount - user_id.binary_income
                     user_id.binary_income = 0
-                    print("if2")
                     if user_id.added_amount <= amount:
                         amount = amount - user_id.added_amount
                         user_id.added_amount = 0
-                        print("if3")
                         if amount != 0:
                             user_id.received_amount = user_id.received_amount - amount
                             amount = 0
-                            print("if4")
                     else:
                         user_id.added_amount = user_id.added_amount - amount
                         amount = 0
-                        print("if5")
                 else:
                     user_id.binary_income = user_id.binary_income - amount
                     amount = 0
-                    print("if6")
             else:
                 user_id.income = user_id.income - amount
                 amount = 0
             # user_id.save()
             y.new_funds += 10
             # y.save()
-            print('{}'.format(y))
+
+    def sendshopping(self, user):
+        s = user
+        try:
+            sx = Shopping.objects.get(user=s)
+            userid = User.objects.get(username=s)
+        except Exception as e:
+            self.stderr.write('shopping {}: {}'.format(s, e))
         
-        def sendshopping(user):
-            s = user
+
+        def finduplines(puser):
             try:
-                sx = Shopping.objects.get(user=s)
-                userid = User.objects.get(username=s)
-            except Exception as e:
-                input('wrong {}'.format(e))
-            
+                user = Shopping.objects.get(user=str(puser))
+                upline = user.direct
+            except Shopping.DoesNotExist:
+                upline = 'blank'
+            return upline
 
-            def finduplines(puser):
-                try:
-                    user = Shopping.objects.get(user=str(puser))
-                    upline = user.direct
-                except Shopping.DoesNotExist:
-                    upline = 'blank'
-                return upline
+        levels30 = {
+        'level1': 10,
+        'level2': 8,
+        'level3': 6,
+        'level4': 4,
+        'level5': 2,
+        'level6': 2,
+        'level7': 2,
+        }
 
-            levels30 = {
-            'level1': 10,
-            'level2': 8,
-            'level3': 6,
-            'level4': 4,
-            'level5': 2,
-            'level6': 2,
-            'level7': 2,
-            }
+        levels70 = {
+        'level1': 5,
+        'level2': 3,
+        'level3': 2,
+        'level4': 1,
+        'level5': 1,
+        'level6': 1,
+        'level7': 1,
+        }
+        
+        level = 0
+        try:
+            rect = Shopping.objects.get(user=s.direct)
+        except Exception as e:
+            rect = 'blank'
+        upline_user = rect
+        uplines = [upline_user, ]
+        while level < 6 and upline_user != 'blank':
+            upline_user = finduplines(str(upline_user))
+            uplines.append(upline_user)
+            level += 1
 
-            levels70 = {
-            'level1': 5,
-            'level2': 3,
-            'level3': 2,
-            'level4': 1,
-            'level5': 1,
-            'level6': 1,
-            'level7': 1,
-            }
-            
-            level = 0
+        level = 1
+        for upline in uplines:
             try:
-                rect = Shopping.objects.get(user=s.direct)
+                upline_user = User.objects.get(username=upline)
+                sp = Shopping.objects.get(user=str(upline_user))
+                directs = Shopping.objects.filter(amount__gt=1499, direct=str(upline_user)).count()
             except Exception as e:
-                rect = 'blank'
-            upline_user = rect
-            uplines = [upline_user, ]
-            while level < 6 and upline_user != 'blank':
-                upline_user = finduplines(str(upline_user))
-                uplines.append(upline_user)
-                level += 1
+                upline_user = 'blank'
+                directs = 0
+            if upline_user != 'blank' and directs >= level and sp.today_level_income <= 40000 and sp.amount >= 1500:
+                if sx.plan == 30:
+                    upline_amount = levels30['level{}'.format(level)]
+                else:
+                    upline_amount = levels70['level{}'.format(level)]
+                upline_user.shopping_wallet += upline_amount*0.9
+                upline_user.total_income  += upline_amount
+                upline_wallet = WalletHistories()
+                upline_wallet.user_id = upline
+                upline_wallet.amount = upline_amount
+                upline_wallet.balance_after = upline_user.new_funds + upline_user.added_amount + upline_user.received_amount + upline_user.shopping_wallet + upline_user.income + upline_user.binary_income
+                upline_wallet.type = "credit"
+                upline_wallet.comment = "Shopping Income from Level {}".format(level)
+                upline_wallet.category = categories.SHOPPING
+                sp.today_level_income += upline_amount
+                # sp.total_level_income += upline_amount
+                sp.save()
+                # upline_user.save()
+                # upline_wallet.save()
+            level = level + 1
 
-            level = 1
-            for upline in uplines:
-                try:
-                    upline_user = User.objects.get(username=upline)
-                    sp = Shopping.objects.get(user=str(upline_user))
-                    directs = Shopping.objects.filter(amount__gt=1499, direct=str(upline_user)).count()
-                except Exception as e:
-                    upline_user = 'blank'
-                    directs = 0
-                if upline_user != 'blank' and directs >= level and sp.today_level_income <= 40000 and sp.amount >= 1500:
-                    if sx.plan == 30:
-                        upline_amount = levels30['level{}'.format(level)]
-                    else:
-                        upline_amount = levels70['level{}'.format(level)]
-                    upline_user.shopping_wallet += upline_amount*0.9
-                    upline_user.total_income  += upline_amount
-                    upline_wallet = WalletHistories()
-                    upline_wallet.user_id = upline
-                    upline_wallet.amount = upline_amount
-                    upline_wallet.balance_after = upline_user.new_funds + upline_user.added_amount + upline_user.received_amount + upline_user.shopping_wallet + upline_user.income + upline_user.binary_income
-                    upline_wallet.type = "credit"
-                    upline_wallet.comment = "Shopping Income from Level {}".format(level)
-                    sp.today_level_income += upline_amount
-                    # sp.total_level_income += upline_amount
-                    sp.save()
-                    # upline_user.save()
-                    # upline_wallet.save()
-                level = level + 1
-        
-        start_date = datetime.datetime.now() + datetime.timedelta(-100)
-        end_date = datetime.datetime.now()
-        oldids = Shopping.objects.filter(expire_at__range=(start_date, end_date))
-        for odv in oldids:
-            odv.amount = 0
-            # odv.save()
-        newids = Shopping.objects.filter(amount__gte=1500)
-        self.stdout.write('{} jobs to complete'.format(newids.count()))
-        p = 0
-        level = 0
-        for idv in newids:
-            p += 1
-            level += 1
+    def pay_shopping(self, rows):
+        for idv in rows:
+            self.paid += 1
+            level = self.paid
             amount = idv.amount
             expiry_date = idv.expire_at
             user = User.objects.get(username=idv.user)
             total_income = user.income + user.binary_income + user.added_amount + user.received_amount + user.new_funds + user.shopping_wallet
             if True: 
-                sendshopping(idv)
+                self.sendshopping(idv)
                 directs = Shopping.objects.filter(amount__gte=1499, direct=str(idv.user)).count()
                 plan = str(idv.plan)
                 try:
                     sx = Shopping.objects.get(user=idv.user)
                     userid = User.objects.get(username=idv.user)
                 except Exception as e:
-                    input('wrong {}'.format(e))
+                    self.fail('shopping {}: {}'.format(idv.user, e))
                 if True:
                     sx.today_self_income = 50
                     # sx.total_self_income += 50
-                    print('------------------------------------------------sending-------------------------', sx)
                     sx.save()
                     user.shopping_wallet += 50*0.9
                     user.balance_after = total_income + 50*0.9
@@ -174,13 +153,13 @@ class Command(BaseCommand):
                     usewallet.amount = 50
                     usewallet.type = "credit"
                     usewallet.comment = "Shopping Self Earning"
-                    print('------------------------------------------------saveing-------------------------', userid)
+                    usewallet.category = categories.SHOPPING
                     # user.save()
                     # usewallet.save()
                 try:
                     prime = BinaryTree.objects.get(user=user.username)
                 except Exception as e:
-                    print('Not Found')
+                    prime = None
                 if plan == '30' and directs >= 2:
                     x = user.shopping_wallet
                     y = user.new_funds
@@ -241,4 +220,24 @@ class Command(BaseCommand):
                     model.account_number = payment_o.account_number
                     model.ifsc = payment_o.ifsc
                     # model.save()
-        self.stdout.write('job complete')
\ No newline at end of file
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.paid = 0
+        if self.begin('onhold', 'shopping'):
+            # the daily resets must not run again when resuming
+            all_shop = Shopping.objects.all()
+            all_user = User.objects.all()
+            all_user.update(imps_daily=0)
+            all_shop.update(today_level_income=0, today_self_income=0)
+        onhold_users = User.objects.all().annotate(on_hold=Sum(F('income') + F('binary_income') + F('added_amount') + F('received_amount'))).filter(on_hold__gte=10)
+        self.stdout.write('{} users with funds on hold'.format(onhold_users.count()))
+        self.run_stage('onhold', onhold_users, self.release_onhold)
+
+        start_date = datetime.datetime.now() + datetime.timedelta(-100)
+        end_date = datetime.datetime.now()
+        # Shopping.objects.filter(expire_at__range=(start_date, end_date)).update(amount=0)
+
+        newids = Shopping.objects.filter(amount__gte=1500)
+        self.run_stage('shopping', newids, self.pay_shopping)
+        self.stdout.write('job complete')
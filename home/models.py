@@ -23,3 +23,16 @@ class News(models.Model):
 
 	def __str__(self):
 		return self.news
+
+
+class BatchCheckpoint(models.Model):
+    """How far a ``home.batch`` job got, so an interrupted run can resume."""
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    rows = models.BigIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    started_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '{} at {}'.format(self.name, self.last_pk)
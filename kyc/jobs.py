@@ -0,0 +1,59 @@
+import datetime
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ImageUploadModel
+
+
+def stale_before():
+    """Processing rows last touched before this were lost with a stopped
+    reprocess_ocr run; after KYC_OCR_STALE_SECONDS (15 minutes)."""
+    seconds = getattr(settings, 'KYC_OCR_STALE_SECONDS', None) or 15 * 60
+    return timezone.now() - datetime.timedelta(seconds=seconds)
+
+
+def source(image):
+    """Where a worker reads ``image`` from: its file when stored locally, else its URL."""
+    try:
+        return image.path
+    except NotImplementedError:
+        return image.url
+
+
+def extract(front, back):
+    """Text read from both sides of the Aadhaar card."""
+    # imported here so the web process does not load the OCR libraries
+    from .ocr1 import ocr1
+    return {'front': ocr1(front), 'back': ocr1(back)}
+
+
+def result_fields(result=None, error=None):
+    if error is not None:
+        return {'ocr_status': ImageUploadModel.OCR_FAILED, 'ocr_error': str(error)[:2000],
+                'ocr_updated_at': timezone.now()}
+    return {'ocr_status': ImageUploadModel.OCR_DONE, 'ocr_result': json.dumps(result), 'ocr_error': '',
+            'ocr_updated_at': timezone.now()}
+
+
+def enqueue(upload):
+    """Queue OCR of ``upload`` and return at once.
+
+    OCR never runs in the web process: the row is marked pending and the
+    reprocess_ocr command, run as a worker, sets ``ocr_status`` done or failed.
+    """
+    ImageUploadModel.objects.filter(pk=upload.pk).update(
+        ocr_status=ImageUploadModel.OCR_PENDING, ocr_updated_at=timezone.now())
+    upload.ocr_status = ImageUploadModel.OCR_PENDING
+
+
+def process(upload):
+    """Run OCR of ``upload`` here and now, setting the result fields on it (unsaved)."""
+    try:
+        fields = result_fields(extract(source(upload.imageAF), source(upload.imageAB)))
+    except Exception as e:
+        fields = result_fields(error=e)
+    for name, value in fields.items():
+        setattr(upload, name, value)
+    return upload
@@ -0,0 +1,91 @@
+import json
+import os
+import time
+from difflib import SequenceMatcher
+
+import cv2
+import numpy as np
+import pytesseract
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from kyc import preprocess
+
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def similarity(text, expected):
+    return SequenceMatcher(None, ' '.join(text.split()), ' '.join(expected.split())).ratio()
+
+
+class Command(BaseCommand):
+    help = "Time OCR of the images under a directory with and without preprocessing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.MEDIA_ROOT)
+        parser.add_argument('--truth', help="JSON file mapping image paths (relative to --dir) to their expected text")
+        parser.add_argument('--width', type=int, default=preprocess.TARGET_WIDTH)
+        parser.add_argument('--preprocess-only', action='store_true', help="Skip Tesseract, time the preprocessing alone")
+
+    def images(self, root):
+        for folder, _, names in sorted(os.walk(root)):
+            for name in sorted(names):
+                if name.lower().endswith(EXTENSIONS):
+                    yield os.path.relpath(os.path.join(folder, name), root)
+
+    def read(self, image):
+        if self.options['preprocess_only']:
+            return ''
+        return pytesseract.image_to_string(image)
+
+    def raw(self, data):
+        # what kyc.ocr did before: the full image, only made gray
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+    def prepared(self, data):
+        return preprocess.prepare(data, self.options['width'])
+
+    def handle(self, *args, **options):
+        self.options = options
+        truth = {}
+        if options['truth']:
+            with open(options['truth'], encoding='utf-8') as f:
+                truth = json.load(f)
+        totals = {'raw': [], 'prepared': []}
+        scores = {'raw': [], 'prepared': []}
+        self.stdout.write('{:<50} {:>10} {:>10} {:>9} {:>9} {:>7} {:>7}'.format(
+            'image', 'raw px', 'prep px', 'raw ms', 'prep ms', 'raw', 'prep'))
+        for path in self.images(options['dir']):
+            with open(os.path.join(options['dir'], path), 'rb') as f:
+                data = f.read()
+            row = {}
+            for name, load in (('raw', self.raw), ('prepared', self.prepared)):
+                started = time.time()
+                try:
+                    image = load(data)
+                    if image is None:
+                        raise ValueError('not an image')
+                    text = self.read(image)
+                except Exception as e:
+                    self.stdout.write('{:<50} skipped: {}'.format(path[-50:], e))
+                    break
+                row[name] = ((time.time() - started) * 1000, image, text)
+            else:
+                # an image counts only once both passes read it, so the two
+                # sets of times and scores cover the same images
+                accuracy = []
+                for name in ('raw', 'prepared'):
+                    totals[name].append(row[name][0])
+                    if path in truth:
+                        scores[name].append(similarity(row[name][2], truth[path]))
+                    accuracy.append('{:.2f}'.format(scores[name][-1]) if path in truth else '-')
+                self.stdout.write('{:<50} {:>10} {:>10} {:>9.1f} {:>9.1f} {:>7} {:>7}'.format(
+                    path[-50:], row['raw'][1].size, row['prepared'][1].size, row['raw'][0], row['prepared'][0],
+                    *accuracy))
+        for name in ('raw', 'prepared'):
+            times = sorted(totals[name])
+            if not times:
+                continue
+            self.stdout.write('{:<9} {} images, mean {:.1f}ms, p95 {:.1f}ms{}'.format(
+                name, len(times), sum(times) / len(times), times[min(len(times) - 1, int(len(times) * 0.95))],
+                ', accuracy {:.2f}'.format(sum(scores[name]) / len(scores[name])) if scores[name] else ''))
@@ -0,0 +1,35 @@
+import os
+
+from django.db.models import Q
+from django.utils import timezone
+
+from home.batch import BatchCommand
+from kyc import jobs
+from kyc.models import ImageUploadModel
+
+
+class Command(BatchCommand):
+    help = ("Run OCR over the pending KYC uploads, spread over all cores; run it periodically, uploads only queue "
+            "the job. Uploads left processing by a run that went away are taken again once stale.")
+    chunk_size = 10
+    parallel = True
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(workers=os.cpu_count() or 1)
+        parser.add_argument('--all', action='store_true', help="Also redo the uploads already done")
+
+    def queryset(self):
+        uploads = ImageUploadModel.objects.all()
+        if not self.options['all']:
+            uploads = uploads.exclude(ocr_status=ImageUploadModel.OCR_DONE)
+        # recent processing rows are being read by another run
+        in_flight = Q(ocr_status=ImageUploadModel.OCR_PROCESSING, ocr_updated_at__gte=jobs.stale_before())
+        return uploads.exclude(in_flight)
+
+    def process_chunk(self, rows):
+        ImageUploadModel.objects.filter(pk__in=[upload.pk for upload in rows]).update(
+            ocr_status=ImageUploadModel.OCR_PROCESSING, ocr_updated_at=timezone.now())
+        for upload in rows:
+            jobs.process(upload)
+        ImageUploadModel.objects.bulk_update(rows, ['ocr_status', 'ocr_result', 'ocr_error', 'ocr_updated_at'])
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kyc', '0002_auto_20210714_1902'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageuploadmodel',
+            name='ocr_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='imageuploadmodel',
+            name='ocr_result',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='imageuploadmodel',
+            name='ocr_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='imageuploadmodel',
+            name='ocr_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
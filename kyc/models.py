@@ -4,6 +4,17 @@ from django.utils.html import mark_safe
 
 # Create your models here.
 class ImageUploadModel(models.Model):
+    OCR_PENDING = 'pending'
+    OCR_PROCESSING = 'processing'
+    OCR_DONE = 'done'
+    OCR_FAILED = 'failed'
+    OCR_STATUS_CHOICES = (
+        (OCR_PENDING, 'Pending'),
+        (OCR_PROCESSING, 'Processing'),
+        (OCR_DONE, 'Done'),
+        (OCR_FAILED, 'Failed'),
+    )
+
     description = models.CharField(max_length=255, blank=True)
     user = models.CharField(max_length=20, unique=True)
     imageAF = models.ImageField()
@@ -11,6 +22,11 @@ class ImageUploadModel(models.Model):
     name = models.CharField(max_length=100, null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     approved = models.NullBooleanField(null=True)
+    # filled in by kyc.jobs after the upload
+    ocr_status = models.CharField(max_length=10, choices=OCR_STATUS_CHOICES, blank=True, default='', db_index=True)
+    ocr_result = models.TextField(blank=True, default='')
+    ocr_error = models.TextField(blank=True, default='')
+    ocr_updated_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return self.user
@@ -14,22 +14,24 @@ import io
 import os
 from urllib.request import urlopen
 
+from .preprocess import prepare
+
+def read_image(source):
+    """
+    Bytes of the image at ``source``, a URL or a local file path.
+    """
+    if '://' in source:
+        return urlopen(source).read()
+    with open(source, 'rb') as f:
+        return f.read()
+
+
 def ocr(filename):  
     """
     This function will handle the core OCR processing of images.
     """
-    req = urlopen(filename)
-    arr = np.asarray(bytearray(req.read()), dtype=np.uint8)
-    i = cv2.imdecode(arr, -1)
-    
-    print(i)
-    # Convert to gray
-    i = cv2.cvtColor(i, cv2.COLOR_BGR2GRAY)
-
-    # Apply dilation and erosion to remove some noise
-    kernel = np.ones((1, 1), np.uint8)
-    i = cv2.dilate(i, kernel, iterations=1)
-    i = cv2.erode(i, kernel, iterations=1)
+    # Gray, card sized, cropped and straightened
+    i = prepare(read_image(filename))
     
     text = pytesseract.image_to_string(i)
     # return text
@@ -141,28 +143,6 @@ def ocr(filename):
     data['PAN'] = pan
 
     
-    # Writing data into JSON
-    try:
-        to_unicode = unicode
-    except NameError:
-        to_unicode = str
-
-    # Write JSON file
-    with io.open('data.json', 'w', encoding='utf-8') as outfile:
-        str_ = json.dumps(data, indent=4, sort_keys=True, separators=(',', ': '), ensure_ascii=False)
-        outfile.write(to_unicode(str_))
-
-    # Read JSON file
-    with open('data.json', encoding = 'utf-8') as data_file:
-        data_loaded = json.load(data_file)
-
-    # print(data == data_loaded)
-
-    # Reading data back JSON(give correct path where JSON is stored)
-    with open('data.json', 'r', encoding= 'utf-8') as f:
-        ndata = json.load(f)
-    
-
     t = {
     "Name": data['Name'],
     "Father's Name": data['Father Name'],
@@ -14,22 +14,15 @@ import io
 import os
 from urllib.request import urlopen
 
+from .ocr import read_image
+from .preprocess import prepare
+
 def ocr1(filename):  
     """
     This function will handle the core OCR processing of images.
     """
-    req = urlopen(filename)
-    arr = np.asarray(bytearray(req.read()), dtype=np.uint8)
-    i = cv2.imdecode(arr, -1)
-    
-    print(i)
-    # Convert to gray
-    i = cv2.cvtColor(i, cv2.COLOR_BGR2GRAY)
-
-    # Apply dilation and erosion to remove some noise
-    kernel = np.ones((1, 1), np.uint8)
-    i = cv2.dilate(i, kernel, iterations=1)
-    i = cv2.erode(i, kernel, iterations=1)
+    # Gray, card sized, cropped and straightened
+    i = prepare(read_image(filename))
     
     text = pytesseract.image_to_string(i)
     return text
@@ -10,6 +10,7 @@ from django.http import JsonResponse
 from django.conf import settings
 from .forms import ImageUploadForm
 from .models import ImageUploadModel
+from . import jobs
 # import our OCR function
 # from .ocr import ocr
 # from .ocr1 import ocr1
@@ -55,6 +56,7 @@ def ocr_core(request):
                 model.description = "Hurray! We are processing"
                 model.name = request.user.name
                 model.save()
+                jobs.enqueue(model)
                 imageURLAF = model.imageAF.url
                 imageURLAB = model.imageAB.url    
 
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class LevelConfig(AppConfig):
     name = 'level'
+
+    def ready(self):
+        import level.signals  # noqa F401
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('level', '0013_leveluser'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usertotal',
+            name='direct',
+            field=models.CharField(blank=True, db_index=True, max_length=25, null=True),
+        ),
+        migrations.AlterField(
+            model_name='usertotal',
+            name='user',
+            field=models.CharField(blank=True, db_index=True, max_length=25, null=True),
+        ),
+        migrations.CreateModel(
+            name='UserTree',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ancestor', models.CharField(max_length=25)),
+                ('descendant', models.CharField(db_index=True, max_length=25)),
+                ('depth', models.IntegerField()),
+                ('active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(blank=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='usertree',
+            index=models.Index(fields=['ancestor', 'depth', 'active'], name='level_usert_ancesto_5d1f0c_idx'),
+        ),
+    ]
@@ -27,11 +27,11 @@ class LevelIncomeSettings(models.Model):
     updated_at = models.DateTimeField(auto_now=True, blank=True)
 
 class UserTotal(models.Model):
-    user = models.CharField(max_length=25, blank=True, null=True)
+    user = models.CharField(max_length=25, blank=True, null=True, db_index=True)
     level = models.ForeignKey(LevelIncomeSettings, on_delete=models.CASCADE)
     active = models.BooleanField()
     left_months = models.IntegerField()
-    direct = models.CharField(max_length=25, blank=True, null=True)
+    direct = models.CharField(max_length=25, blank=True, null=True, db_index=True)
     business = models.IntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now, blank=True)
     updated_at = models.DateTimeField(auto_now=True, blank=True)
@@ -56,4 +56,26 @@ class UserTotal(models.Model):
             return 'not active'
 
     def __str__(self):
-        return str(self.user) 
\ No newline at end of file
+        return str(self.user) 
+
+
+class UserTree(models.Model):
+    """Closure table of the sponsor tree built from ``UserTotal.direct``.
+
+    One row per (ancestor, descendant) pair, so a whole level of a team is a
+    single indexed lookup instead of a walk down the tree.
+    """
+    ancestor = models.CharField(max_length=25)
+    descendant = models.CharField(max_length=25, db_index=True)
+    depth = models.IntegerField()
+    active = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now, blank=True)
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(fields=['ancestor', 'depth', 'active'], name='level_usert_ancesto_5d1f0c_idx'),
+        ]
+
+    def __str__(self):
+        return '{} > {} ({})'.format(self.ancestor, self.descendant, self.depth)
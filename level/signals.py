@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import tree
+from .models import UserTotal
+
+
+@receiver(post_save, sender=UserTotal)
+def sync_user_tree(sender, instance, **kwargs):
+    if instance.user:
+        tree.sync(instance.user, instance.direct)
+
+
+@receiver(post_delete, sender=UserTotal)
+def deactivate_user_tree(sender, instance, **kwargs):
+    if instance.user:
+        tree.set_active(str(instance.user))
@@ -0,0 +1,115 @@
+from django.db import connection
+
+from users.identity import IdentityMap, chunked
+from users.models import User
+
+from . import tree
+
+REFERRAL_TEAM_SQL = """
+WITH RECURSIVE team (id, username, depth) AS (
+    SELECT {id}, {username}, 1 FROM {table} WHERE {referral} = %s
+    UNION ALL
+    SELECT u.{id}, u.{username}, team.depth + 1
+    FROM {table} u INNER JOIN team ON u.{referral} = team.username
+    WHERE team.depth < %s
+)
+SELECT u.*, team.depth FROM team INNER JOIN {table} u ON u.{id} = team.id
+ORDER BY team.depth, u.{id}
+"""
+
+
+class Team(object):
+    """A downline grouped by level, level 1 being the direct referrals."""
+
+    def __init__(self, username, max_depth):
+        self.username = username
+        self.max_depth = max_depth
+        self.levels = [[] for _ in range(max_depth)]
+        self.users = {}
+        self.identity = None
+
+    def add(self, depth, member):
+        member.depth = depth
+        self.levels[depth - 1].append(member)
+
+    def level(self, depth):
+        return self.levels[depth - 1]
+
+    def count(self, depth):
+        return len(self.levels[depth - 1])
+
+    @property
+    def counts(self):
+        return {'{}'.format(depth): len(members) for depth, members in enumerate(self.levels, 1)}
+
+    @property
+    def members(self):
+        return [member for members in self.levels for member in members]
+
+    def pairs(self, depth):
+        """``(member, User)`` for a level, skipping members without a User row."""
+        return [(m, self.users[m.user]) for m in self.level(depth) if m.user in self.users]
+
+    def __len__(self):
+        return sum(len(members) for members in self.levels)
+
+
+def _referral_team_cte(team):
+    qn = connection.ops.quote_name
+    sql = REFERRAL_TEAM_SQL.format(
+        table=qn(User._meta.db_table),
+        id=qn(User._meta.pk.column),
+        username=qn(User._meta.get_field('username').column),
+        referral=qn(User._meta.get_field('referral').column),
+    )
+    seen = set()
+    for user in User.objects.raw(sql, [team.username, team.max_depth]):
+        # a broken referral chain can loop back, keep the shallowest hit
+        if user.pk not in seen and user.username != team.username:
+            seen.add(user.pk)
+            team.add(user.depth, user)
+
+
+def _referral_team_bfs(team):
+    seen = {team.username}
+    frontier = [team.username]
+    for depth in range(1, team.max_depth + 1):
+        found = []
+        for chunk in chunked(frontier):
+            found.extend(User.objects.filter(referral__in=chunk))
+        found = sorted((u for u in found if u.username not in seen), key=lambda u: u.pk)
+        if not found:
+            break
+        for user in found:
+            seen.add(user.username)
+            team.add(depth, user)
+        frontier = [u.username for u in found]
+
+
+def referral_team(username, max_depth=10):
+    """Users below ``username`` along ``User.referral``.
+
+    Uses one recursive query on PostgreSQL and one query per level (batched)
+    elsewhere.
+    """
+    team = Team(str(username), max_depth)
+    if connection.vendor == 'postgresql':
+        _referral_team_cte(team)
+    else:
+        _referral_team_bfs(team)
+    team.users = {u.username: u for u in team.members}
+    return team
+
+
+def direct_team(username, max_depth=tree.MAX_DEPTH):
+    """UserTotal rows below ``username`` read from the closure table.
+
+    The members' rows from the other tables are hydrated in ``team.identity``,
+    ``team.users`` maps usernames to User rows.
+    """
+    team = Team(str(username), max_depth)
+    for member in tree.members(team.username, max_depth):
+        team.add(member.depth, member)
+    team.identity = IdentityMap(m.user for m in team.members)
+    team.users = team.identity.users
+    return team
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import UserTotal, UserTree
+
+# Deepest level shown on the team pages; links further apart are not stored.
+MAX_DEPTH = 20
+
+
+def is_active(username):
+    return UserTotal.objects.filter(user=username, active=True).exists()
+
+
+def parent_of(username):
+    """Return the sponsor ``username`` is currently linked under, or None."""
+    return UserTree.objects.filter(descendant=username, depth=1).values_list('ancestor', flat=True).first()
+
+
+@transaction.atomic
+def move(username, direct):
+    """Re-attach ``username`` and its whole subtree under ``direct``.
+
+    Links from the old ancestors into the subtree are dropped and the subtree
+    is joined to every ancestor of ``direct``. Links inside the subtree are
+    left as they are.
+    """
+    subtree = [(username, 0, is_active(username))]
+    subtree += list(UserTree.objects.filter(ancestor=username).values_list('descendant', 'depth', 'active'))
+    members = [d for d, _, _ in subtree]
+
+    old_ancestors = list(UserTree.objects.filter(descendant=username).values_list('ancestor', flat=True))
+    if old_ancestors:
+        UserTree.objects.filter(ancestor__in=old_ancestors, descendant__in=members).delete()
+
+    if not direct:
+        return
+    ancestors = [(direct, 0)] + list(UserTree.objects.filter(descendant=direct).values_list('ancestor', 'depth'))
+    if any(a in members for a, _ in ancestors):
+        # the new sponsor sits inside the subtree, linking would make a cycle
+        return
+    rows = []
+    for ancestor, up in ancestors:
+        for descendant, down, active in subtree:
+            depth = up + down + 1
+            if depth <= MAX_DEPTH:
+                rows.append(UserTree(ancestor=ancestor, descendant=descendant, depth=depth, active=active))
+    UserTree.objects.bulk_create(rows, batch_size=500)
+
+
+def set_active(username):
+    UserTree.objects.filter(descendant=username).update(active=is_active(username))
+
+
+def sync(username, direct):
+    """Bring the closure rows of ``username`` in line with its UserTotal."""
+    username = str(username)
+    direct = str(direct) if direct else None
+    if direct == username:
+        direct = None
+    if parent_of(username) != direct:
+        move(username, direct)
+    set_active(username)
+
+
+@transaction.atomic
+def rebuild():
+    """Recreate the whole closure table from ``UserTotal.direct``."""
+    parents = {}
+    active = {}
+    for user, direct, is_on in UserTotal.objects.order_by('id').values_list('user', 'direct', 'active'):
+        if not user:
+            continue
+        if direct and direct != user:
+            parents[user] = direct
+        active[user] = active.get(user, False) or is_on
+
+    UserTree.objects.all().delete()
+    rows = []
+    for user in parents:
+        seen = {user}
+        ancestor = parents.get(user)
+        depth = 1
+        while ancestor and ancestor not in seen and depth <= MAX_DEPTH:
+            rows.append(UserTree(ancestor=ancestor, descendant=user, depth=depth, active=active.get(user, False)))
+            seen.add(ancestor)
+            ancestor = parents.get(ancestor)
+            depth += 1
+        if len(rows) >= 5000:
+            UserTree.objects.bulk_create(rows, batch_size=500)
+            rows = []
+    UserTree.objects.bulk_create(rows, batch_size=500)
+
+
+def members(username, max_depth=MAX_DEPTH):
+    """UserTotal rows below ``username`` annotated with their ``depth``."""
+    below = UserTree.objects.filter(ancestor=username, depth__lte=max_depth)
+    depth = UserTree.objects.filter(ancestor=username, descendant=OuterRef('user')).values('depth')[:1]
+    return (
+        UserTotal.objects.select_related('level')
+        .filter(user__in=below.values('descendant'))
+        .annotate(depth=Subquery(depth))
+        .order_by('depth', 'id')
+    )
+
@@ -0,0 +1,77 @@
+import os
+import gc
+import asyncio
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from metaapi_cloud_sdk import MemoryHistoryStorage, CompactMemoryHistoryStorage
+
+deal_count = int(os.getenv('DEAL_COUNT') or 1000000)
+query_repeats = int(os.getenv('QUERY_REPEATS') or 20)
+
+
+def generate_deals():
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    for i in range(deal_count):
+        yield {
+            'id': str(100000000 + i), 'platform': 'mt5', 'type': 'DEAL_TYPE_BUY' if i % 2 else 'DEAL_TYPE_SELL',
+            'time': start + timedelta(seconds=i * 60), 'brokerTime': (start + timedelta(seconds=i * 60 + 7200))
+            .strftime('%Y-%m-%d %H:%M:%S.000'), 'commission': -0.7, 'swap': 0.0, 'profit': (i % 200 - 100) / 10,
+            'symbol': 'EURUSD', 'magic': 1000, 'orderId': str(200000000 + i), 'positionId': str(300000000 + i // 2),
+            'volume': 0.1, 'price': 1.1 + (i % 1000) / 100000, 'entryType': 'DEAL_ENTRY_OUT' if i % 2 else
+            'DEAL_ENTRY_IN', 'reason': 'DEAL_REASON_EXPERT', 'accountCurrencyExchangeRate': 1.0
+        }
+
+
+class GeneratedHistoryDatabase:
+    """History database which returns generated deals instead of reading them from disk."""
+
+    async def load_history(self, account_id: str, application: str, start_time: datetime = None,
+                           end_time: datetime = None):
+        return {'deals': generate_deals(), 'historyOrders': []}
+
+
+async def load(storage_class):
+    storage = storage_class()
+    storage._historyDatabase = GeneratedHistoryDatabase()
+    await storage.initialize('accountId', 'MetaApi')
+    return storage
+
+
+async def measure(storage_class):
+    # memory is traced in a separate load, tracemalloc slows down both loading and queries
+    tracemalloc.start()
+    storage = await load(storage_class)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del storage
+    gc.collect()
+
+    started_at = time.perf_counter()
+    storage = await load(storage_class)
+    load_time = time.perf_counter() - started_at
+
+    # warm repeats with the collector off, so a query is not charged for a collection of the loaded deals
+    start_time = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    end_time = datetime(2020, 1, 8, tzinfo=timezone.utc)
+    deals = storage.get_deals_by_time_range(start_time, end_time)
+    query_times = []
+    gc.disable()
+    try:
+        for i in range(query_repeats):
+            started_at = time.perf_counter()
+            storage.get_deals_by_time_range(start_time, end_time)
+            query_times.append(time.perf_counter() - started_at)
+    finally:
+        gc.enable()
+    print(f'{storage_class.__name__}: {memory / 1024 / 1024:.1f} MB for {deal_count} deals, loaded in '
+          f'{load_time:.1f} s, {len(deals)} deals of a week returned in '
+          f'{statistics.median(query_times) * 1000:.2f} ms (median of {query_repeats})')
+
+
+async def benchmark():
+    await measure(MemoryHistoryStorage)
+    await measure(CompactMemoryHistoryStorage)
+
+asyncio.run(benchmark())
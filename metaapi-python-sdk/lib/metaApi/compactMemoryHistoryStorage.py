@@ -0,0 +1,409 @@
+from .memoryHistoryStorage import MemoryHistoryStorage
+from .models import MetatraderDeal, date
+from typing import Callable, List
+from datetime import datetime, timezone
+from array import array
+from math import isnan
+import asyncio
+
+NAN = float('nan')
+
+# deal fields with decimal string values, stored as integers
+ID_FIELDS = ('id', 'positionId', 'orderId')
+
+# deal fields with float values
+FLOAT_FIELDS = ('volume', 'price', 'commission', 'swap', 'profit', 'accountCurrencyExchangeRate', 'stopLoss',
+                'takeProfit')
+
+# deal fields with few distinct values, stored as indices in a table of values
+INTERNED_FIELDS = ('type', 'entryType', 'symbol', 'magic', 'platform', 'reason', 'comment', 'brokerComment')
+
+# deal fields with distinct string values, stored as references
+OBJECT_FIELDS = ('brokerTime', 'clientId')
+
+
+class DealColumns:
+    """Deals stored field by field in arrays, one row per deal.
+
+    A field value which does not fit its column (e.g. an id which is not a decimal number) is kept in a dictionary
+    of extra fields of the row, together with fields not listed in the columns.
+    """
+
+    def __init__(self):
+        """Inits empty columns."""
+        self.time = array('d')
+        self.ids = {field: array('q') for field in ID_FIELDS}
+        self.floats = {field: array('d') for field in FLOAT_FIELDS}
+        self.interned = {field: array('I') for field in INTERNED_FIELDS}
+        self.objects = {field: [] for field in OBJECT_FIELDS}
+        self.extras = []
+        self._values = [None]
+        self._indexByValue = {}
+
+    def __len__(self):
+        return len(self.time)
+
+    def append(self, deal: MetatraderDeal) -> int:
+        """Adds a row for a deal.
+
+        Args:
+            deal: Deal to add.
+
+        Returns:
+            Row number.
+        """
+        self.time.append(NAN)
+        for column in self.ids.values():
+            column.append(-1)
+        for column in self.floats.values():
+            column.append(NAN)
+        for column in self.interned.values():
+            column.append(0)
+        for column in self.objects.values():
+            column.append(None)
+        self.extras.append(None)
+        row = len(self.time) - 1
+        self.set(row, deal)
+        return row
+
+    def set(self, row: int, deal: MetatraderDeal):
+        """Replaces the fields of a row with fields of a deal.
+
+        Args:
+            row: Row number.
+            deal: Deal.
+        """
+        extras = {}
+        time = deal.get('time')
+        self.time[row] = NAN
+        if time is not None:
+            timestamp = self._timestamp(time)
+            if timestamp is None:
+                extras['time'] = time
+            else:
+                self.time[row] = timestamp
+        for field, column in self.ids.items():
+            value = deal.get(field)
+            column[row] = -1
+            if value is not None:
+                if isinstance(value, str) and value.isdigit() and str(int(value)) == value and \
+                        int(value) < 2 ** 63:
+                    column[row] = int(value)
+                else:
+                    extras[field] = value
+        for field, column in self.floats.items():
+            value = deal.get(field)
+            column[row] = NAN
+            if value is not None:
+                if type(value) is float and not isnan(value):
+                    column[row] = value
+                else:
+                    extras[field] = value
+        for field, column in self.interned.items():
+            value = deal.get(field)
+            column[row] = 0
+            if value is not None:
+                if type(value) in (str, int):
+                    column[row] = self._intern(value)
+                else:
+                    extras[field] = value
+        for field, column in self.objects.items():
+            column[row] = deal.get(field)
+        for field in deal.keys():
+            if field != 'time' and field not in self.ids and field not in self.floats and \
+                    field not in self.interned and field not in self.objects:
+                extras[field] = deal[field]
+            elif deal[field] is None:
+                extras[field] = None
+        self.extras[row] = extras or None
+
+    def get(self, row: int, field: str):
+        """Returns a field of a row.
+
+        Args:
+            row: Row number.
+            field: Field name.
+
+        Returns:
+            Field value, or None if the row has no such field.
+        """
+        extras = self.extras[row]
+        if extras is not None and field in extras:
+            return extras[field]
+        if field == 'time':
+            timestamp = self.time[row]
+            return None if isnan(timestamp) else datetime.fromtimestamp(timestamp, timezone.utc)
+        if field in self.ids:
+            value = self.ids[field][row]
+            return None if value < 0 else str(value)
+        if field in self.floats:
+            value = self.floats[field][row]
+            return None if isnan(value) else value
+        if field in self.interned:
+            return self._values[self.interned[field][row]]
+        if field in self.objects:
+            return self.objects[field][row]
+        return None
+
+    def timestamp(self, row: int) -> float:
+        """Returns the deal time of a row as a timestamp, 0 if the deal has no time.
+
+        Args:
+            row: Row number.
+
+        Returns:
+            Timestamp of the deal.
+        """
+        timestamp = self.time[row]
+        if isnan(timestamp):
+            time = self.get(row, 'time')
+            return time.timestamp() if time is not None else 0
+        return timestamp
+
+    def sort_key(self, row: int) -> tuple:
+        """Returns the sort key of a row, equal to the key of the deal in MemoryHistoryStorage.
+
+        Args:
+            row: Row number.
+
+        Returns:
+            Tuple of the deal timestamp, id and entry type.
+        """
+        if self.extras[row] is None:
+            timestamp = self.time[row]
+            entry_type = self._values[self.interned['entryType'][row]]
+            return 0 if isnan(timestamp) else timestamp, self.ids['id'][row], entry_type if entry_type is not None \
+                else ''
+        entry_type = self.get(row, 'entryType')
+        return self.timestamp(row), int(self.get(row, 'id')), entry_type if entry_type is not None else ''
+
+    def materialize(self, row: int) -> MetatraderDeal:
+        """Returns a row as a deal dictionary.
+
+        Args:
+            row: Row number.
+
+        Returns:
+            Deal.
+        """
+        deal = {}
+        if not isnan(self.time[row]):
+            deal['time'] = datetime.fromtimestamp(self.time[row], timezone.utc)
+        for field, column in self.ids.items():
+            if column[row] >= 0:
+                deal[field] = str(column[row])
+        for field, column in self.floats.items():
+            if not isnan(column[row]):
+                deal[field] = column[row]
+        for field, column in self.interned.items():
+            if column[row]:
+                deal[field] = self._values[column[row]]
+        for field, column in self.objects.items():
+            if column[row] is not None:
+                deal[field] = column[row]
+        if self.extras[row] is not None:
+            deal.update(self.extras[row])
+        return deal
+
+    def _intern(self, value) -> int:
+        key = (type(value), value)
+        index = self._indexByValue.get(key)
+        if index is None:
+            index = len(self._values)
+            self._values.append(value)
+            self._indexByValue[key] = index
+        return index
+
+    @staticmethod
+    def _timestamp(time) -> float or None:
+        if not isinstance(time, datetime) or time.utcoffset() is None or time.utcoffset().total_seconds() != 0:
+            return None
+        timestamp = time.timestamp()
+        return timestamp if datetime.fromtimestamp(timestamp, timezone.utc) == time else None
+
+
+class RowIndex:
+    """Row numbers sorted by a key computed from the row."""
+
+    def __init__(self, key: Callable[[int], tuple]):
+        """Inits an empty index.
+
+        Args:
+            key: Function returning the sort key of a row.
+        """
+        self.rows = array('I')
+        self._key = key
+
+    def bisect_left(self, key: tuple, key_fn: Callable[[int], tuple] = None) -> int:
+        """Returns the position of the first row with key not lower than the key.
+
+        Args:
+            key: Key to search.
+            key_fn: Function returning the key of a row to compare with, the sort key by default. It must order rows
+            the same way as the sort key does.
+
+        Returns:
+            Position in the index.
+        """
+        key_fn = key_fn or self._key
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key_fn(self.rows[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bisect_right(self, key: tuple, key_fn: Callable[[int], tuple] = None) -> int:
+        """Returns the position after the last row with key not greater than the key.
+
+        Args:
+            key: Key to search.
+            key_fn: Function returning the key of a row to compare with, the sort key by default.
+
+        Returns:
+            Position in the index.
+        """
+        key_fn = key_fn or self._key
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key < key_fn(self.rows[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def find(self, key: tuple) -> int or None:
+        """Returns the row with the key.
+
+        Args:
+            key: Sort key.
+
+        Returns:
+            Row number or None if there is no row with the key.
+        """
+        position = self.bisect_left(key)
+        if position < len(self.rows) and self._key(self.rows[position]) == key:
+            return self.rows[position]
+        return None
+
+    def insert(self, row: int):
+        """Adds a row, rows are mostly added in key order so this is usually an append.
+
+        Args:
+            row: Row number.
+        """
+        key = self._key(row)
+        if not len(self.rows) or self._key(self.rows[-1]) < key:
+            self.rows.append(row)
+        else:
+            self.rows.insert(self.bisect_right(key), row)
+
+    def remove(self, row: int):
+        """Removes a row.
+
+        Args:
+            row: Row number.
+        """
+        position = self.bisect_left(self._key(row))
+        while self.rows[position] != row:
+            position += 1
+        del self.rows[position]
+
+
+class CompactMemoryHistoryStorage(MemoryHistoryStorage):
+    """History storage which stores MetaTrader history in RAM, keeping deals in compact columns.
+
+    Deals take a fraction of the memory of MemoryHistoryStorage, which keeps each deal as a dictionary in several
+    maps, and are converted to dictionaries when returned. The conversion makes deal queries much slower than in
+    MemoryHistoryStorage, so use it for accounts with long deal history where memory matters more than query speed.
+    """
+
+    def get_deals_by_ticket(self, id: str) -> List[MetatraderDeal]:
+        """Returns deals by ticket id.
+
+        Args:
+            id: Ticket id.
+
+        Returns:
+            Deals found.
+        """
+        start = self._dealsByTicketIndex.bisect_left((id,))
+        end = self._dealsByTicketIndex.bisect_right((id, (float('inf'),)))
+        return list(map(self._dealColumns.materialize, self._dealsByTicketIndex.rows[start:end]))
+
+    def get_deals_by_position(self, position_id: str) -> List[MetatraderDeal]:
+        """Returns deals by position id.
+
+        Args:
+            position_id: Position id.
+
+        Returns:
+            Deals found.
+        """
+        start = self._dealsByPositionIndex.bisect_left((position_id,))
+        end = self._dealsByPositionIndex.bisect_right((position_id, (float('inf'),)))
+        return list(map(self._dealColumns.materialize, self._dealsByPositionIndex.rows[start:end]))
+
+    def get_deals_by_time_range(self, start_time: datetime, end_time: datetime) -> List[MetatraderDeal]:
+        """Returns deals by time range.
+
+        Args:
+            start_time: Start time, inclusive.
+            end_time: End time, inclusive.
+
+        Returns:
+            Deals found.
+        """
+        # deals without time are compared to the bounds as date(0), like in MemoryHistoryStorage
+        min_time = date(0).timestamp()
+
+        def bound_key(row):
+            return max(self._dealColumns.timestamp(row), min_time),
+
+        start = self._dealsByTimeIndex.bisect_left((start_time.timestamp(),), bound_key)
+        end = self._dealsByTimeIndex.bisect_right((end_time.timestamp(),), bound_key)
+        return list(map(self._dealColumns.materialize, self._dealsByTimeIndex.rows[start:end]))
+
+    def _reset(self):
+        super()._reset()
+        columns = DealColumns()
+        self._dealColumns = columns
+
+        def ticket_key(row):
+            return columns.get(row, 'id'), columns.sort_key(row)
+
+        def position_key(row):
+            return columns.get(row, 'positionId'), columns.sort_key(row)
+
+        self._dealsByTimeIndex = RowIndex(columns.sort_key)
+        self._dealsByTicketIndex = RowIndex(ticket_key)
+        self._dealsByPositionIndex = RowIndex(position_key)
+
+    async def _add_deal(self, deal, existing=False):
+        key = self._dealsComparator(deal)
+        rows = self._dealsByTimeIndex.rows
+        # deals are mostly loaded and received in time order, so a deal later than the last one is a new one
+        row = None if len(rows) and self._dealColumns.sort_key(rows[-1]) < key else self._dealsByTimeIndex.find(key)
+        new_deal = not existing and row is None
+        if row is None:
+            row = self._dealColumns.append(deal)
+            self._dealsByTimeIndex.insert(row)
+            self._dealsByTicketIndex.insert(row)
+        else:
+            if self._dealColumns.get(row, 'positionId') is not None:
+                self._dealsByPositionIndex.remove(row)
+            self._dealColumns.set(row, deal)
+        if 'positionId' in deal and deal['positionId'] is not None:
+            self._dealsByPositionIndex.insert(row)
+
+        if 'time' in deal and (self._maxDealTime is None or self._maxDealTime.timestamp() < deal['time'].timestamp()):
+            self._maxDealTime = deal['time']
+
+        if new_deal:
+            self._newDeals.append(deal)
+            if self._flushTimeout is not None:
+                self._flushTimeout.cancel()
+            self._flushTimeout = asyncio.create_task(self._flush_database_job(5))
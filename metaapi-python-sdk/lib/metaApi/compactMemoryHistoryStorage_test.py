@@ -0,0 +1,94 @@
+from .compactMemoryHistoryStorage import CompactMemoryHistoryStorage
+from .models import date
+from mock import AsyncMock
+from datetime import datetime
+import pytest
+storage: CompactMemoryHistoryStorage = None
+db = AsyncMock()
+
+
+@pytest.fixture(autouse=True)
+async def run_around_tests():
+    global storage
+    storage = CompactMemoryHistoryStorage()
+    storage._historyDatabase = db
+    await storage.initialize('accountId', 'MetaApi')
+    await storage.clear()
+    await storage.on_connected('vint-hill:1:ps-mpa-1', 1)
+
+
+class TestCompactMemoryHistoryStorage:
+    @pytest.mark.asyncio
+    async def test_load_data_from_file_manager(self):
+        """Should load data from the file manager."""
+        test_deal = {'id': '37863643', 'type': 'DEAL_TYPE_BALANCE', 'magic': 0, 'time': date(100),
+                     'commission': 0.0, 'swap': 0.0, 'profit': 10000, 'platform': 'mt5',
+                     'comment': 'Demo deposit 1'}
+        db.load_history = AsyncMock(return_value={'deals': [test_deal], 'historyOrders': []})
+        await storage.initialize('accountId', 'MetaApi')
+        assert storage.deals == [test_deal]
+
+    @pytest.mark.asyncio
+    async def test_return_saved_deals(self):
+        """Should return saved deals sorted by time and id."""
+        for deal in [
+            {'id': '1', 'time': date('2020-01-01T00:00:00.000Z'), 'positionId': '1', 'type': 'DEAL_TYPE_SELL',
+             'entryType': 'DEAL_ENTRY_IN', 'symbol': 'EURUSD', 'volume': 0.1, 'profit': 0.0},
+            {'id': '7', 'time': date('2020-05-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_BUY',
+             'entryType': 'DEAL_ENTRY_IN'},
+            {'id': '8', 'time': date('2020-02-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_SELL',
+             'entryType': 'DEAL_ENTRY_IN'},
+            {'id': '4', 'time': date('2020-02-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_SELL',
+             'entryType': 'DEAL_ENTRY_IN'},
+            {'id': '2', 'time': date('2020-08-01T00:00:00.000Z'), 'positionId': '1', 'type': 'DEAL_TYPE_BUY',
+             'entryType': 'DEAL_ENTRY_OUT', 'symbol': 'EURUSD', 'volume': 0.1, 'profit': -2.5},
+            {'id': '3', 'time': date('2020-09-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_BUY',
+             'entryType': 'DEAL_ENTRY_IN'}
+        ]:
+            await storage.on_deal_added('vint-hill:1:ps-mpa-1', deal)
+        assert list(map(lambda d: d['id'], storage.deals)) == ['1', '4', '8', '7', '2', '3']
+        assert storage.get_deals_by_ticket('1') == [
+            {'id': '1', 'time': date('2020-01-01T00:00:00.000Z'), 'positionId': '1', 'type': 'DEAL_TYPE_SELL',
+             'entryType': 'DEAL_ENTRY_IN', 'symbol': 'EURUSD', 'volume': 0.1, 'profit': 0.0}]
+        assert list(map(lambda d: d['id'], storage.get_deals_by_position('1'))) == ['1', '2']
+        assert storage.get_deals_by_position('2') == []
+        assert list(map(lambda d: d['id'], storage.get_deals_by_time_range(
+            date('2020-02-01T00:00:00.000Z'), date('2020-08-01T00:00:00.000Z')))) == ['4', '8', '7', '2']
+        assert (await storage.last_deal_time()) == date('2020-09-01T00:00:00.000Z')
+
+    @pytest.mark.asyncio
+    async def test_replace_updated_deal(self):
+        """Should replace a deal when it is added again with updated fields."""
+        await storage.on_deal_added('vint-hill:1:ps-mpa-1', {
+            'id': '1', 'time': date('2020-01-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_SELL',
+            'entryType': 'DEAL_ENTRY_IN', 'positionId': '1'})
+        await storage.on_deal_added('vint-hill:1:ps-mpa-1', {
+            'id': '1', 'time': date('2020-01-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_SELL',
+            'entryType': 'DEAL_ENTRY_IN', 'positionId': '2', 'comment': 'updated'})
+        assert storage.deals == [{'id': '1', 'time': date('2020-01-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_SELL',
+                                  'entryType': 'DEAL_ENTRY_IN', 'positionId': '2', 'comment': 'updated'}]
+        assert storage.get_deals_by_position('1') == []
+        assert len(storage.get_deals_by_position('2')) == 1
+
+    @pytest.mark.asyncio
+    async def test_keep_values_not_fitting_columns(self):
+        """Should return values which do not fit the columns unchanged."""
+        deal = {'id': '01', 'time': datetime(2020, 1, 1), 'type': 'DEAL_TYPE_BUY', 'positionId': 'abc',
+                'volume': 1, 'magic': 123, 'brokerTime': '2020-01-01 02:00:00.000', 'clientId': None,
+                'unknownField': {'a': 1}}
+        await storage.on_deal_added('vint-hill:1:ps-mpa-1', deal)
+        assert storage.get_deals_by_ticket('01') == [deal]
+        assert isinstance(storage.deals[0]['volume'], int)
+        assert storage.deals[0]['time'].tzinfo is None
+
+    @pytest.mark.asyncio
+    async def test_flush_new_deals(self):
+        """Should flush only new deals to the database."""
+        db.flush = AsyncMock()
+        await storage.on_deal_added('vint-hill:1:ps-mpa-1', {'id': '1', 'time': date('2020-01-01T00:00:00.000Z'),
+                                                             'type': 'DEAL_TYPE_SELL', 'entryType': 'DEAL_ENTRY_IN'})
+        await storage.on_deal_added('vint-hill:1:ps-mpa-1', {'id': '1', 'time': date('2020-01-01T00:00:00.000Z'),
+                                                             'type': 'DEAL_TYPE_SELL', 'entryType': 'DEAL_ENTRY_IN'})
+        await storage.on_deals_synchronized('vint-hill:1:ps-mpa-1', 'synchronizationId')
+        db.flush.assert_called_with('accountId', 'MetaApi', [], [
+            {'id': '1', 'time': '2020-01-01T00:00:00.000Z', 'type': 'DEAL_TYPE_SELL', 'entryType': 'DEAL_ENTRY_IN'}])
@@ -15,7 +15,8 @@ class ConnectionRegistry(ConnectionRegistryModel):
     """Manages account connections"""
 
     def __init__(self, meta_api_websocket_client: MetaApiWebsocketClient, client_api_client: ClientApiClient,
-                 application: str = 'MetaApi', refresh_subscriptions_opts: dict = None):
+                 application: str = 'MetaApi', refresh_subscriptions_opts: dict = None,
+                 quote_coalescing_interval_in_seconds: float = 0):
         """Inits a MetaTrader connection registry instance.
 
         Args:
@@ -23,12 +24,15 @@ class ConnectionRegistry(ConnectionRegistryModel):
             client_api_client: Client API client.
             application: Application type.
             refresh_subscriptions_opts: Subscriptions refresh options.
+            quote_coalescing_interval_in_seconds: Interval to coalesce price updates of streaming connections
+            within, 0 to disable.
         """
         refresh_subscriptions_opts = refresh_subscriptions_opts or {}
         self._meta_api_websocket_client = meta_api_websocket_client
         self._client_api_client = client_api_client
         self._application = application
         self._refresh_subscriptions_opts = refresh_subscriptions_opts
+        self._quote_coalescing_interval_in_seconds = quote_coalescing_interval_in_seconds
         self._rpcConnections = {}
         self._streamingConnections = {}
         self._connectionLocks = {}
@@ -48,7 +52,7 @@ class ConnectionRegistry(ConnectionRegistryModel):
         if account.id not in self._streamingConnections:
             self._streamingConnections[account.id] = StreamingMetaApiConnection(
                 self._meta_api_websocket_client, self._client_api_client, account, history_storage, self,
-                history_start_time, self._refresh_subscriptions_opts)
+                history_start_time, self._refresh_subscriptions_opts, self._quote_coalescing_interval_in_seconds)
 
         return StreamingMetaApiConnectionInstance(self._meta_api_websocket_client,
                                                   self._streamingConnections[account.id])
@@ -1,11 +1,28 @@
 import json
+import mmap
 import os
-from .models import format_date, convert_iso_time_to_date, string_format_error, MetatraderOrder, MetatraderDeal
+import struct
+from .models import format_date, convert_iso_time_to_date, string_format_error, MetatraderOrder, MetatraderDeal, \
+    date
 from typing import List
 from datetime import datetime
-from copy import deepcopy
 from ..logger import LoggerManager
 
+# file header: magic, format version
+HEADER = struct.Struct('<4sH2x')
+HEADER_MAGIC = b'MAHD'
+FORMAT_VERSION = 1
+
+# index entry: record time, record offset in the file, record length
+INDEX_ENTRY = struct.Struct('<dQI')
+
+# segment footer: offset of the first record, offset of the index, record count, min time, max time, magic
+FOOTER = struct.Struct('<QQIdd4s')
+FOOTER_MAGIC = b'MAHF'
+
+# files with more segments than this are rewritten as a single segment on load
+MAX_SEGMENTS = 64
+
 
 def stringify(obj: dict or List) -> str:
     """Helper function to convert an object to string and compress.
@@ -13,15 +30,37 @@ def stringify(obj: dict or List) -> str:
     Returns:
         Stringified and compressed object.
     """
-    return json.dumps(obj).replace('": ', '":').replace('}, {', '},{').replace(', "', ',"')
+    return json.dumps(obj, separators=(',', ':'), default=format_datetime)
+
+
+def format_datetime(value) -> str:
+    """Helper function to serialize datetime values of an object to string.
+
+    Returns:
+        Formatted date.
+    """
+    if isinstance(value, datetime):
+        return format_date(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
 
 
 class FilesystemHistoryDatabase:
-    """Provides access to history database stored on filesystem."""
+    """Provides access to history database stored on filesystem.
+
+    A history file consists of a header followed by segments, one per flush. A segment stores JSON records, an index
+    of fixed-width entries sorted by record time and a footer pointing to the records and to the index. Segments are
+    found by walking footers from the end of the file, so records of a time range can be read without decoding the
+    rest of the file. Files in the former newline-delimited JSON format are converted on first load.
+
+    A history storage flushes every few seconds while history is coming in, and each flush adds a segment with a
+    40 byte footer, 20 bytes of index per record and one index lookup per load. Once a file has more than MAX_SEGMENTS
+    segments it is compacted on load into one segment, copying the stored records without decoding them.
+    """
 
     def __init__(self):
         """Inits the class instance."""
         self._logger = LoggerManager.get_logger('FilesystemHistoryDatabase')
+        self._appendHandles = {}
 
     @staticmethod
     def get_instance():
@@ -35,25 +74,30 @@ class FilesystemHistoryDatabase:
             instance = FilesystemHistoryDatabase()
         return instance
 
-    async def load_history(self, account_id: str, application: str):
+    async def load_history(self, account_id: str, application: str, start_time: datetime = None,
+                           end_time: datetime = None):
         """Loads history from database.
 
         Args:
             account_id: Account id.
             application: Application name.
+            start_time: Time to load history from, inclusive, or None to load history from the beginning. Deals are
+            selected by time and history orders by done time.
+            end_time: Time to load history till, inclusive, or None to load history till the end.
 
         Returns:
-            Full account history.
+            Account history.
         """
         paths = await self._get_db_location(account_id, application)
-        deals = await self._read_db(account_id, paths['dealsFile'])
+        deals = await self._read_db(account_id, paths['dealsFile'], 'time', start_time, end_time)
         if len(deals) and isinstance(deals[0], list):
             await self.clear(account_id, application)
             deals = []
         for deal in deals:
             convert_iso_time_to_date(deal)
 
-        history_orders = await self._read_db(account_id, paths['historyOrdersFile'])
+        history_orders = await self._read_db(account_id, paths['historyOrdersFile'], 'doneTime', start_time,
+                                             end_time)
         if len(history_orders) and isinstance(history_orders[0], list):
             await self.clear(account_id, application)
             history_orders = []
@@ -76,10 +120,10 @@ class FilesystemHistoryDatabase:
             A coroutine resolving when the history is removed.
         """
         paths = await self._get_db_location(account_id, application)
-        if os.path.exists(paths['historyOrdersFile']):
-            os.remove(paths['historyOrdersFile'])
-        if os.path.exists(paths['dealsFile']):
-            os.remove(paths['dealsFile'])
+        for file in [paths['historyOrdersFile'], paths['dealsFile']]:
+            self._close_append_handle(file)
+            if os.path.exists(file):
+                os.remove(file)
 
     async def flush(self, account_id: str, application: str, new_history_orders: List[MetatraderOrder],
                     new_deals: List[MetatraderDeal]):
@@ -95,8 +139,8 @@ class FilesystemHistoryDatabase:
             A coroutine resolving when the history is flushed.
         """
         paths = await self._get_db_location(account_id, application)
-        await self._append_db(paths['historyOrdersFile'], self._prepare_save_data(new_history_orders))
-        await self._append_db(paths['dealsFile'], self._prepare_save_data(new_deals))
+        await self._append_db(paths['historyOrdersFile'], new_history_orders, 'doneTime')
+        await self._append_db(paths['dealsFile'], new_deals, 'time')
 
     async def _get_db_location(self, account_id: str, application: str):
         path = '.metaapi'
@@ -107,44 +151,177 @@ class FilesystemHistoryDatabase:
             'historyOrdersFile': path + f'/{account_id}-{application}-historyOrders.bin'
         }
 
-    async def _read_db(self, account_id: str, file: str):
+    async def _read_db(self, account_id: str, file: str, time_field: str, start_time: datetime = None,
+                       end_time: datetime = None):
         if not os.path.exists(file):
             return []
+        start = start_time.timestamp() if start_time else float('-inf')
+        end = end_time.timestamp() if end_time else float('inf')
+        rewritten = None
         try:
-            data = open(file).read()
-            lines = data.split('\n')
-            result = []
-            for line in lines:
-                if len(line):
-                    result.append(json.loads(line))
-            return result
+            with open(file, 'rb') as f:
+                if f.read(len(HEADER_MAGIC)) != HEADER_MAGIC:
+                    f.seek(0)
+                    records = self._parse_jsonl(f.read())
+                    if len(records) and isinstance(records[0], dict):
+                        rewritten = self._build_file(records, time_field)
+                        records = list(filter(
+                            lambda record: start <= self._get_timestamp(record.get(time_field)) <= end, records))
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        segments = self._find_segments(data)
+                        records = self._read_segments(data, segments, start, end)
+                        if len(segments) > MAX_SEGMENTS:
+                            rewritten = self._compact_segments(data, segments)
         except Exception as err:
             self._logger.warn(f'{account_id}: failed to read history db, will remove {file} now',
                               string_format_error(err))
+            self._close_append_handle(file)
             if os.path.exists(file):
                 os.remove(file)
             return []
+        if rewritten is not None:
+            self._replace_db(account_id, file, rewritten)
+        return records
+
+    def _find_segments(self, data: mmap.mmap) -> List[tuple]:
+        magic, version = HEADER.unpack_from(data, 0)
+        if version != FORMAT_VERSION:
+            raise Exception(f'unsupported history db format version {version}')
+        segments = []
+        position = len(data)
+        while position > HEADER.size:
+            if position < HEADER.size + FOOTER.size:
+                raise Exception(f'history db segment ending at {position} is corrupted')
+            records_offset, index_offset, count, min_time, max_time, magic = \
+                FOOTER.unpack_from(data, position - FOOTER.size)
+            if magic != FOOTER_MAGIC or index_offset + count * INDEX_ENTRY.size != position - FOOTER.size or \
+                    not HEADER.size <= records_offset <= index_offset:
+                raise Exception(f'history db segment ending at {position} is corrupted')
+            segments.append((records_offset, index_offset, count, min_time, max_time))
+            position = records_offset
+        segments.reverse()
+        return segments
+
+    def _read_segments(self, data: mmap.mmap, segments: List[tuple], start: float, end: float) -> List[dict]:
+        result = []
+        for records_offset, index_offset, count, min_time, max_time in segments:
+            if not count or min_time > end or max_time < start:
+                continue
+            for i in range(self._bisect_index(data, index_offset, count, start), count):
+                time, offset, length = INDEX_ENTRY.unpack_from(data, index_offset + i * INDEX_ENTRY.size)
+                if time > end:
+                    break
+                result.append(json.loads(data[offset:offset + length]))
+        return result
 
-    async def _append_db(self, file, records):
+    @staticmethod
+    def _bisect_index(data: mmap.mmap, index_offset: int, count: int, start: float) -> int:
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if INDEX_ENTRY.unpack_from(data, index_offset + mid * INDEX_ENTRY.size)[0] < start:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @staticmethod
+    def _parse_jsonl(data: bytes) -> List[dict]:
+        records = []
+        for line in data.decode('utf-8').split('\n'):
+            if len(line):
+                records.append(json.loads(line))
+        return records
+
+    def _build_file(self, records: List[dict], time_field: str) -> bytes:
+        return HEADER.pack(HEADER_MAGIC, FORMAT_VERSION) + self._build_segment(HEADER.size, records, time_field)
+
+    @staticmethod
+    def _compact_segments(data: mmap.mmap, segments: List[tuple]) -> bytes:
+        chunks = [HEADER.pack(HEADER_MAGIC, FORMAT_VERSION)]
+        entries = []
+        offset = HEADER.size
+        for records_offset, index_offset, count, min_time, max_time in segments:
+            shift = offset - records_offset
+            for i in range(count):
+                time, record_offset, length = INDEX_ENTRY.unpack_from(data, index_offset + i * INDEX_ENTRY.size)
+                entries.append((time, record_offset + shift, length))
+            chunks.append(data[records_offset:index_offset])
+            offset += index_offset - records_offset
+        entries.sort(key=lambda entry: entry[0])
+        chunks.extend(map(lambda entry: INDEX_ENTRY.pack(*entry), entries))
+        chunks.append(FOOTER.pack(HEADER.size, offset, len(entries), entries[0][0] if entries else 0,
+                                  entries[-1][0] if entries else 0, FOOTER_MAGIC))
+        return b''.join(chunks)
+
+    def _replace_db(self, account_id: str, file: str, content: bytes):
+        temp_file = file + '.tmp'
+        try:
+            with open(temp_file, 'wb') as f:
+                f.write(content)
+            self._close_append_handle(file)
+            os.replace(temp_file, file)
+        except Exception as err:
+            self._logger.warn(f'{account_id}: failed to rewrite history db {file}, will keep it as is',
+                              string_format_error(err))
+            try:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            except Exception:
+                pass
+
+    async def _append_db(self, file: str, records: List[dict], time_field: str):
         if records is not None and len(records):
-            records = list(map(lambda record: stringify(record) + '\n', records))
-            f = open(file, "a+")
-            f.write(''.join(records))
-            f.close()
-
-    def _prepare_save_data(self, arr: List[dict]):
-        arr = deepcopy(arr)
-
-        def convert_dates(item):
-            for key in item:
-                if isinstance(item[key], datetime):
-                    item[key] = format_date(item[key])
-                elif isinstance(item[key], dict):
-                    convert_dates(item[key])
-
-        for item in arr:
-            convert_dates(item)
-        return arr
+            handle = self._get_append_handle(file)
+            size = os.fstat(handle.fileno()).st_size
+            if not size:
+                handle.write(HEADER.pack(HEADER_MAGIC, FORMAT_VERSION))
+                size = HEADER.size
+            handle.write(self._build_segment(size, records, time_field))
+            handle.flush()
+
+    def _build_segment(self, records_offset: int, records: List[dict], time_field: str) -> bytes:
+        data = []
+        entries = []
+        offset = records_offset
+        for record in records:
+            encoded = stringify(record).encode('utf-8')
+            data.append(encoded)
+            entries.append((self._get_timestamp(record.get(time_field)), offset, len(encoded)))
+            offset += len(encoded)
+        entries.sort(key=lambda entry: entry[0])
+        data.extend(map(lambda entry: INDEX_ENTRY.pack(*entry), entries))
+        data.append(FOOTER.pack(records_offset, offset, len(entries), entries[0][0], entries[-1][0], FOOTER_MAGIC))
+        return b''.join(data)
+
+    def _get_append_handle(self, file: str):
+        handle = self._appendHandles.get(file)
+        # reopen the handle if the file was removed or replaced since it was opened
+        if handle is not None and (not os.path.exists(file) or
+                                   os.stat(file).st_ino != os.fstat(handle.fileno()).st_ino):
+            self._close_append_handle(file)
+            handle = None
+        if handle is None:
+            handle = open(file, 'ab')
+            self._appendHandles[file] = handle
+        return handle
+
+    def _close_append_handle(self, file: str):
+        handle = self._appendHandles.pop(file, None)
+        if handle is not None:
+            handle.close()
+
+    @staticmethod
+    def _get_timestamp(time: datetime or str or None) -> float:
+        if isinstance(time, datetime):
+            return time.timestamp()
+        if isinstance(time, str):
+            try:
+                return date(time).timestamp()
+            except Exception:
+                return 0
+        return 0
 
 
 instance = None
@@ -1,10 +1,10 @@
-from ..metaApi.filesystemHistoryDatabase import FilesystemHistoryDatabase
+from ..metaApi.filesystemHistoryDatabase import FilesystemHistoryDatabase, MAX_SEGMENTS
 from .memoryHistoryStorageModel import MemoryHistoryStorageModel
 import pytest
 import json
 import os
 from datetime import datetime
-from .models import MetatraderDeal, MetatraderOrder
+from .models import MetatraderDeal, MetatraderOrder, date
 from typing import List
 import shutil
 db: FilesystemHistoryDatabase or None = FilesystemHistoryDatabase()
@@ -198,3 +198,92 @@ class TestHistoryFileManager:
         data = await db.load_history('accountId', 'MetaApi')
         assert data['deals'] == [{'id': '1'}, {'id': '2'}]
         assert data['historyOrders'] == [{'id': '2'}, {'id': '3'}]
+
+    @pytest.mark.asyncio
+    async def test_migrate_jsonl_db(self):
+        """Should convert db in newline-delimited JSON format to segment format."""
+        await db.clear('accountId', 'MetaApi')
+        f = open('.metaapi/accountId-MetaApi-deals.bin', "w+")
+        f.write(json.dumps(test_deal) + '\n' + json.dumps(test_deal2) + '\n')
+        f.close()
+
+        data = await db.load_history('accountId', 'MetaApi')
+        assert list(map(lambda deal: deal['id'], data['deals'])) == ['37863643', '37863644']
+        assert open('.metaapi/accountId-MetaApi-deals.bin', 'rb').read(4) == b'MAHD'
+        await db.flush('accountId', 'MetaApi', [], [test_deal3])
+        data = await db.load_history('accountId', 'MetaApi')
+        assert list(map(lambda deal: deal['id'], data['deals'])) == ['37863643', '37863644', '37863645']
+        assert data['deals'][2]['time'] == date(test_deal3['time'])
+
+    @pytest.mark.asyncio
+    async def test_keep_jsonl_db_if_migration_fails(self):
+        """Should keep db in newline-delimited JSON format if it can not be converted."""
+        await db.clear('accountId', 'MetaApi')
+        f = open('.metaapi/accountId-MetaApi-deals.bin', "w+")
+        f.write(json.dumps(test_deal) + '\n' + json.dumps(test_deal2) + '\n')
+        f.close()
+        os.mkdir('.metaapi/accountId-MetaApi-deals.bin.tmp')
+
+        try:
+            data = await db.load_history('accountId', 'MetaApi')
+        finally:
+            os.rmdir('.metaapi/accountId-MetaApi-deals.bin.tmp')
+        assert list(map(lambda deal: deal['id'], data['deals'])) == ['37863643', '37863644']
+        assert open('.metaapi/accountId-MetaApi-deals.bin').read() == \
+            json.dumps(test_deal) + '\n' + json.dumps(test_deal2) + '\n'
+
+    @pytest.mark.asyncio
+    async def test_compact_db(self):
+        """Should compact db with many segments into one segment."""
+        await db.clear('accountId', 'MetaApi')
+        for i in range(MAX_SEGMENTS + 1):
+            await db.flush('accountId', 'MetaApi', [], [{'id': str(i), 'time': datetime.fromtimestamp(1000 - i)
+                                                         .isoformat()}])
+
+        data = await db.load_history('accountId', 'MetaApi')
+        assert list(map(lambda deal: deal['id'], data['deals'])) == list(map(str, range(MAX_SEGMENTS + 1)))
+        with open('.metaapi/accountId-MetaApi-deals.bin', 'rb') as f:
+            assert len(db._find_segments(f.read())) == 1
+        data = await db.load_history('accountId', 'MetaApi', date(datetime.fromtimestamp(1000 - 1).isoformat()))
+        assert list(map(lambda deal: deal['id'], data['deals'])) == ['1', '0']
+        await db.flush('accountId', 'MetaApi', [], [{'id': 'new', 'time': datetime.fromtimestamp(2000).isoformat()}])
+        data = await db.load_history('accountId', 'MetaApi', date(datetime.fromtimestamp(1000).isoformat()))
+        assert list(map(lambda deal: deal['id'], data['deals'])) == ['0', 'new']
+
+    @pytest.mark.asyncio
+    async def test_load_history_by_time_range(self):
+        """Should load only history within time range."""
+        await db.clear('accountId', 'MetaApi')
+        await db.flush('accountId', 'MetaApi', [test_order3, test_order], [test_deal3, test_deal])
+        await db.flush('accountId', 'MetaApi', [test_order2], [test_deal2])
+
+        data = await db.load_history('accountId', 'MetaApi', date(test_deal2['time']), date(test_deal3['time']))
+        assert list(map(lambda deal: deal['id'], data['deals'])) == ['37863645', '37863644']
+        assert list(map(lambda order: order['id'], data['historyOrders'])) == ['61210465', '61210464']
+        data = await db.load_history('accountId', 'MetaApi', end_time=date(test_deal2['time']))
+        assert list(map(lambda deal: deal['id'], data['deals'])) == ['37863643', '37863644']
+        assert list(map(lambda order: order['id'], data['historyOrders'])) == ['61210463', '61210464']
+
+    @pytest.mark.asyncio
+    async def test_flush_after_db_removed(self):
+        """Should create a new db file when flushing after the file was removed."""
+        await db.clear('accountId', 'MetaApi')
+        await db.flush('accountId', 'MetaApi', [], [{'id': '1'}])
+        os.remove('.metaapi/accountId-MetaApi-deals.bin')
+        await db.flush('accountId', 'MetaApi', [], [{'id': '2'}])
+
+        data = await db.load_history('accountId', 'MetaApi')
+        assert data['deals'] == [{'id': '2'}]
+
+    @pytest.mark.asyncio
+    async def test_remove_corrupted_db(self):
+        """Should remove db with a corrupted segment."""
+        await db.clear('accountId', 'MetaApi')
+        await db.flush('accountId', 'MetaApi', [], [{'id': '1'}])
+        f = open('.metaapi/accountId-MetaApi-deals.bin', 'ab')
+        f.write(b'{"id":"2"}')
+        f.close()
+
+        data = await db.load_history('accountId', 'MetaApi')
+        assert data['deals'] == []
+        assert not os.path.exists('.metaapi/accountId-MetaApi-deals.bin')
@@ -1,63 +1,57 @@
-import json
-from copy import copy
-from .models import format_date, date
-from datetime import datetime
+from bisect import bisect_left, bisect_right
+from typing import Callable, List, Tuple
+from .models import date
 
 
 class HistoryItemsMemoryStorage:
-    """Class to handle deals and history orders storage"""
-
-    def __init__(self, comparator):
-        self._items = {}
+    """Class to handle deals and history orders storage.
+
+    Items are kept in lists sorted by the comparator key, a tuple which starts with the item timestamp. Inserts and
+    deletes find their place by binary search, and a time range is a slice between two binary search positions.
+    """
+
+    def __init__(self, comparator: Callable[[dict], Tuple]):
+        """Inits the storage.
+
+        Args:
+            comparator: Function returning the sort key of an item, a tuple with the item timestamp (0 if the item has
+            no time) as the first element. Items with equal keys replace each other.
+        """
+        self._keys = []
+        self._times = []
+        self._items = []
         self._comparator = comparator
+        self._minTime = date(0).timestamp()
 
     def insert(self, key: dict, value: dict):
-        key = self._convert_key(key)
-        self._items[key] = value
+        key = self._comparator(key)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            self._items[index] = value
+        else:
+            self._keys.insert(index, key)
+            # items without time are compared to the bounds as date(0), which is later than timestamp 0
+            self._times.insert(index, max(key[0], self._minTime))
+            self._items.insert(index, value)
 
     def delete(self, key: dict):
-        key = self._convert_key(key)
-        if key in self._items:
-            del self._items[key]
-
-    def between_bounds(self, gte, lte):
-        found_items = []
-        for key in self._items.keys():
-            valid = True
-
-            item = self._items[key]
-
-            if lte:
-                for lte_key in lte.keys():
-                    lte_item = lte[lte_key]
-                    check_value = item[lte_key] if lte_key in item else date(0)
-
-                    if check_value.timestamp() > lte_item.timestamp():
-                        valid = False
-                        break
-
-            if not valid:
-                continue
-
-            if gte:
-                for gte_key in gte.keys():
-                    gte_item = gte[gte_key]
-                    check_value = item[gte_key] if gte_key in item else date(0)
-
-                    if check_value.timestamp() < gte_item.timestamp():
-                        valid = False
-                        break
-
-            if valid:
-                found_items.append(item)
-
-        sorted_items = sorted(found_items, key=self._comparator)
-        return sorted_items
-
-    @staticmethod
-    def _convert_key(key: dict) -> str:
-        key = copy(key)
-        for prop in key.keys():
-            if isinstance(key[prop], datetime):
-                key[prop] = format_date(key[prop])
-        return json.dumps(key)
+        key = self._comparator(key)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+            del self._times[index]
+            del self._items[index]
+
+    def between_bounds(self, gte: dict, lte: dict) -> List[dict]:
+        """Returns items with time within bounds, sorted by the comparator.
+
+        Args:
+            gte: Dictionary of the time field to its lower bound, inclusive, or None.
+            lte: Dictionary of the time field to its upper bound, inclusive, or None.
+
+        Returns:
+            Items found.
+        """
+        start = bisect_left(self._times, max(map(lambda t: t.timestamp(), gte.values()))) if gte else 0
+        end = bisect_right(self._times, min(map(lambda t: t.timestamp(), lte.values()))) if lte else len(self._times)
+        return self._items[start:end]
@@ -16,12 +16,13 @@ class HistoryStorage(SynchronizationListener, ABC):
         self._accountId = None
         self._application = None
 
-    async def initialize(self, account_id: str, application: str):
+    async def initialize(self, account_id: str, application: str, history_start_time: datetime = None):
         """Initializes the storage and loads required data from a persistent storage.
 
         Args:
             account_id: Account id.
             application: Application.
+            history_start_time: History start time of the connection, history before it does not need to be loaded.
 
         Returns:
             A coroutine resolving when history storage is initialized.
@@ -25,10 +25,14 @@ class MemoryHistoryStorage(MemoryHistoryStorageModel):
         self._reset()
         self._logger = LoggerManager.get_logger('MemoryHistoryStorage')
 
-    async def initialize(self, account_id: str, application: str = 'MetaApi'):
-        """Initializes the storage and loads required data from a persistent storage."""
-        await super(MemoryHistoryStorage, self).initialize(account_id, application)
-        history = await self._historyDatabase.load_history(account_id, application)
+    async def initialize(self, account_id: str, application: str = 'MetaApi', history_start_time: datetime = None):
+        """Initializes the storage and loads required data from a persistent storage.
+
+        Only history since history_start_time is loaded when it is set, using the time index of the database. Without
+        it the whole stored history is loaded.
+        """
+        await super(MemoryHistoryStorage, self).initialize(account_id, application, history_start_time)
+        history = await self._historyDatabase.load_history(account_id, application, history_start_time)
 
         for deal in history['deals']:
             await self._add_deal(deal, True)
@@ -230,7 +234,6 @@ class MemoryHistoryStorage(MemoryHistoryStorageModel):
                 deal['positionId'] in self._dealsByPosition else {}
             self._dealsByPosition[deal['positionId']][key] = deal
 
-        self._dealsByTime.delete(deal)
         self._dealsByTime.insert(deal, deal)
         if 'time' in deal and (self._maxDealTime is None or self._maxDealTime.timestamp() < deal['time'].timestamp()):
             self._maxDealTime = deal['time']
@@ -257,7 +260,6 @@ class MemoryHistoryStorage(MemoryHistoryStorageModel):
                 self._historyOrdersByPosition else {}
             self._historyOrdersByPosition[history_order['positionId']][key] = history_order
 
-        self._historyOrdersByTime.delete(history_order)
         self._historyOrdersByTime.insert(history_order, history_order)
         if 'doneTime' in history_order and (self._maxHistoryOrderTime is None or
                                             self._maxHistoryOrderTime.timestamp() <
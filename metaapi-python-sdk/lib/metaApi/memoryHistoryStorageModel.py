@@ -8,9 +8,9 @@ from datetime import datetime
 class MemoryHistoryStorageModel(HistoryStorage):
     """Abstract class which defines MetaTrader memory history storage interface."""
 
-    async def initialize(self, account_id: str, application: str):
+    async def initialize(self, account_id: str, application: str, history_start_time: datetime = None):
         """Initializes the storage and loads required data from a persistent storage."""
-        await super(MemoryHistoryStorageModel, self).initialize(account_id, application)
+        await super(MemoryHistoryStorageModel, self).initialize(account_id, application, history_start_time)
 
     @abstractmethod
     async def clear(self):
@@ -34,6 +34,13 @@ class TestMemoryHistoryStorage:
         assert storage.deals == [test_deal]
         assert storage.history_orders == [test_order]
 
+    @pytest.mark.asyncio
+    async def test_load_data_since_history_start_time(self):
+        """Should load data since history start time from the file manager."""
+        db.load_history = AsyncMock(return_value={'deals': [], 'historyOrders': []})
+        await storage.initialize('accountId', 'MetaApi', date(1000000))
+        db.load_history.assert_called_with('accountId', 'MetaApi', date(1000000))
+
     @pytest.mark.asyncio
     async def test_clear_storage(self):
         """Should clear db storage."""
@@ -146,6 +153,25 @@ class TestMemoryHistoryStorage:
              {'id': '3', 'time': date('2020-09-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_BUY',
               'entryType': 'DEAL_ENTRY_IN'}]
 
+    @pytest.mark.asyncio
+    async def test_replace_updated_deal(self):
+        """Should replace a deal when it is added again with updated fields."""
+        await storage.on_deal_added('vint-hill:1:ps-mpa-1', {'id': '1', 'time': date('2020-01-01T00:00:00.000Z'),
+                                                             'type': 'DEAL_TYPE_SELL', 'entryType': 'DEAL_ENTRY_IN'})
+        await storage.on_deal_added('vint-hill:1:ps-mpa-1', {'id': '2', 'time': date('2020-01-02T00:00:00.000Z'),
+                                                             'type': 'DEAL_TYPE_BUY', 'entryType': 'DEAL_ENTRY_IN'})
+        await storage.on_deal_added('vint-hill:1:ps-mpa-1', {'id': '1', 'time': date('2020-01-01T00:00:00.000Z'),
+                                                             'type': 'DEAL_TYPE_SELL', 'entryType': 'DEAL_ENTRY_IN',
+                                                             'comment': 'updated'})
+        assert storage.deals == [
+            {'id': '1', 'time': date('2020-01-01T00:00:00.000Z'), 'type': 'DEAL_TYPE_SELL',
+             'entryType': 'DEAL_ENTRY_IN', 'comment': 'updated'},
+            {'id': '2', 'time': date('2020-01-02T00:00:00.000Z'), 'type': 'DEAL_TYPE_BUY',
+             'entryType': 'DEAL_ENTRY_IN'}]
+        assert storage.get_deals_by_time_range(date('2020-01-02T00:00:00.000Z'), date('2020-01-03T00:00:00.000Z')) == \
+            [{'id': '2', 'time': date('2020-01-02T00:00:00.000Z'), 'type': 'DEAL_TYPE_BUY',
+              'entryType': 'DEAL_ENTRY_IN'}]
+
     @pytest.mark.asyncio
     async def test_return_saved_history_orders(self):
         """Should return saved historyOrders."""
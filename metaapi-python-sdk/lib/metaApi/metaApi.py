@@ -85,6 +85,9 @@ class MetaApiOpts(TypedDict, total=False):
     unsubscribeThrottlingIntervalInSeconds: Optional[float]
     """A timeout in seconds for throttling repeat unsubscribe
     requests when synchronization packets still arrive after unsubscription, default is 10 seconds"""
+    quoteCoalescingIntervalInSeconds: Optional[float]
+    """Interval in seconds streaming connections collect price updates within before applying the latest price of
+    each symbol to the terminal state in one batch, default is 0 (price updates are applied one by one)"""
 
 
 class MetaApi:
@@ -122,6 +125,9 @@ class MetaApi:
         use_shared_client_api = opts['useSharedClientApi'] if 'useSharedClientApi' in opts else False
         enable_socketio_debugger = opts['enableSocketioDebugger'] if 'enableSocketioDebugger' in opts else False
         refresh_subscriptions_opts = opts['refreshSubscriptionsOpts'] if 'refreshSubscriptionsOpts' in opts else {}
+        quote_coalescing_interval_in_seconds = validator.validate_number(
+            opts['quoteCoalescingIntervalInSeconds'] if 'quoteCoalescingIntervalInSeconds' in opts else None, 0,
+            'quoteCoalescingIntervalInSeconds')
         if not re.search(r"[a-zA-Z0-9_]+", application):
             raise ValidationException('Application name must be non-empty string consisting ' +
                                       'from letters, digits and _ only')
@@ -141,7 +147,7 @@ class MetaApi:
                 'unsubscribeThrottlingIntervalInSeconds': unsubscribe_throttling_interval_in_seconds})
         self._provisioningProfileApi = ProvisioningProfileApi(ProvisioningProfileClient(http_client, domain_client))
         self._connectionRegistry = ConnectionRegistry(self._metaApiWebsocketClient, client_api_client, application,
-                                                      refresh_subscriptions_opts)
+                                                      refresh_subscriptions_opts, quote_coalescing_interval_in_seconds)
         historical_market_data_client = HistoricalMarketDataClient(historical_market_data_http_client, domain_client)
         self._metatraderAccountApi = MetatraderAccountApi(MetatraderAccountClient(http_client, domain_client),
                                                           self._metaApiWebsocketClient, self._connectionRegistry,
@@ -555,7 +555,8 @@ class MetatraderAccount(MetatraderAccountModel):
 
         Args:
             history_storage: Optional history storage.
-            history_start_time: History start time. Used for tests.
+            history_start_time: History start time. Used for tests. History stored locally before it is not loaded
+            by the history storage.
 
         Returns:
             MetaApi connection.
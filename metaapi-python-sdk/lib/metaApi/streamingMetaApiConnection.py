@@ -56,7 +56,7 @@ class StreamingMetaApiConnection(MetaApiConnection):
     def __init__(self, websocket_client: MetaApiWebsocketClient, client_api_client: ClientApiClient,
                  account: MetatraderAccountModel, history_storage: HistoryStorage or None,
                  connection_registry: ConnectionRegistryModel, history_start_time: datetime = None,
-                 refresh_subscriptions_opts: dict = None):
+                 refresh_subscriptions_opts: dict = None, quote_coalescing_interval_in_seconds: float = 0):
         """Inits MetaApi MetaTrader streaming Api connection.
 
         Args:
@@ -67,6 +67,8 @@ class StreamingMetaApiConnection(MetaApiConnection):
             will be used.
             history_start_time: History start sync time.
             refresh_subscriptions_opts: Subscriptions refresh options.
+            quote_coalescing_interval_in_seconds: Interval to collect price updates within before applying the
+            latest price of each symbol to the terminal state in one batch, 0 to apply them as they arrive.
         """
         super().__init__(websocket_client, account)
         if refresh_subscriptions_opts is None:
@@ -82,7 +84,8 @@ class StreamingMetaApiConnection(MetaApiConnection):
         self._opened = False
         self._connection_registry = connection_registry
         self._history_start_time = history_start_time
-        self._terminalState = TerminalState(self._account.id, client_api_client)
+        self._terminalState = TerminalState(self._account.id, client_api_client,
+                                            quote_coalescing_interval_in_seconds)
         self._historyStorage = history_storage or MemoryHistoryStorage()
         self._healthMonitor = ConnectionHealthMonitor(self)
         self._websocketClient.add_synchronization_listener(account.id, self)
@@ -168,7 +171,12 @@ class StreamingMetaApiConnection(MetaApiConnection):
     async def initialize(self):
         """Initializes meta api connection"""
         self._check_is_connection_active()
-        await self._historyStorage.initialize(self._account.id, self._connection_registry.application)
+        if self._history_start_time:
+            # storages implemented before history_start_time was passed on accept only two arguments
+            await self._historyStorage.initialize(self._account.id, self._connection_registry.application,
+                                                  history_start_time=self._history_start_time)
+        else:
+            await self._historyStorage.initialize(self._account.id, self._connection_registry.application)
         self._websocketClient.add_account_cache(self._account.id, self._account.account_regions)
 
     async def subscribe(self):
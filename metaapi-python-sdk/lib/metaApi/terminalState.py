@@ -1,8 +1,7 @@
 from ..clients.metaApi.synchronizationListener import SynchronizationListener
 from .models import MetatraderAccountInformation, MetatraderPosition, MetatraderOrder, \
-    MetatraderSymbolSpecification, MetatraderSymbolPrice, G1Encoder, G2Encoder, QuoteTime
+    MetatraderSymbolSpecification, MetatraderSymbolPrice, G1Encoder, G2Encoder, QuoteTime, string_format_error
 from ..clients.metaApi.clientApi_client import ClientApiClient
-import functools
 from typing import List, Dict, Optional, Union
 from typing_extensions import TypedDict
 import asyncio
@@ -42,21 +41,123 @@ class TerminalStateHashes(TypedDict):
     ordersMd5: Union[str, None]
 
 
+class SymbolIndex:
+    """Positions and orders of a terminal state grouped by symbol, with the account equity they add up to.
+
+    A price tick only touches the positions and orders of its own symbol, so the index lets the tick find them
+    without scanning the whole state, and keeps the sum of position profits up to date by the change of the
+    positions it touched. Amounts are summed in integer cents, the precision equity is reported with.
+    """
+
+    def __init__(self, state: TerminalStateDict, version: int):
+        """Inits the index of a terminal state.
+
+        Args:
+            state: Terminal state to index.
+            version: Version of positions and orders the state is at.
+        """
+        self.state = state
+        self.version = version
+        self.positions = state['positions']
+        self.orders = state['orders']
+        self.positions_by_symbol = {}
+        self.orders_by_symbol = {}
+        self.unpriced_positions = []
+        self.profit_cents = 0
+        self.commission_cents = 0
+        self._cents_by_position = {}
+        for position in self.positions or []:
+            self.positions_by_symbol.setdefault(position['symbol'], []).append(position)
+            if 'unrealizedProfit' not in position:
+                self.unpriced_positions.append(position)
+            self._add(position)
+        for order in self.orders or []:
+            self.orders_by_symbol.setdefault(order['symbol'], []).append(order)
+
+    def is_valid(self, state: TerminalStateDict, version: int) -> bool:
+        """Returns whether the index still matches positions and orders of the state.
+
+        Args:
+            state: Terminal state.
+            version: Current version of positions and orders.
+
+        Returns:
+            Whether the index can be used for the state.
+        """
+        return self.state is state and self.version == version and self.positions is state['positions'] and \
+            self.orders is state['orders']
+
+    def contains(self, position: Dict) -> bool:
+        """Returns whether the position object is indexed.
+
+        Args:
+            position: Position.
+
+        Returns:
+            Whether the position is indexed.
+        """
+        return id(position) in self._cents_by_position
+
+    def refresh(self, position: Dict):
+        """Accounts for the change of position profit, swap and commission since the position was last seen.
+
+        Args:
+            position: Indexed position.
+        """
+        profit_cents, commission_cents = self._cents_by_position[id(position)]
+        self.profit_cents -= profit_cents
+        self.commission_cents -= commission_cents
+        self._add(position)
+
+    def equity(self, balance: float, platform: str) -> float:
+        """Returns equity of the account from balance and indexed positions.
+
+        Args:
+            balance: Account balance.
+            platform: Account platform, commission is included in equity on platforms other than mt5.
+
+        Returns:
+            Account equity.
+        """
+        cents = self.profit_cents if platform == 'mt5' else self.profit_cents + self.commission_cents
+        return balance + cents / 100
+
+    def _add(self, position: Dict):
+        profit_cents = self._cents(position, 'unrealizedProfit') + self._cents(position, 'swap')
+        commission_cents = self._cents(position, 'commission')
+        self._cents_by_position[id(position)] = (profit_cents, commission_cents)
+        self.profit_cents += profit_cents
+        self.commission_cents += commission_cents
+
+    @staticmethod
+    def _cents(position: Dict, field: str) -> int:
+        value = position.get(field)
+        return round((value if value is not None else 0) * 100)
+
+
 class TerminalState(SynchronizationListener):
     """Responsible for storing a local copy of remote terminal state."""
 
-    def __init__(self, account_id: str, client_api_client: ClientApiClient):
+    def __init__(self, account_id: str, client_api_client: ClientApiClient,
+                 quote_coalescing_interval_in_seconds: float = 0):
         """Inits the instance of terminal state class
 
         Args:
             account_id: Account id.
             client_api_client: Client API client.
+            quote_coalescing_interval_in_seconds: Interval to collect price updates within before applying them
+            in one batch, keeping only the latest price of each symbol. Default is 0, prices are applied as they
+            arrive.
         """
         super().__init__()
         self._accountId = account_id
         self._clientApiClient = client_api_client
+        self._quoteCoalescingInterval = quote_coalescing_interval_in_seconds
+        self._pendingQuotesByInstanceIndex = {}
         self._stateByInstanceIndex = {}
         self._waitForPriceResolves = {}
+        self._symbolIndexes = {}
+        self._symbolIndexVersion = 0
         self._combinedState = {
             'accountInformation': None,
             'positions': [],
@@ -324,6 +425,7 @@ class TerminalState(SynchronizationListener):
         Returns:
              A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         state = self._get_state(instance_index)
         state['connected'] = False
         state['connectedToBroker'] = False
@@ -355,6 +457,7 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         unsynchronized_states = list(filter(
             lambda state_index: not self._stateByInstanceIndex[state_index]['ordersInitialized'],
             self._get_state_indices_of_same_instance_number(instance_index)))
@@ -403,6 +506,7 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
         state['accountInformation'] = account_information
@@ -419,10 +523,12 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
         state['positions'] = positions
         state['positionsHash'] = None
+        self._symbolIndexVersion += 1
 
     async def on_positions_synchronized(self, instance_index: str, synchronization_id: str):
         """Invoked when position synchronization finished to indicate progress of an initial terminal state
@@ -446,9 +552,11 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         instance_state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
         instance_state['positionsHash'] = None
+        self._symbolIndexVersion += 1
 
         def update_position(state):
             is_exists = False
@@ -472,9 +580,11 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         instance_state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
         instance_state['positionsHash'] = None
+        self._symbolIndexVersion += 1
 
         def remove_position(state):
             position = next((p for p in state['positions'] if p['id'] == position_id), None)
@@ -500,10 +610,12 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
         state['ordersHash'] = None
         state['orders'] = orders
+        self._symbolIndexVersion += 1
 
     async def on_pending_orders_synchronized(self, instance_index: str, synchronization_id: str):
         """Invoked when pending order synchronization finished to indicate progress of an initial terminal state
@@ -516,6 +628,7 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         state = self._get_state(instance_index)
         state['completedOrders'] = {}
         state['positionsInitialized'] = True
@@ -523,6 +636,7 @@ class TerminalState(SynchronizationListener):
         self._combinedState['accountInformation'] = copy(state['accountInformation']) if state['accountInformation'] \
             else None
 
+        self._symbolIndexVersion += 1
         self._combinedState['positions'] = state['positions'] or []
         for i in range(len(self._combinedState['positions'])):
             self._combinedState['positions'][i] = copy(self._combinedState['positions'][i])
@@ -556,9 +670,11 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         instance_state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
         instance_state['ordersHash'] = None
+        self._symbolIndexVersion += 1
 
         def update_pending_order(state):
             is_exists = False
@@ -583,9 +699,11 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         instance_state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
         instance_state['ordersHash'] = None
+        self._symbolIndexVersion += 1
 
         def complete_order(state):
             order = next((p for p in state['orders'] if p['id'] == order_id), None)
@@ -613,6 +731,7 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         instance_state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
         instance_state['specificationsHash'] = None
@@ -649,12 +768,60 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        if self._quoteCoalescingInterval:
+            self._coalesce_quotes(instance_index, prices, equity, margin, free_margin, margin_level)
+        else:
+            self._update_symbol_prices(instance_index, prices, equity, margin, free_margin, margin_level)
+
+    def _coalesce_quotes(self, instance_index: str, prices: List[MetatraderSymbolPrice], equity: float = None,
+                         margin: float = None, free_margin: float = None, margin_level: float = None):
+        pending = self._pendingQuotesByInstanceIndex.get(instance_index)
+        if pending is None:
+            pending = {'prices': {}, 'equity': None, 'margin': None, 'freeMargin': None, 'marginLevel': None}
+            pending['flushTask'] = asyncio.create_task(self._flush_quotes_job(instance_index))
+            self._pendingQuotesByInstanceIndex[instance_index] = pending
+        for price in prices:
+            current_price = pending['prices'].get(price['symbol'])
+            if current_price is None or current_price['time'].timestamp() <= price['time'].timestamp():
+                pending['prices'][price['symbol']] = price
+        pending['equity'] = equity
+        if margin:
+            pending['margin'] = margin
+        if free_margin:
+            pending['freeMargin'] = free_margin
+            pending['marginLevel'] = margin_level
+
+    async def _flush_quotes_job(self, instance_index: str):
+        await asyncio.sleep(self._quoteCoalescingInterval)
+        pending = self._pendingQuotesByInstanceIndex.get(instance_index)
+        if pending is not None:
+            # the batch is being applied by this task, it must not be cancelled by the flush
+            pending['flushTask'] = None
+        try:
+            self._flush_quotes(instance_index)
+        except Exception as err:
+            self._logger.error(f'{self._accountId}:{instance_index}: failed to apply coalesced prices ' +
+                               string_format_error(err))
+
+    def _flush_quotes(self, instance_index: str):
+        """Applies price updates collected for an instance, so that other events apply after them in the order
+        they arrived."""
+        if instance_index not in self._pendingQuotesByInstanceIndex:
+            return
+        pending = self._pendingQuotesByInstanceIndex.pop(instance_index)
+        if pending['flushTask'] is not None:
+            pending['flushTask'].cancel()
+        self._update_symbol_prices(instance_index, list(pending['prices'].values()), pending['equity'],
+                                   pending['margin'], pending['freeMargin'], pending['marginLevel'])
+
+    def _update_symbol_prices(self, instance_index: str, prices: List[MetatraderSymbolPrice], equity: float = None,
+                              margin: float = None, free_margin: float = None, margin_level: float = None):
         instance_state = self._get_state(instance_index)
         self._refresh_state_update_time(instance_index)
 
         def update_symbol_prices(state):
             state['lastUpdateTime'] = max(map(lambda p: p['time'].timestamp(), prices)) if len(prices) else 0
-            prices_initialized = False
+            index = self._get_symbol_index(state)
             price_updated = False
             if prices:
                 for price in prices:
@@ -672,20 +839,19 @@ class TerminalState(SynchronizationListener):
                         state['lastQuoteBrokerTime'] = price['brokerTime']
 
                     state['pricesBySymbol'][price['symbol']] = price
-                    positions = list(filter(lambda p: p['symbol'] == price['symbol'], state['positions']))
-                    other_positions = list(filter(lambda p: p['symbol'] != price['symbol'], state['positions']))
-                    orders = list(filter(lambda o: o['symbol'] == price['symbol'], state['orders']))
-                    prices_initialized = True
-                    for position in other_positions:
-                        if position['symbol'] in state['pricesBySymbol']:
-                            p = state['pricesBySymbol'][position['symbol']]
-                            if 'unrealizedProfit' not in position:
-                                self._update_position_profits(position, p)
-                        else:
-                            prices_initialized = False
-                    for position in positions:
+                    if index.unpriced_positions:
+                        for position in index.unpriced_positions:
+                            if position['symbol'] != price['symbol'] and \
+                                    position['symbol'] in state['pricesBySymbol'] and \
+                                    'unrealizedProfit' not in position:
+                                self._update_position_profits(position, state['pricesBySymbol'][position['symbol']])
+                            self._refresh_position(position)
+                        index.unpriced_positions = list(filter(lambda p: 'unrealizedProfit' not in p,
+                                                               index.unpriced_positions))
+                    for position in index.positions_by_symbol.get(price['symbol'], []):
                         self._update_position_profits(position, price)
-                    for order in orders:
+                        self._refresh_position(position)
+                    for order in index.orders_by_symbol.get(price['symbol'], []):
                         order['currentPrice'] = price['ask'] if (order['type'] == 'ORDER_TYPE_BUY' or
                                                                  order['type'] == 'ORDER_TYPE_BUY_LIMIT' or
                                                                  order['type'] == 'ORDER_TYPE_BUY_STOP' or
@@ -699,27 +865,13 @@ class TerminalState(SynchronizationListener):
                             if not resolve.done():
                                 resolve.set_result(True)
                         del self._waitForPriceResolves[price['symbol']]
+            prices_initialized = price_updated and \
+                all(symbol in state['pricesBySymbol'] for symbol in index.positions_by_symbol)
             if price_updated and state['accountInformation']:
                 if state['positionsInitialized'] and prices_initialized:
-                    if state['accountInformation']['platform'] == 'mt5':
-                        state['accountInformation']['equity'] = equity if equity is not None else \
-                            state['accountInformation']['balance'] + \
-                            functools.reduce(lambda a, b: a + round((b['unrealizedProfit'] if
-                                                                     'unrealizedProfit' in b and
-                                                                     b['unrealizedProfit'] is not None
-                                                                     else 0) * 100) / 100 +
-                                             round((b['swap'] if 'swap' in b and b['swap'] is not None
-                                                    else 0) * 100) / 100, state['positions'], 0)
-                    else:
-                        state['accountInformation']['equity'] = equity if equity is not None else \
-                            state['accountInformation']['balance'] + \
-                            functools.reduce(
-                            lambda a, b: a + round((b['swap'] if 'swap' in b and b['swap'] is not None
-                                                    else 0) * 100) / 100 +
-                            round((b['commission'] if 'commission' in b and b['commission'] is not None
-                                   else 0) * 100) / 100 +
-                            round((b['unrealizedProfit'] if 'unrealizedProfit' in b and b['unrealizedProfit'] is
-                                                            not None else 0) * 100) / 100, state['positions'], 0)
+                    state['accountInformation']['equity'] = equity if equity is not None else \
+                        index.equity(state['accountInformation']['balance'],
+                                     state['accountInformation']['platform'])
                     state['accountInformation']['equity'] = round(state['accountInformation']['equity'] * 100) / 100
                 else:
                     state['accountInformation']['equity'] = equity if equity else (
@@ -743,6 +895,7 @@ class TerminalState(SynchronizationListener):
         Returns:
             A coroutine which resolves when the asynchronous event is processed.
         """
+        self._flush_quotes(instance_index)
         if instance_index in self._stateByInstanceIndex:
             for state_index in self._get_state_indices_of_same_instance_number(instance_index):
                 instance_state = self._stateByInstanceIndex[state_index]
@@ -796,6 +949,20 @@ class TerminalState(SynchronizationListener):
             position['currentPrice'] = new_position_price
             position['currentTickValue'] = current_tick_value
 
+    def _get_symbol_index(self, state: TerminalStateDict) -> SymbolIndex:
+        key = state.get('instanceIndex')
+        index = self._symbolIndexes.get(key)
+        if index is None or not index.is_valid(state, self._symbolIndexVersion):
+            index = SymbolIndex(state, self._symbolIndexVersion)
+            self._symbolIndexes[key] = index
+        return index
+
+    def _refresh_position(self, position: Dict):
+        # states share position objects, so every index holding the position has to see the change
+        for index in self._symbolIndexes.values():
+            if index.contains(position):
+                index.refresh(position)
+
     def _get_state(self, instance_index: str) -> TerminalStateDict:
         if str(instance_index) not in self._stateByInstanceIndex:
             self._logger.debug(f'{self._accountId}:{instance_index}: constructed new state')
@@ -232,6 +232,101 @@ class TestTerminalState:
         assert list(map(lambda p: p['currentPrice'], state.positions)) == [10, 10]
         assert state.account_information['equity'] == 1200
 
+    @pytest.mark.asyncio
+    async def test_keep_equity_up_to_date_when_positions_change_between_prices(self):
+        """Should keep account equity up to date when positions change between price updates."""
+        await state.on_account_information_updated('vint-hill:1:ps-mpa-1',
+                                                   {'equity': 1000, 'balance': 800, 'platform': 'mt5'})
+        await state.on_positions_replaced('vint-hill:1:ps-mpa-1', [{
+            'id': '1',
+            'symbol': 'EURUSD',
+            'type': 'POSITION_TYPE_BUY',
+            'currentPrice': 9,
+            'currentTickValue': 0.5,
+            'openPrice': 8,
+            'profit': 100,
+            'unrealizedProfit': 100,
+            'realizedProfit': 0,
+            'swap': 1.5,
+            'volume': 2
+        }])
+        await state.on_pending_orders_synchronized('vint-hill:1:ps-mpa-1', 'synchronizationId')
+        await state.on_symbol_specifications_updated('vint-hill:1:ps-mpa-1', [
+            {'symbol': 'EURUSD', 'tickSize': 0.01, 'digits': 5}, {'symbol': 'AUDUSD', 'tickSize': 0.01, 'digits': 5}],
+                                                     [])
+
+        def price(symbol, bid):
+            return {'time': datetime.now(), 'brokerTime': '2022-01-01 02:00:00.000', 'symbol': symbol,
+                    'profitTickValue': 0.5, 'lossTickValue': 0.5, 'bid': bid, 'ask': bid + 1}
+        await state.on_symbol_prices_updated('vint-hill:1:ps-mpa-1', [price('EURUSD', 10)])
+        assert state.account_information['equity'] == 1001.5
+        await state.on_position_updated('vint-hill:1:ps-mpa-1', {
+            'id': '2',
+            'symbol': 'AUDUSD',
+            'type': 'POSITION_TYPE_SELL',
+            'currentPrice': 9,
+            'currentTickValue': 0.5,
+            'openPrice': 9,
+            'profit': 0,
+            'volume': 1
+        })
+        await state.on_symbol_prices_updated('vint-hill:1:ps-mpa-1', [price('EURUSD', 11)])
+        assert state.account_information['equity'] == 1001.5
+        await state.on_symbol_prices_updated('vint-hill:1:ps-mpa-1', [price('AUDUSD', 8)])
+        assert state.account_information['equity'] == 1101.5
+        await state.on_position_removed('vint-hill:1:ps-mpa-1', '1')
+        await state.on_symbol_prices_updated('vint-hill:1:ps-mpa-1', [price('AUDUSD', 7)])
+        assert state.account_information['equity'] == 850
+
+    @pytest.mark.asyncio
+    async def test_coalesce_price_updates(self):
+        """Should apply the latest price of each symbol once per coalescing interval."""
+        coalescing_state = TerminalState('accountId', MagicMock(), 0.05)
+        await coalescing_state.on_account_information_updated('vint-hill:1:ps-mpa-1', {
+            'equity': 1000, 'balance': 800, 'platform': 'mt5'})
+        await coalescing_state.on_positions_replaced('vint-hill:1:ps-mpa-1', [{
+            'id': '1',
+            'symbol': 'EURUSD',
+            'type': 'POSITION_TYPE_BUY',
+            'currentPrice': 9,
+            'currentTickValue': 0.5,
+            'openPrice': 8,
+            'profit': 100,
+            'volume': 2
+        }])
+        await coalescing_state.on_pending_orders_synchronized('vint-hill:1:ps-mpa-1', 'synchronizationId')
+        await coalescing_state.on_symbol_specifications_updated('vint-hill:1:ps-mpa-1', [
+            {'symbol': 'EURUSD', 'tickSize': 0.01, 'digits': 5}], [])
+        update_position_profits = MagicMock(wraps=coalescing_state._update_position_profits)
+        coalescing_state._update_position_profits = update_position_profits
+        for bid in [10, 12, 11]:
+            await coalescing_state.on_symbol_prices_updated('vint-hill:1:ps-mpa-1', [{
+                'time': datetime.now(), 'brokerTime': '2022-01-01 02:00:00.000', 'symbol': 'EURUSD',
+                'profitTickValue': 0.5, 'lossTickValue': 0.5, 'bid': bid, 'ask': bid + 1}], None, 200)
+        assert coalescing_state.price('EURUSD') is None
+        assert coalescing_state.account_information['equity'] == 1000
+        await asyncio.sleep(0.1)
+        assert coalescing_state.price('EURUSD')['bid'] == 11
+        assert coalescing_state.positions[0]['unrealizedProfit'] == 300
+        assert coalescing_state.account_information['equity'] == 1100
+        assert coalescing_state.account_information['margin'] == 200
+        assert update_position_profits.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_apply_coalesced_prices_before_other_events(self):
+        """Should apply coalesced prices before applying a following event."""
+        coalescing_state = TerminalState('accountId', MagicMock(), 10)
+        await coalescing_state.on_pending_order_updated('vint-hill:1:ps-mpa-1', {
+            'id': '1', 'symbol': 'EURUSD', 'type': 'ORDER_TYPE_BUY_LIMIT', 'currentPrice': 9})
+        await coalescing_state.on_symbol_prices_updated('vint-hill:1:ps-mpa-1', [{
+            'time': datetime.now(), 'brokerTime': '2022-01-01 02:00:00.000', 'symbol': 'EURUSD', 'bid': 10,
+            'ask': 11}])
+        assert coalescing_state.orders[0]['currentPrice'] == 9
+        await coalescing_state.on_pending_order_updated('vint-hill:1:ps-mpa-1', {
+            'id': '2', 'symbol': 'EURUSD', 'type': 'ORDER_TYPE_SELL_LIMIT', 'currentPrice': 9})
+        assert list(map(lambda o: o['currentPrice'], coalescing_state.orders)) == [11, 9]
+        assert coalescing_state.price('EURUSD')['bid'] == 10
+
     @pytest.mark.asyncio
     async def test_update_margin_fields(self):
         """Should update margin fields on price update."""
@@ -0,0 +1,60 @@
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Case, FloatField, Q, Sum, When
+from django.utils import timezone
+
+from wallets import categories, rollups
+from wallets.models import IncomeRollup
+
+# Metrics are recomputed at most once per bucket.
+BUCKET_SECONDS = 60
+
+
+def _total(category, after=None):
+    when = Q(category=category)
+    if after is not None:
+        when &= Q(day__gt=after)
+    return Sum(Case(When(when, then='amount'), default=0, output_field=FloatField()))
+
+
+def _first_day(category, since):
+    rows = rollups.first_day_rows(since).filter(category=category)
+    return rows.aggregate(total=Sum('amount'))['total'] or 0
+
+
+def compute(now):
+    """Upgrade (cash in) and MT5 transfer (cash out) totals as of ``now``.
+
+    The week and day figures are rolling windows ending at ``now``: whole
+    days come from the rollups and the first, partial day from WalletHistory.
+    """
+    week = now - datetime.timedelta(days=7)
+    day = now - datetime.timedelta(days=1)
+    totals = IncomeRollup.objects.filter(
+        category__in=[categories.LEVEL_UPGRADE, categories.MT5_TRANSFER],
+    ).aggregate(
+        ci=_total(categories.LEVEL_UPGRADE, rollups.day_of(week)),
+        co=_total(categories.MT5_TRANSFER, rollups.day_of(week)),
+        tre=_total(categories.LEVEL_UPGRADE, rollups.day_of(day)),
+        tci=_total(categories.LEVEL_UPGRADE),
+        tco=_total(categories.MT5_TRANSFER),
+    )
+    totals = {name: value or 0 for name, value in totals.items()}
+    totals['ci'] += _first_day(categories.LEVEL_UPGRADE, week)
+    totals['co'] += _first_day(categories.MT5_TRANSFER, week)
+    totals['tre'] += _first_day(categories.LEVEL_UPGRADE, day)
+    return totals
+
+
+def home(now=None):
+    """``compute()`` cached for the current time bucket."""
+    if now is None:
+        now = timezone.now()
+    bucket = int(now.timestamp()) // BUCKET_SECONDS
+    key = 'panel:home:{}'.format(bucket)
+    metrics = cache.get(key)
+    if metrics is None:
+        metrics = compute(now)
+        cache.set(key, metrics, BUCKET_SECONDS * 2)
+    return metrics
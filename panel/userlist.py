@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from level.models import UserTotal
+from users.models import User
+
+# Users shown per page of the panel user list.
+PAGE_SIZE = 50
+
+# The total user count is recounted at most this often.
+COUNT_SECONDS = 300
+COUNT_KEY = 'panel:users:count'
+
+
+def annotate(queryset):
+    """``queryset`` with the sponsor and top up package of each user joined in
+    as ``referral_username``, ``referral_name`` and ``top_amount``."""
+    sponsor = User.objects.filter(username=OuterRef('referral'))
+    top = UserTotal.objects.filter(user=OuterRef('username')).order_by('-pk')
+    return queryset.annotate(
+        referral_username=Subquery(sponsor.values('username')[:1]),
+        referral_name=Subquery(sponsor.values('name')[:1]),
+        top_amount=Subquery(top.values('level__amount')[:1]),
+    )
+
+
+def page(after=None, before=None, size=PAGE_SIZE):
+    """One page of users, newest first, by keyset pagination on the id.
+
+    ``after`` is the last id of the page before (the next page starts below
+    it), ``before`` the first id of the page after (for going back). Returns
+    the users with the ids to link the neighbouring pages from, None where
+    there is no such page.
+    """
+    users = annotate(User.objects.all())
+    if before is not None:
+        rows = list(users.filter(pk__gt=before).order_by('pk')[:size + 1])
+        more_before = len(rows) > size
+        rows = rows[:size][::-1]
+        more_after = True
+    else:
+        if after is not None:
+            users = users.filter(pk__lt=after)
+        rows = list(users.order_by('-pk')[:size + 1])
+        more_after = len(rows) > size
+        rows = rows[:size]
+        more_before = after is not None
+    return {
+        'users': rows,
+        'next': rows[-1].pk if rows and more_after else None,
+        'previous': rows[0].pk if rows and more_before else None,
+    }
+
+
+def count():
+    """Number of users, cached for COUNT_SECONDS."""
+    total = cache.get(COUNT_KEY)
+    if total is None:
+        total = User.objects.count()
+        cache.set(COUNT_KEY, total, COUNT_SECONDS)
+    return total
@@ -1,4 +1,5 @@
 from django.shortcuts import render
+from django.db import transaction
 from django.db.models import Q, F, Sum
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -21,64 +22,43 @@ import datetime
 from django.conf import settings
 from django.contrib.auth import load_backend, login
 
+from wallets import categories
+from wallets.commission import Posting
 from wallets.models import WalletHistory, Withdrawal, PaymentOption
+from users import search
 from users.models import User
+from users.identity import IdentityMap
+from . import metrics, userlist
+from users.uplines import UplineResolver, resolver_for
 from kyc.models import ImageUploadModel
 import random
 from level.models import Activation, LevelIncomeSettings, UserTotal
 import csv
 
+# Users listed for a search on the users page.
+SEARCH_LIMIT = 100
+
 @staff_member_required
 def home(request):
-    wstart_date = datetime.datetime.now() + datetime.timedelta(-7)
-    wend_date = datetime.datetime.now()
-    dstart_date = datetime.datetime.now() + datetime.timedelta(-1)
-    dend_date = datetime.datetime.now()
-    mstart_date = datetime.datetime.now() + datetime.timedelta(-30)
-    mend_date = datetime.datetime.now()
-    dwhs = WalletHistory.objects.filter(created_at__range=(dstart_date, dend_date))
-    wwhs = WalletHistory.objects.filter(created_at__range=(wstart_date, wend_date))
-    twhsi = WalletHistory.objects.filter(comment__icontains='Prime Upgradation')
-    twhso = WalletHistory.objects.filter(comment__icontains='MT5 Transfer')
-    tci = 0
-    tco = 0
-    for x in twhsi:
-        tci += x.amount
-    for x in twhso:
-        tco += x.amount 
-    ci = 0
-    co = 0
-    tre = 0
-    for wh in wwhs:
-        if 'Prime Upgradation' in wh.comment:
-            ci += wh.amount
-        elif 'MT5 Transfer' in wh.comment:
-            co += wh.amount
-    for wh in dwhs:
-        if 'Prime Upgradation' in wh.comment:
-            tre += wh.amount
-    return render(request, 'panel/home.html', {'ci': ci, 'co': co, 'tre':tre, 'tci': tci, 'tco': tco})
+    return render(request, 'panel/home.html', metrics.home())
+
+def _page_key(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
 
 @staff_member_required
 def users(request):
     q = 'blank'
-    u = User.objects.all().order_by('?')
-    if request.method == 'POST':
+    if request.method == 'POST' and len(request.POST.get('q', '')) >= 3:
         q = request.POST.get('q')
-        u = User.objects.all().order_by('?')
-        if 'q' in request.POST and len(request.POST.get('q'))>=3:
-            u = User.objects.filter(username__icontains=request.POST.get('q')) or User.objects.filter(name__icontains=request.POST.get('q')) or User.objects.filter(email__icontains=request.POST.get('q')) or User.objects.filter(mobile__icontains=request.POST.get('q'))
-            u = u
-    for x in u:
-        try:
-            x.referral = User.objects.get(username=x.referral)
-        except Exception as e:
-            x.referral = x.referral
-        try:
-            x.top = UserTotal.objects.get(user=x.username)
-        except Exception as e:
-            x.top = 0
-    return render(request, 'panel/users.html', {'u': u, 'q': q})
+        context = {'users': search.search(q, limit=SEARCH_LIMIT, queryset=userlist.annotate(User.objects.all()),
+                                            substring=True)}
+    else:
+        context = userlist.page(after=_page_key(request, 'after'), before=_page_key(request, 'before'))
+    return render(request, 'panel/users.html', dict(context, u=context['users'], q=q, total=userlist.count()))
 
 @staff_member_required
 def user(request, id):
@@ -207,17 +187,16 @@ def bankdetails(request):
 @staff_member_required
 def activations(request):
     w = Activation.objects.all().order_by('-created_at')
+    identity = IdentityMap(x.user for x in w)
+    identity.load(u.referral for u in identity.users.values())
     for x in w:
+        x.user = identity.user(x.user, x.user)
         try:
-            x.user = User.objects.get(username=x.user)
+            x.user.referral = identity.user(x.user.referral, x.user.referral)
         except Exception as e:
             pass
         try:
-            x.user.referral = User.objects.get(username=x.user.referral)
-        except Exception as e:
-            pass
-        try:
-            x.user.referral.top = UserTotal.objects.get(user=x.user.referral)
+            x.user.referral.top = identity.total(x.user.referral.username)
         except Exception as e:
             pass
     return render(request, 'panel/activations.html', {'w': w})
@@ -231,34 +210,31 @@ def ids(request):
         too = request.POST.get('to')
         date = datetime.datetime.strptime(too, '%Y-%m-%d')
         w = UserTotal.objects.filter(active=True, activated_at__range=(fromm, too)).order_by('-created_at')
+    w = list(w)
+    usernames = [x.user for x in w]
+    identity = IdentityMap(usernames)
+    identity.load(u.referral for u in identity.users.values())
+    comments = dict(Activation.objects.filter(user__in=usernames).values_list('user', 'comments'))
+    directs = {}
+    for y in UserTotal.objects.select_related('level').filter(direct__in=usernames):
+        directs.setdefault(y.direct, []).append(y)
     for x in w:
+        username = x.user
+        x.comments = comments.get(username, 'not present')
+        x.user = identity.user(username, username)
         try:
-            x.comments = Activation.objects.get(user=x.user).comments
-        except Exception as e:
-            x.comments = 'not present'
-        try:
-            x.user = User.objects.get(username=x.user)
-        except Exception as e:
-            pass
-        try:
-            x.user.referral = User.objects.get(username=x.user.referral)
-        except Exception as e:
-            pass
-        x.directs = UserTotal.objects.filter(direct=x.user).count()
-        try:
-            x.kyc = ImageUploadModel.objects.get(user=x.user)
-        except Exception as e:
-            pass
-        try:
-            x.bank = PaymentOption.objects.get(user=x.user)
+            x.user.referral = identity.user(x.user.referral, x.user.referral)
         except Exception as e:
             pass
+        x.directs = len(directs.get(username, []))
+        x.kyc = identity.kyc(username)
+        x.bank = identity.bank(username)
         start_date = x.activated_at
         end_date = x.activated_at + datetime.timedelta(days=7)
-        directs = UserTotal.objects.filter(direct=x.user, activated_at__range=(start_date, end_date))
         ccm = 0
-        for y in directs:
-            ccm += y.level.amount
+        for y in directs.get(username, []):
+            if y.activated_at and start_date <= y.activated_at <= end_date:
+                ccm += y.level.amount
         ccm_pool = 0
         if ccm >= 10000:
             ccm_pool = 12
@@ -274,7 +250,7 @@ def ids(request):
 
     return render(request, 'panel/ids.html', {'w': w})
 
-def activate(user, amount):
+def activate(user, amount, resolver=None):
     def userjoined(user):
         try:
             user = UserTotal.objects.get(user=str(user), active=True)
@@ -300,17 +276,10 @@ def activate(user, amount):
             userwallet.amount = packamount
             userwallet.type = "debit"
             userwallet.comment = "Prime Upgradation"
+            userwallet.category = categories.LEVEL_UPGRADE
 
             userid = user   
 
-            def finduplines(user):  
-                try:    
-                    user = User.objects.get(username__iexact=str(user)) 
-                    upline = user.referral   
-                except User.DoesNotExist:   
-                    upline = 'blank'    
-                return upline   
-
             levels = {
             'level1': 20/100, 
             'level2': 10/100,
@@ -324,78 +293,45 @@ def activate(user, amount):
             'level10': 0.5/100,
             }
 
-            level = 0   
-            upline_user = userid.referral    
-            userid = user   
             amount = packamount 
-            uplines = [upline_user, ]
-            while level < 7 and upline_user != 'blank':
-                upline_user = finduplines(str(upline_user))
-                uplines.append(upline_user)
-                level += 1
-
+            if resolver is None:
+                resolver = UplineResolver()
+            posting = Posting()
             level = 0
-            print(uplines)
-            for upline in uplines:
-                try:
-                    upline_user = User.objects.get(username=upline) 
-                except Exception as e:  
-                    upline_user = 'blank'
+            for upline_user in resolver.uplines(userid, 8):
+                if upline_user is None:
+                    level = level + 1
+                    continue
+                upline = upline_user.username
                 try:
                     upgraded = UserTotal.objects.get(user=upline, active=True)
                 except Exception as e:
                     upgraded = 'blank'
-                if upline_user != 'blank' and upgraded != 'blank':  
+                if upgraded != 'blank':  
                     directs = UserTotal.objects.filter(direct=upline_user, active=True)
                     if user.referral == upline_user.username:
                         direct = True
                     else:
                         direct = False
                     upline_amount = levels['level{}'.format(level+1)]*amount
-                    print(directs.count(), level, direct)
-                    if directs.count() >= level and direct:
-                        upline_wallet = WalletHistory()   
-                        upline_wallet.user_id = upline  
-                        upline_wallet.amount = upline_amount    
-                        upline_wallet.type = "credit"   
-                        upline_wallet.comment = "New Upgrade by {} in level {}".format(user, level+1)
-                        upgraded.business += upline_amount
-                        upline_wallet.save()
-                        upline_user.save()
-                        print('if')
-                    elif directs.count() > level and not direct:   
-                        upline_amount = levels['level{}'.format(level+1)]*amount
-                        upline_wallet = WalletHistory()   
-                        upline_wallet.user_id = upline  
-                        upline_wallet.amount = upline_amount    
-                        upline_wallet.type = "credit"   
-                        upline_wallet.comment = "New Upgrade by {} in level {}".format(user, level+1)
-                        upgraded.business += upline_amount
-                        upline_wallet.save()
-                        upline_user.save()
-                        print('elif')
+                    if (directs.count() >= level and direct) or (directs.count() > level and not direct):
+                        posting.credit(upline, upline_amount, "New Upgrade by {} in level {}".format(user, level+1), categories.LEVEL_COMMISSION)
+                        posting.increment(upgraded, business=upline_amount)
                     else:
-                        upline_wallet = WalletHistory()   
-                        upline_wallet.user_id = upline  
-                        upline_wallet.amount = upline_amount    
-                        upline_wallet.type = "credit"   
-                        upline_wallet.comment = "{} joined but Level {} not opened!".format(user, level+1)
-                        upline_wallet.save()
-                        print('else')
-                    upgraded.save()
-                    print('outside')
+                        posting.credit(upline, upline_amount, "{} joined but Level {} not opened!".format(user, level+1), categories.LEVEL_MISSED)
                 level = level + 1
             
-            model, created = UserTotal.objects.get_or_create(user=userid.username, level=levelp, active=True, left_months = levelp.expiration_period)
-            model, created = UserTotal.objects.get_or_create(user=userid.username, level=levelp, active=True, left_months = levelp.expiration_period)
-            model.user = userid.username
-            model.level = levelp
-            model.active = True
-            model.left_months = levelp.expiration_period
-            model.direct = user.referral
-            model.activated_at = datetime.datetime.now()
-            model.save()
-            userwallet.save()
+            posting.add(userwallet)
+            with transaction.atomic():
+                model, created = UserTotal.objects.get_or_create(user=userid.username, level=levelp, active=True, left_months = levelp.expiration_period)
+                model.user = userid.username
+                model.level = levelp
+                model.active = True
+                model.left_months = levelp.expiration_period
+                model.direct = user.referral
+                model.activated_at = datetime.datetime.now()
+                model.save()
+                posting.post()
             user_id.save()
             message = "Plan purchased"
         else:
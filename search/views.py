@@ -1,10 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
 from django.http import JsonResponse
 from django.views.generic import ListView
 
+from users import search
 from users.models import User
 
 
@@ -16,12 +16,8 @@ class SearchListView(LoginRequiredMixin, ListView):
         context = super().get_context_data(*args, **kwargs)
         query = self.request.GET.get("query")
         context["hide_search"] = True
-        context["users_list"] = (
-            get_user_model()
-            .objects.filter(Q(username__icontains=query) | Q(name__icontains=query))
-            .distinct()
-        )
-        context["users_count"] = context["users_list"].count()
+        context["users_list"] = search.search(query, limit=search.RESULTS_LIMIT)
+        context["users_count"] = len(context["users_list"])
         context["total_results"] = (
             + context["users_count"]
         )
@@ -31,20 +27,9 @@ class SearchListView(LoginRequiredMixin, ListView):
 @login_required
 def get_suggestions(request):
     query = request.GET.get("term", "")
-    user = list(
-        get_user_model().objects.filter(
-            Q(username__icontains=query) | Q(name__icontains=query)
-        )
+    users = search.search(
+        query, queryset=get_user_model().objects.only("username", "name")
     )
-
-    data_retrieved = user
-    results = []
-    for data in data_retrieved:
-        data_json = {}
-        if isinstance(data, get_user_model()):
-            data_json["id"] = data.username
-            data_json["name"] = data.name
-
-        results.append(data_json)
+    results = [{"id": user.username, "name": user.name} for user in users]
 
     return JsonResponse(results, safe=False)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TicketConfig(AppConfig):
     name = 'ticket'
+
+    def ready(self):
+        import ticket.signals  # noqa F401
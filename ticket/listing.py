@@ -0,0 +1,91 @@
+import threading
+import time
+
+from django.core.paginator import EmptyPage, InvalidPage, Paginator
+
+from ticket.models import Priority, Project, Status, Ticket
+
+TICKETS_PER_PAGE = 20
+
+# How long another process's change to a lookup table may go unseen here.
+LOOKUP_SECONDS = 300
+
+SORT_FIELDS = {
+    'assigned': 'assigned_to',
+    'updated': 'update_time',
+}
+
+
+class Lookups(object):
+    """The small Priority, Status and Project tables, kept in memory.
+
+    Reloaded after LOOKUP_SECONDS and whenever ``invalidate()`` is called,
+    which the signal handlers do when one of the tables is saved to.
+    """
+
+    def __init__(self, seconds=LOOKUP_SECONDS):
+        self.seconds = seconds
+        self._tables = None
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._tables = None
+
+    def _get(self):
+        with self._lock:
+            if self._tables is None or self._loaded + self.seconds < time.time():
+                self._tables = {
+                    'priority': {obj.pk: obj for obj in Priority.objects.all()},
+                    'status': {obj.pk: obj for obj in Status.objects.all()},
+                    'project': {obj.pk: obj for obj in Project.objects.all()},
+                }
+                self._loaded = time.time()
+            return self._tables
+
+    def priorities(self):
+        return self._get()['priority']
+
+    def statuses(self):
+        return self._get()['status']
+
+    def projects(self):
+        return self._get()['project']
+
+    def hidden_status_ids(self):
+        return [pk for pk, status in self.statuses().items() if status.hide_by_default]
+
+
+lookups = Lookups()
+
+
+def tickets(filters, sort='id', order='dsc', show_closed=False):
+    """Tickets matching ``filters`` with everything the list shows.
+
+    The related rows come in through joins in the same query.
+    """
+    queryset = Ticket.objects.filter(**filters)
+    if not show_closed:
+        queryset = queryset.exclude(status_id__in=lookups.hidden_status_ids())
+    sort_field = SORT_FIELDS.get(sort, sort)
+    if order == 'dsc':
+        sort_field = '-' + sort_field
+    return (queryset
+            .select_related('project', 'priority', 'status', 'created_by', 'assigned_to')
+            .order_by(sort_field, '-pk'))
+
+
+def page(queryset, number, per_page=TICKETS_PER_PAGE):
+    """Page ``number`` of ``queryset``, the last page when out of range.
+
+    The page's tickets are loaded into a list so the template can test and
+    loop over them without querying again.
+    """
+    paginator = Paginator(queryset, per_page)
+    try:
+        tickets_page = paginator.page(number)
+    except (EmptyPage, InvalidPage):
+        tickets_page = paginator.page(paginator.num_pages)
+    tickets_page.object_list = list(tickets_page.object_list)
+    return tickets_page
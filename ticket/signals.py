@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ticket.listing import lookups
+from ticket.models import Priority, Project, Status
+
+
+@receiver(post_save, sender=Priority)
+@receiver(post_save, sender=Status)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Priority)
+@receiver(post_delete, sender=Status)
+@receiver(post_delete, sender=Project)
+def reload_lookups(sender, **kwargs):
+    lookups.invalidate()
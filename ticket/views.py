@@ -2,6 +2,7 @@ from datetime import datetime
 from django.shortcuts import render
 from django.http import HttpResponseRedirect
 from users.models import User
+from ticket import listing
 from ticket.models import Priority, Status, Project, Ticket, TicketComment
 from django.shortcuts import get_object_or_404
 from django.core.paginator import Paginator, InvalidPage, EmptyPage
@@ -81,41 +82,28 @@ def view_all(request):
         args['status'] = status_filter
     if project_filter:
         args['project'] = project_filter
-    tickets = Ticket.objects.filter(**args)
-
-    # Filter out closed tickets
-    if not closed_filter or closed_filter.lower() != "true":
-        tickets = tickets.exclude(status__hide_by_default=True)
-
-    # Sort the tickets
-    sort_filter = sort_setting
-    if sort_filter == 'assigned':
-        sort_filter = 'assigned_to'
-    if sort_filter == 'updated':
-        sort_filter = 'update_time'
-    if order_setting == 'dsc':
-        sort_filter = '-' + sort_filter
-    tickets = tickets.order_by(sort_filter)
+    include_closed = closed_filter is not None and closed_filter.lower() == "true"
+    tickets = listing.tickets(args, sort_setting, order_setting, include_closed)
 
     # Create filter string
     try:
         filterArray = []
         if assigned_filter and assigned_filter != 'unassigned':
-            assigned = User.objects.get(pk=assigned_filter)
+            assigned = User.objects.only('username').get(pk=assigned_filter)
             filterArray.append("Assigned to: " + assigned.username)
         if assigned_filter and assigned_filter == 'unassigned':
             filterArray.append("Assigned to: Unassigned")
         if created_filter:
-            created = User.objects.get(pk=created_filter)
+            created = User.objects.only('username').get(pk=created_filter)
             filterArray.append("Assigned to: " + created.username)
         if priority_filter:
-            priority = Priority.objects.get(pk=priority_filter)
+            priority = listing.lookups.priorities()[int(priority_filter)]
             filterArray.append("Priority: " + priority.name)
         if status_filter:
-            status = Status.objects.get(pk=status_filter)
+            status = listing.lookups.statuses()[int(status_filter)]
             filterArray.append("Status: " + status.name)
         if project_filter:
-            project = Project.objects.get(pk=project_filter)
+            project = listing.lookups.projects()[int(project_filter)]
             filterArray.append("Project: " + project.name)
         if filterArray:
             filter = ', '.join(filterArray)
@@ -126,8 +114,15 @@ def view_all(request):
         filter = "Filter Error"
         filter_message = e
 
+    # Paginate
+    try: # Make sure page request is an int. If not, deliver first page.
+        page = int(request.GET.get('page', '1'))
+    except ValueError:
+        page = 1
+    tickets = listing.page(tickets, page)
+
     # Handle the case of no visible tickets
-    if tickets.count() < 1:
+    if tickets.paginator.count < 1:
         filter_message = "No tickets meet the current filtering critera."
 
     # Generate the base URL for showing closed tickets & sorting
@@ -145,17 +140,6 @@ def view_all(request):
     else:
         show_closed = 'false'
 
-    # Paginate
-    paginator = Paginator(tickets, 20)
-    try: # Make sure page request is an int. If not, deliver first page.
-        page = int(request.GET.get('page', '1'))
-    except ValueError:
-        page = 1
-    try:
-        tickets = paginator.page(page)
-    except (EmptyPage, InvalidPage):
-        tickets = paginator.page(paginator.num_pages)
-
     # Generate next page link
     pairs = []
     for key in request.GET.keys():
@@ -0,0 +1,67 @@
+from django.db import connection
+
+from kyc.models import ImageUploadModel
+from level.models import UserTotal
+from wallets.models import PaymentOption
+
+from .models import User
+
+# SQLite caps bound parameters at 999, keep ``in`` lookups well below that
+# there. Other backends take a whole page of usernames in one query.
+SQLITE_CHUNK_SIZE = 500
+CHUNK_SIZE = 10000
+
+
+def chunked(items, size=None):
+    if size is None:
+        size = SQLITE_CHUNK_SIZE if connection.vendor == 'sqlite' else CHUNK_SIZE
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class IdentityMap(object):
+    """Per-request cache of the rows keyed by username.
+
+    ``load()`` fetches the User, UserTotal, ImageUploadModel (KYC) and
+    PaymentOption (bank) rows of many usernames with one ``in`` query per
+    table, and only for usernames it has not seen yet. Lookups afterwards
+    never hit the database, a missing row comes back as ``default``.
+    """
+
+    def __init__(self, usernames=()):
+        self.users = {}
+        self.totals = {}
+        self.kycs = {}
+        self.banks = {}
+        self._loaded = set()
+        self.load(usernames)
+
+    def load(self, usernames):
+        usernames = {str(u) for u in usernames if u} - self._loaded
+        if not usernames:
+            return self
+        self._loaded |= usernames
+        for chunk in chunked(usernames):
+            for user in User.objects.filter(username__in=chunk):
+                self.users[user.username] = user
+            # several UserTotal rows can exist for one user, keep the latest
+            for total in UserTotal.objects.select_related('level').filter(user__in=chunk).order_by('id'):
+                self.totals[total.user] = total
+            for kyc in ImageUploadModel.objects.filter(user__in=chunk):
+                self.kycs[kyc.user] = kyc
+            for bank in PaymentOption.objects.filter(user__in=chunk):
+                self.banks[bank.user] = bank
+        return self
+
+    def user(self, username, default=None):
+        return self.users.get(str(username), default)
+
+    def total(self, username, default=None):
+        return self.totals.get(str(username), default)
+
+    def kyc(self, username, default=None):
+        return self.kycs.get(str(username), default)
+
+    def bank(self, username, default=None):
+        return self.banks.get(str(username), default)
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_auto_20231008_0733'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='referral_path',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
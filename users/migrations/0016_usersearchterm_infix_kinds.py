@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_usersearchterm'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usersearchterm',
+            name='kind',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Username'), (1, 'Name'), (2, 'Email'), (3, 'Mobile'), (4, 'Inside username'), (5, 'Inside mobile')]),
+        ),
+    ]
@@ -19,6 +19,8 @@ class User(AbstractUser, PermissionsMixin):
     profile_pic = models.FileField(upload_to='profile_pics/', null=True)
     otp = models.IntegerField(default='1234', null=True)
     referral = models.CharField(max_length=25, blank=True, null=True)
+    # sponsors above this user, nearest first, as ",sponsor,his sponsor,...,"
+    referral_path = models.TextField(blank=True, default='')
     wallet = models.IntegerField(default=0)
     c = models.IntegerField(default=0)
     withdrawal = models.FloatField(default=0, null=True, blank=True)
@@ -42,4 +44,35 @@ class User(AbstractUser, PermissionsMixin):
 
     def get_profile_name(self):
         if self.name:
-            return self.name
\ No newline at end of file
+            return self.name
+
+class UserSearchTerm(models.Model):
+    """One normalized word a user can be found by; see ``users.search``."""
+    USERNAME = 0
+    NAME = 1
+    EMAIL = 2
+    MOBILE = 3
+    # suffixes of the username and the mobile, so a query can match inside them
+    USERNAME_INFIX = 4
+    MOBILE_INFIX = 5
+    KIND_CHOICES = (
+        (USERNAME, 'Username'),
+        (NAME, 'Name'),
+        (EMAIL, 'Email'),
+        (MOBILE, 'Mobile'),
+        (USERNAME_INFIX, 'Inside username'),
+        (MOBILE_INFIX, 'Inside mobile'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_terms')
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    term = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [
+            # prefix lookups are range scans of this index, already in rank order
+            models.Index(fields=['kind', 'term'], name='users_users_kind_5e0c9a_idx'),
+        ]
+
+    def __str__(self):
+        return '{} {}'.format(self.get_kind_display(), self.term)
@@ -0,0 +1,192 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.db.models import Q
+
+from .models import User, UserSearchTerm
+
+# Suggestions returned for one query.
+DEFAULT_LIMIT = 10
+
+# Users listed on the search results pages.
+RESULTS_LIMIT = 50
+
+# Shortest part of a username or mobile found from inside it, e.g. "1002" in
+# "JR1002"; shorter queries only match from the start.
+INFIX_MIN = 3
+
+# Queries kept in the per process cache, and how long a cached answer may
+# lag behind changes made by other processes.
+CACHE_SIZE = 2048
+CACHE_SECONDS = 60
+
+# Kinds in rank order: username matches first, then names, emails, mobiles,
+# then matches inside usernames and mobiles.
+KINDS = (UserSearchTerm.USERNAME, UserSearchTerm.NAME, UserSearchTerm.EMAIL, UserSearchTerm.MOBILE,
+         UserSearchTerm.USERNAME_INFIX, UserSearchTerm.MOBILE_INFIX)
+INFIX_KINDS = (UserSearchTerm.USERNAME_INFIX, UserSearchTerm.MOBILE_INFIX)
+
+# Fields the terms are made from, remembered on load to skip needless reindexing.
+FIELDS = ('username', 'name', 'email', 'mobile')
+
+# Above every character a term can contain, closes the prefix range.
+_HIGH = '\uffff'
+
+
+def normalize(text):
+    return ' '.join((text or '').casefold().split())
+
+
+def suffixes(text):
+    return [text[i:] for i in range(1, len(text) - INFIX_MIN + 1)]
+
+
+def terms_for(user):
+    """(kind, term) pairs ``user`` can be found by."""
+    terms = set()
+    if user.username:
+        username = normalize(user.username)
+        terms.add((UserSearchTerm.USERNAME, username))
+        for suffix in suffixes(username):
+            terms.add((UserSearchTerm.USERNAME_INFIX, suffix))
+    name = normalize(user.name)
+    if name:
+        terms.add((UserSearchTerm.NAME, name))
+        # every word of the name so "kumar" finds "raj kumar"
+        words = name.split(' ')
+        for i in range(1, len(words)):
+            terms.add((UserSearchTerm.NAME, ' '.join(words[i:])))
+    email = normalize(user.email)
+    if email:
+        terms.add((UserSearchTerm.EMAIL, email))
+    mobile = re.sub(r'\D', '', user.mobile or '')
+    if mobile:
+        terms.add((UserSearchTerm.MOBILE, mobile))
+        for suffix in suffixes(mobile):
+            terms.add((UserSearchTerm.MOBILE_INFIX, suffix))
+        if len(mobile) > 10:
+            # without the country code
+            terms.add((UserSearchTerm.MOBILE, mobile[-10:]))
+    return sorted((kind, term[:255]) for kind, term in terms)
+
+
+def snapshot(user):
+    return tuple(user.__dict__.get(name) for name in FIELDS)
+
+
+def index_user(user):
+    """Replace the stored terms of ``user``."""
+    UserSearchTerm.objects.filter(user_id=user.pk).delete()
+    UserSearchTerm.objects.bulk_create(
+        [UserSearchTerm(user_id=user.pk, kind=kind, term=term) for kind, term in terms_for(user)])
+    cache.clear()
+
+
+def rebuild(chunk_size=5000):
+    """Recompute the terms of every user, a chunk of users at a time."""
+    UserSearchTerm.objects.all().delete()
+    count = 0
+    last_pk = 0
+    while True:
+        users = list(User.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', *FIELDS)[:chunk_size])
+        if not users:
+            break
+        rows = [UserSearchTerm(user_id=user.pk, kind=kind, term=term)
+                for user in users for kind, term in terms_for(user)]
+        UserSearchTerm.objects.bulk_create(rows)
+        count += len(rows)
+        last_pk = users[-1].pk
+    cache.clear()
+    return count
+
+
+class PrefixCache(object):
+    """Least recently used query results, each valid for ``seconds``."""
+
+    def __init__(self, size=CACHE_SIZE, seconds=CACHE_SECONDS):
+        self.size = size
+        self.seconds = seconds
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.time() + self.seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+cache = PrefixCache()
+
+
+def search_ids(query, limit=DEFAULT_LIMIT, substring=False):
+    """Primary keys of the best ``limit`` users for ``query``.
+
+    A user matches when one of their terms starts with the query. Username
+    matches rank first, then name, email and mobile matches, then usernames
+    and mobiles containing the query; within a kind shorter terms (exact
+    matches) come before longer ones sharing the prefix. Each kind is one
+    bounded range scan of the (kind, term) index.
+
+    With ``substring`` the remaining places are filled with users whose name
+    or email contains the query anywhere, an unindexed scan kept for the
+    admin panel.
+    """
+    query = normalize(query)
+    if not query or limit <= 0:
+        return []
+    key = (query, limit, substring)
+    ids = cache.get(key)
+    if ids is None:
+        ids = []
+        for kind in KINDS:
+            if kind in (UserSearchTerm.MOBILE, UserSearchTerm.MOBILE_INFIX) and not query.isdigit():
+                continue
+            if kind in INFIX_KINDS and len(query) < INFIX_MIN:
+                continue
+            matches = (UserSearchTerm.objects
+                       .filter(kind=kind, term__gte=query, term__lt=query + _HIGH, term__startswith=query)
+                       .order_by('term')
+                       .values_list('user_id', flat=True))
+            # a user may match through several words of the name
+            for user_id in matches[:limit * 2]:
+                if user_id not in ids:
+                    ids.append(user_id)
+            if len(ids) >= limit:
+                break
+        if substring and len(ids) < limit:
+            ids.extend(User.objects.filter(Q(name__icontains=query) | Q(email__icontains=query))
+                       .exclude(pk__in=ids).order_by('pk').values_list('pk', flat=True)[:limit - len(ids)])
+        ids = ids[:limit]
+        cache.set(key, ids)
+    return list(ids)
+
+
+def search(query, limit=DEFAULT_LIMIT, queryset=None, substring=False):
+    """Users matching ``query`` in rank order, see ``search_ids``."""
+    ids = search_ids(query, limit, substring)
+    if not ids:
+        return []
+    users = (queryset if queryset is not None else User.objects.all()).in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
@@ -0,0 +1,44 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from . import search, uplines
+from .models import User
+
+
+@receiver(post_init, sender=User)
+def remember_referral(sender, instance, **kwargs):
+    # read through __dict__ so a deferred referral is not loaded here
+    instance._saved_referral = instance.__dict__.get('referral', DEFERRED)
+    instance._saved_search = search.snapshot(instance)
+
+
+@receiver(pre_save, sender=User)
+def update_referral_path(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'referral' not in update_fields:
+        return
+    saved = getattr(instance, '_saved_referral', DEFERRED)
+    instance._referral_changed = saved is not DEFERRED and instance.referral != saved
+    if instance._referral_changed or (instance.referral and not instance.referral_path):
+        names = uplines.compute_chain(instance.referral, exclude=instance.username)
+        instance.referral_path = uplines.join_path(names)
+
+
+@receiver(post_save, sender=User)
+def update_downline_paths(sender, instance, created, **kwargs):
+    if getattr(instance, '_referral_changed', False):
+        if not created:
+            uplines.update_descendants(instance)
+        uplines.invalidate()
+    instance._saved_referral = instance.__dict__.get('referral', DEFERRED)
+    instance._referral_changed = False
+
+
+@receiver(post_save, sender=User)
+def update_search_terms(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(search.FIELDS):
+        return
+    current = search.snapshot(instance)
+    if created or current != getattr(instance, '_saved_search', None):
+        search.index_user(instance)
+    instance._saved_search = current
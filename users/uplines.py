@@ -0,0 +1,140 @@
+from .models import User
+
+# Longest sponsor chain any payout walks; deeper sponsors are not stored.
+MAX_UPLINES = 20
+
+# Bumped whenever a referral changes so live resolvers drop their memo.
+_generation = [0]
+
+
+def split_path(path):
+    return [name for name in (path or '').split(',') if name]
+
+
+def join_path(names):
+    names = list(names)[:MAX_UPLINES]
+    return ',{},'.format(','.join(names)) if names else ''
+
+
+def compute_chain(referral, exclude=None):
+    """Sponsor chain starting at ``referral``, nearest first.
+
+    Sponsors are matched case-insensitively, like the old chain walk, and
+    stored under their actual username. Walks up until it reaches a sponsor
+    whose own path is already stored and then reuses that path, so it usually
+    costs a single query.
+    """
+    chain = []
+    seen = {(exclude or '').lower()}
+    name = referral
+    while name and name.lower() not in seen and len(chain) < MAX_UPLINES:
+        row = User.objects.filter(username__iexact=name).values_list('username', 'referral', 'referral_path').first()
+        if row is None:
+            chain.append(name)
+            break
+        name, parent, path = row
+        chain.append(name)
+        seen.add(name.lower())
+        if path:
+            for above in split_path(path):
+                if above.lower() in seen:
+                    break
+                chain.append(above)
+                seen.add(above.lower())
+            break
+        name = parent
+    return chain[:MAX_UPLINES]
+
+
+def invalidate():
+    _generation[0] += 1
+
+
+def update_descendants(user):
+    """Rewrite the stored path of every user below ``user``."""
+    head = split_path(user.referral_path)
+    marker = ',{},'.format(user.username)
+    for pk, path in User.objects.filter(referral_path__icontains=marker).values_list('pk', 'referral_path'):
+        names = split_path(path)
+        lowered = [name.lower() for name in names]
+        names = names[:lowered.index(user.username.lower())] + [user.username] + head
+        User.objects.filter(pk=pk).update(referral_path=join_path(names))
+
+
+def rebuild():
+    """Recompute ``referral_path`` of every user from ``User.referral``."""
+    rows = list(User.objects.values_list('username', 'referral'))
+    usernames = {username.lower(): username for username, _ in rows}
+    parents = {username.lower(): referral for username, referral in rows}
+    changed = []
+    for user in User.objects.only('pk', 'username', 'referral_path').iterator():
+        chain = []
+        seen = {user.username.lower()}
+        name = parents.get(user.username.lower())
+        while name and name.lower() not in seen and len(chain) < MAX_UPLINES:
+            chain.append(usernames.get(name.lower(), name))
+            seen.add(name.lower())
+            name = parents.get(name.lower())
+        path = join_path(chain)
+        if user.referral_path != path:
+            user.referral_path = path
+            changed.append(user)
+        if len(changed) >= 1000:
+            User.objects.bulk_update(changed, ['referral_path'])
+            changed = []
+    User.objects.bulk_update(changed, ['referral_path'])
+    invalidate()
+
+
+class UplineResolver(object):
+    """Resolves the first N sponsors of a user with a constant number of
+    queries, memoized for the lifetime of the resolver (one request)."""
+
+    def __init__(self):
+        self._chains = {}
+        self._users = {}
+        self._generation = _generation[0]
+
+    def _check(self):
+        if self._generation != _generation[0]:
+            self._chains.clear()
+            self._users.clear()
+            self._generation = _generation[0]
+
+    def chain(self, user, depth=MAX_UPLINES):
+        """Usernames of the first ``depth`` sponsors of ``user``."""
+        self._check()
+        username = str(user)
+        if username not in self._chains:
+            if not isinstance(user, User):
+                user = User.objects.filter(username__iexact=username) \
+                    .only('username', 'referral', 'referral_path').first()
+            if user is None:
+                names = []
+            elif user.referral_path:
+                names = split_path(user.referral_path)
+            else:
+                # not backfilled yet, walk it once and keep it
+                names = compute_chain(user.referral, exclude=username)
+                User.objects.filter(pk=user.pk).update(referral_path=join_path(names))
+            self._chains[username] = names
+        return self._chains[username][:depth]
+
+    def uplines(self, user, depth=MAX_UPLINES):
+        """User rows of the first ``depth`` sponsors, nearest first. A sponsor
+        whose row is missing is returned as None so levels stay aligned."""
+        names = self.chain(user, depth)
+        missing = [name for name in names if name not in self._users]
+        if missing:
+            for name in missing:
+                self._users[name] = None
+            for upline in User.objects.filter(username__in=missing):
+                self._users[upline.username] = upline
+        return [self._users.get(name) for name in names]
+
+
+def resolver_for(request):
+    """The UplineResolver memoized on ``request``."""
+    if not hasattr(request, '_upline_resolver'):
+        request._upline_resolver = UplineResolver()
+    return request._upline_resolver
@@ -56,6 +56,7 @@ from django.http import JsonResponse
 import datetime
 from django.utils import timezone
 from level.models import LevelIncomeSettings
+from level.team import referral_team
 import requests
 
 logger = logging.getLogger('django')
@@ -286,58 +287,9 @@ class UserDashboardView(LoginRequiredMixin, ListView):
             s = UserTotal.objects.get(user=user.username)
         except Exception as e:
             s = e
-        directs = User.objects.filter(referral=user).count()
-        level1 = User.objects.filter(referral=user.username).order_by('id')
-        level1n = []
-        for x in level1:
-            level1n.append(x)
-        level2n = []
-        for y in level1n:
-            level2 = User.objects.filter(referral=y).order_by('id')
-            for z in level2:
-                level2n.append(z)
-        level3n = []
-        for y in level2n:
-            level3 = User.objects.filter(referral=y).order_by('id')
-            for z in level3:
-                level3n.append(z)
-        level4n = []
-        for y in level3n:
-            level4 = User.objects.filter(referral=y).order_by('id')
-            for z in level4:
-                level4n.append(z)
-        level5n = []
-        for y in level4n:
-            level5 = User.objects.filter(referral=y).order_by('id')
-            for z in level5:
-                level5n.append(z)
-        level6n = []
-        for y in level5n:
-            level6 = User.objects.filter(referral=y).order_by('id')
-            for z in level6:
-                level6n.append(z)
-        level7n = []
-        for y in level6n:
-            level7 = User.objects.filter(referral=y).order_by('id')
-            for z in level7:
-                level7n.append(z)
-        level8n = []
-        for y in level7n:
-            level8 = User.objects.filter(referral=y).order_by('id')
-            for z in level8:
-                level8n.append(z)
-        level9n = []
-        for y in level8n:
-            level9 = User.objects.filter(referral=y).order_by('id')
-            for z in level9:
-                level9n.append(z)
-        level10n = []
-        for y in level9n:
-            level10 = User.objects.filter(referral=y).order_by('id')
-            for z in level10:
-                level10n.append(z)
-
-        all_levels = level1n+level2n+level3n+level4n+level5n+level6n+level7n+level8n+level9n+level10n
+        team = referral_team(user.username, 10)
+        directs = team.count(1)
+        all_levels = team.members
 
         # business = {}
         # level = 0
@@ -0,0 +1,92 @@
+"""What a WalletHistory row was for.
+
+Writers set ``WalletHistory.category`` directly; ``classify()`` derives it
+from the comment for rows written without one and for old rows.
+"""
+
+RECHARGE_CASHBACK = 'recharge_cashback'
+RECHARGE = 'recharge'
+LEVEL_UPGRADE = 'level_upgrade'
+LEVEL_COMMISSION = 'level_commission'
+LEVEL_MISSED = 'level_missed'
+RECHARGE_COMMISSION = 'recharge_commission'
+TEAM_COMMISSION = 'team_commission'
+MATCHING = 'matching'
+MT5_TRANSFER = 'mt5_transfer'
+MT5_DEPOSIT = 'mt5_deposit'
+DCXA_TRANSFER = 'dcxa_transfer'
+ROYALTY = 'royalty'
+ROI = 'roi'
+SHOPPING = 'shopping'
+SHOPPING_WALLET = 'shopping_wallet'
+FRANCHISE = 'franchise'
+TASK = 'task'
+WITHDRAWAL = 'withdrawal'
+FUND = 'fund'
+OTHER = 'other'
+
+CHOICES = (
+    (RECHARGE_CASHBACK, 'Recharge cashback'),
+    (RECHARGE, 'Recharge'),
+    (LEVEL_UPGRADE, 'Level upgrade'),
+    (LEVEL_COMMISSION, 'Level commission'),
+    (LEVEL_MISSED, 'Level not opened'),
+    (RECHARGE_COMMISSION, 'Recharge commission'),
+    (TEAM_COMMISSION, 'Team commission'),
+    (MATCHING, 'Matching income'),
+    (MT5_TRANSFER, 'MT5 transfer'),
+    (MT5_DEPOSIT, 'Sent to MT5'),
+    (DCXA_TRANSFER, 'DCXa transfer'),
+    (ROYALTY, 'Royalty'),
+    (ROI, 'ROI'),
+    (SHOPPING, 'Shopping income'),
+    (SHOPPING_WALLET, 'Shopping wallet'),
+    (FRANCHISE, 'Franchise'),
+    (TASK, 'Task'),
+    (WITHDRAWAL, 'Withdrawal'),
+    (FUND, 'Fund'),
+    (OTHER, 'Other'),
+)
+
+# (substring of the comment, category), first match wins so the more
+# specific texts come first
+RULES = (
+    ('Shopping Income from', SHOPPING),
+    ('Shopping Self Earning', SHOPPING),
+    ('Shopping', SHOPPING_WALLET),
+    ('Recharge cashback', RECHARGE_CASHBACK),
+    ('new recharge done by', RECHARGE_COMMISSION),
+    ('spent on recharge', RECHARGE),
+    ('Reward Points debit', RECHARGE),
+    ('Prime Upgradation', LEVEL_UPGRADE),
+    ('New Upgrade by', LEVEL_COMMISSION),
+    ('not opened', LEVEL_MISSED),
+    ('Team commission', TEAM_COMMISSION),
+    ('Team Commision', TEAM_COMMISSION),
+    ('Income from Level', TEAM_COMMISSION),
+    ('Matching Income', MATCHING),
+    ('MT5 Transfer', MT5_TRANSFER),
+    ('Sent to MT5', MT5_DEPOSIT),
+    ('DCXa', DCXA_TRANSFER),
+    ('Royalty', ROYALTY),
+    ('ROI Income', ROI),
+    ('Franchise', FRANCHISE),
+    ('task completed', TASK),
+    ('Task Done', TASK),
+    ('NEFT', WITHDRAWAL),
+    ('Money added', FUND),
+)
+
+
+def classify(comment):
+    """Category of a history row with ``comment``, OTHER when nothing matches."""
+    comment = (comment or '').lower()
+    for text, category in RULES:
+        if text.lower() in comment:
+            return category
+    return OTHER
+
+
+def is_income(type):
+    """Whether a row of ``type`` counts as income on the history page."""
+    return type is not None and ('credit' in type or 'income' in type)
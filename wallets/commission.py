@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+from django.db import models, transaction
+from django.db.models import F
+
+from . import categories, rollups
+from .models import WalletHistory
+
+
+class Posting(object):
+    """All wallet movements caused by one event, written together.
+
+    Credits and debits are collected first and ``post()`` applies them in one
+    transaction: the WalletHistory rows with a single ``bulk_create`` and the
+    balance changes as ``F()`` increments with one ``bulk_update`` per model,
+    so concurrent postings to the same user add up instead of overwriting
+    each other.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.deltas = OrderedDict()
+
+    def add(self, row):
+        """Queue an already built WalletHistory row."""
+        if not row.category:
+            # bulk_create skips WalletHistory.save()
+            row.category = categories.classify(row.comment)
+        self.rows.append(row)
+        return row
+
+    def record(self, user, amount, type, comment, category=None, **fields):
+        """Queue a history row for ``user`` and add ``fields`` to its balances."""
+        if fields:
+            self._check(user.__class__, fields)
+        row = self.add(WalletHistory(user_id=str(user), amount=amount, type=type, comment=comment,
+                                     category=category or ''))
+        if fields:
+            self.increment(user, **fields)
+        return row
+
+    def credit(self, user, amount, comment, category=None, **fields):
+        return self.record(user, amount, 'credit', comment, category, **fields)
+
+    def debit(self, user, amount, comment, category=None, **fields):
+        return self.record(user, amount, 'debit', comment, category, **fields)
+
+    def increment(self, obj, **fields):
+        """Add ``fields`` (name=delta) to the row ``obj`` when posted.
+
+        A delta to an integer column is truncated toward zero first, as
+        ``obj.save()`` did with ``balance += delta``; the history row keeps the
+        exact amount.
+        """
+        model = type(obj)
+        self._check(model, fields)
+        deltas = self.deltas.setdefault((model, obj.pk), {})
+        for name, delta in fields.items():
+            if isinstance(model._meta.get_field(name), models.IntegerField):
+                delta = int(delta)
+            deltas[name] = deltas.get(name, 0) + delta
+
+    def _check(self, model, fields):
+        # fail while queueing, not half way through post()
+        for name in fields:
+            model._meta.get_field(name)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def post(self):
+        """Write everything queued and start over empty."""
+        by_model = OrderedDict()
+        for (model, pk), deltas in self.deltas.items():
+            by_model.setdefault(model, []).append((pk, deltas))
+        with transaction.atomic():
+            if self.rows:
+                WalletHistory.objects.bulk_create(self.rows, batch_size=500)
+                # bulk_create sends no post_save, fold the rows in here
+                rollups.add(self.rows)
+            for model, changes in by_model.items():
+                names = sorted({name for _, deltas in changes for name in deltas})
+                objs = []
+                for pk, deltas in changes:
+                    obj = model(pk=pk)
+                    for name in names:
+                        setattr(obj, name, F(name) + deltas.get(name, 0))
+                    objs.append(obj)
+                model.objects.bulk_update(objs, names, batch_size=500)
+        rows = self.rows
+        self.rows = []
+        self.deltas = OrderedDict()
+        return rows
+
+
+# share of a recharge amount paid to each sponsor level
+RECHARGE_LEVELS = [0.3/100, 0.25/100, 0.20/100, 0.15/100, 0.10/100, 0.10/100, 0.10/100, 0.10/100, 0.10/100, 0.10/100]
+
+
+def credit_recharge(posting, user, uplines, amount):
+    """Queue the level commissions and the cashback of a recharge.
+
+    ``uplines`` are the sponsor rows of ``user``, nearest first, with None for
+    a missing sponsor. Both are paid into the wallet balance, the same amount
+    as their history rows.
+    """
+    for level, (rate, upline) in enumerate(zip(RECHARGE_LEVELS, uplines), 1):
+        if upline is not None:
+            upline_amount = rate*amount*0.70
+            posting.credit(upline, upline_amount, "new recharge done by your level{} user".format(level),
+                           categories.RECHARGE_COMMISSION, wallet=upline_amount)
+    posting.credit(user, 0.02*amount*0.70, "Recharge cashback", categories.RECHARGE_CASHBACK,
+                   wallet=0.02*amount*0.70)
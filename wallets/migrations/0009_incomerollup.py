@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0008_auto_20211130_2100'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncomeRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=20)),
+                ('day', models.DateField()),
+                ('category', models.CharField(choices=[('recharge_cashback', 'Recharge cashback'), ('recharge', 'Recharge'), ('level_upgrade', 'Level upgrade'), ('level_commission', 'Level commission'), ('team_commission', 'Team commission'), ('matching', 'Matching income'), ('mt5_transfer', 'MT5 transfer'), ('dcxa_transfer', 'DCXa transfer'), ('royalty', 'Royalty'), ('roi', 'ROI'), ('shopping', 'Shopping income'), ('shopping_wallet', 'Shopping wallet'), ('franchise', 'Franchise'), ('task', 'Task'), ('withdrawal', 'Withdrawal'), ('fund', 'Fund'), ('other', 'Other')], default='other', max_length=32)),
+                ('amount', models.FloatField(default=0)),
+                ('income', models.FloatField(default=0)),
+                ('rows', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('user_id', 'day', 'category')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='incomerollup',
+            index=models.Index(fields=['user_id', 'category', 'day'], name='wallets_inc_user_id_3c1e7a_idx'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0009_incomerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incomerollup',
+            index=models.Index(fields=['category', 'day'], name='wallets_inc_categor_8d2b41_idx'),
+        ),
+    ]
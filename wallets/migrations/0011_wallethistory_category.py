@@ -0,0 +1,69 @@
+from django.db import migrations, models
+
+# wallets.categories.RULES as of this migration: (substring of the comment,
+# category), first match wins
+RULES = (
+    ('Shopping Income from', 'shopping'),
+    ('Shopping Self Earning', 'shopping'),
+    ('Shopping', 'shopping_wallet'),
+    ('Recharge cashback', 'recharge_cashback'),
+    ('new recharge done by', 'recharge_commission'),
+    ('spent on recharge', 'recharge'),
+    ('Reward Points debit', 'recharge'),
+    ('Prime Upgradation', 'level_upgrade'),
+    ('New Upgrade by', 'level_commission'),
+    ('not opened', 'level_missed'),
+    ('Team commission', 'team_commission'),
+    ('Team Commision', 'team_commission'),
+    ('Income from Level', 'team_commission'),
+    ('Matching Income', 'matching'),
+    ('MT5 Transfer', 'mt5_transfer'),
+    ('Sent to MT5', 'mt5_deposit'),
+    ('DCXa', 'dcxa_transfer'),
+    ('Royalty', 'royalty'),
+    ('ROI Income', 'roi'),
+    ('Franchise', 'franchise'),
+    ('task completed', 'task'),
+    ('Task Done', 'task'),
+    ('NEFT', 'withdrawal'),
+    ('Money added', 'fund'),
+)
+
+
+def categorise(apps, schema_editor):
+    """Classify the existing rows from their comment, one UPDATE per rule in
+    rule order so the first matching rule wins."""
+    WalletHistory = apps.get_model('wallets', 'WalletHistory')
+    for text, category in RULES:
+        WalletHistory.objects.filter(category='', comment__icontains=text).update(category=category)
+    WalletHistory.objects.filter(category='').update(category='other')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0010_incomerollup_category_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallethistory',
+            name='category',
+            field=models.CharField(blank=True, choices=[('recharge_cashback', 'Recharge cashback'), ('recharge', 'Recharge'), ('level_upgrade', 'Level upgrade'), ('level_commission', 'Level commission'), ('level_missed', 'Level not opened'), ('recharge_commission', 'Recharge commission'), ('team_commission', 'Team commission'), ('matching', 'Matching income'), ('mt5_transfer', 'MT5 transfer'), ('mt5_deposit', 'Sent to MT5'), ('dcxa_transfer', 'DCXa transfer'), ('royalty', 'Royalty'), ('roi', 'ROI'), ('shopping', 'Shopping income'), ('shopping_wallet', 'Shopping wallet'), ('franchise', 'Franchise'), ('task', 'Task'), ('withdrawal', 'Withdrawal'), ('fund', 'Fund'), ('other', 'Other')], default='', max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='incomerollup',
+            name='category',
+            field=models.CharField(choices=[('recharge_cashback', 'Recharge cashback'), ('recharge', 'Recharge'), ('level_upgrade', 'Level upgrade'), ('level_commission', 'Level commission'), ('level_missed', 'Level not opened'), ('recharge_commission', 'Recharge commission'), ('team_commission', 'Team commission'), ('matching', 'Matching income'), ('mt5_transfer', 'MT5 transfer'), ('mt5_deposit', 'Sent to MT5'), ('dcxa_transfer', 'DCXa transfer'), ('royalty', 'Royalty'), ('roi', 'ROI'), ('shopping', 'Shopping income'), ('shopping_wallet', 'Shopping wallet'), ('franchise', 'Franchise'), ('task', 'Task'), ('withdrawal', 'Withdrawal'), ('fund', 'Fund'), ('other', 'Other')], default='other', max_length=32),
+        ),
+        # before the indexes, so the backfill does not have to maintain them
+        migrations.RunPython(categorise, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='wallethistory',
+            index=models.Index(fields=['user_id', 'category', 'created_at'], name='wallets_wal_user_id_6f0b2d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallethistory',
+            index=models.Index(fields=['category', 'created_at'], name='wallets_wal_categor_a4e913_idx'),
+        ),
+    ]
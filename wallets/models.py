@@ -2,6 +2,8 @@ from django.db import models
 from datetime import datetime
 from django.utils import timezone
 from django.utils.html import mark_safe
+
+from . import categories
  
 # Create your models here.
 class Beneficiary(models.Model):
@@ -37,6 +39,39 @@ class WalletHistory(models.Model):
     updated_at = models.DateTimeField(default=timezone.now, blank=True)
     filter = models.CharField(max_length=255)
     txnid = models.CharField(max_length=12, blank=True, null=True)
+    category = models.CharField(max_length=32, choices=categories.CHOICES, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'category', 'created_at'], name='wallets_wal_user_id_6f0b2d_idx'),
+            models.Index(fields=['category', 'created_at'], name='wallets_wal_categor_a4e913_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.category:
+            self.category = categories.classify(self.comment)
+        super().save(*args, **kwargs)
+
+
+class IncomeRollup(models.Model):
+    """WalletHistory amounts summed per user, day and category.
+
+    ``amount`` sums every row, ``income`` only the credit/income ones. Kept
+    up to date by ``wallets.rollups`` as history rows are written.
+    """
+    user_id = models.CharField(max_length=20)
+    day = models.DateField()
+    category = models.CharField(max_length=32, choices=categories.CHOICES, default=categories.OTHER)
+    amount = models.FloatField(default=0)
+    income = models.FloatField(default=0)
+    rows = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user_id', 'day', 'category')
+        indexes = [
+            models.Index(fields=['user_id', 'category', 'day'], name='wallets_inc_user_id_3c1e7a_idx'),
+            models.Index(fields=['category', 'day'], name='wallets_inc_categor_8d2b41_idx'),
+        ]
 
 class AddFund(models.Model):
     postBackParamId  = models.CharField(max_length=200, null=True, blank=True)
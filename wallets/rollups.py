@@ -0,0 +1,153 @@
+import datetime
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from users.identity import chunked
+
+from . import categories
+from .models import IncomeRollup, WalletHistory
+
+
+def day_of(when):
+    if when is None:
+        when = timezone.now()
+    if timezone.is_aware(when):
+        when = timezone.localtime(when)
+    return when.date()
+
+
+def category_of(row):
+    return row.category or categories.classify(row.comment)
+
+
+def totals(rows, sign=1):
+    """``{(user_id, day, category): [amount, income, rows]}`` for ``rows``."""
+    sums = OrderedDict()
+    for row in rows:
+        key = (str(row.user_id), day_of(row.created_at), category_of(row))
+        amount = float(row.amount or 0) * sign
+        entry = sums.setdefault(key, [0, 0, 0])
+        entry[0] += amount
+        if categories.is_income(row.type):
+            entry[1] += amount
+        entry[2] += sign
+    return sums
+
+
+def _apply(key, amount, income, count):
+    user_id, day, category = key
+    current = IncomeRollup.objects.filter(user_id=user_id, day=day, category=category)
+    changes = dict(amount=F('amount') + amount, income=F('income') + income, rows=F('rows') + count)
+    if current.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            IncomeRollup.objects.create(
+                user_id=user_id, day=day, category=category, amount=amount, income=income, rows=count)
+    except IntegrityError:
+        # another writer created the row in between
+        current.update(**changes)
+
+
+def _apply_many(sums):
+    """``_apply()`` for many keys, with a few queries per day and category."""
+    groups = OrderedDict()
+    for (user_id, day, category), values in sums.items():
+        groups.setdefault((day, category), OrderedDict())[user_id] = values
+    for (day, category), by_user in groups.items():
+        for chunk in chunked(by_user):
+            existing = dict(IncomeRollup.objects.filter(day=day, category=category, user_id__in=chunk)
+                            .values_list('user_id', 'pk'))
+            changed = []
+            for user_id, pk in existing.items():
+                amount, income, count = by_user[user_id]
+                changed.append(IncomeRollup(
+                    pk=pk, amount=F('amount') + amount, income=F('income') + income, rows=F('rows') + count))
+            if changed:
+                IncomeRollup.objects.bulk_update(changed, ['amount', 'income', 'rows'])
+            new = [(user_id, by_user[user_id]) for user_id in chunk if user_id not in existing]
+            try:
+                with transaction.atomic():
+                    IncomeRollup.objects.bulk_create([
+                        IncomeRollup(user_id=user_id, day=day, category=category,
+                                     amount=amount, income=income, rows=count)
+                        for user_id, (amount, income, count) in new
+                    ])
+            except IntegrityError:
+                for user_id, values in new:
+                    _apply((user_id, day, category), *values)
+
+
+def _fold(sums):
+    if len(sums) == 1:
+        for key, values in sums.items():
+            _apply(key, *values)
+    elif sums:
+        _apply_many(sums)
+
+
+def add(rows):
+    """Fold newly written history ``rows`` into the rollups."""
+    _fold(totals(rows))
+
+
+def remove(rows):
+    _fold(totals(rows, sign=-1))
+
+
+def start_of(day):
+    start = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def first_day_rows(since):
+    """History rows from ``since`` to the end of its day, the part of a
+    window that starts in the middle of a rollup day."""
+    end = start_of(day_of(since) + datetime.timedelta(days=1))
+    return WalletHistory.objects.filter(created_at__gte=since, created_at__lt=end)
+
+
+def income(user, since, category=None, field='income'):
+    """Sum of ``field`` for ``user`` from ``since`` on.
+
+    Whole days come from the rollups; the rows of the first, partial day are
+    summed from WalletHistory on its (user_id, category, created_at) index so
+    the window starts exactly at ``since``.
+    """
+    rollups = IncomeRollup.objects.filter(user_id=str(user), day__gt=day_of(since))
+    rows = first_day_rows(since).filter(user_id=str(user))
+    if category is not None:
+        rollups = rollups.filter(category=category)
+        rows = rows.filter(category=category)
+    if field == 'income':
+        rows = rows.filter(Q(type__contains='credit') | Q(type__contains='income'))
+    total = rollups.aggregate(total=Sum(field))['total'] or 0
+    return total + (rows.aggregate(total=Sum('amount'))['total'] or 0)
+
+
+@transaction.atomic
+def rebuild(chunk_size=5000):
+    """Recompute every rollup from WalletHistory, reading it in id order."""
+    IncomeRollup.objects.all().delete()
+    sums = OrderedDict()
+    last = 0
+    while True:
+        chunk = list(WalletHistory.objects.filter(pk__gt=last).order_by('pk')
+                     .only('pk', 'user_id', 'amount', 'type', 'comment', 'category', 'created_at')[:chunk_size])
+        if not chunk:
+            break
+        for key, values in totals(chunk).items():
+            entry = sums.setdefault(key, [0, 0, 0])
+            for i, value in enumerate(values):
+                entry[i] += value
+        last = chunk[-1].pk
+    IncomeRollup.objects.bulk_create(
+        (IncomeRollup(user_id=user_id, day=day, category=category, amount=amount, income=income, rows=count)
+         for (user_id, day, category), (amount, income, count) in sums.items()),
+        batch_size=500,
+    )
+    return len(sums)
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import rollups
+from .models import WalletHistory
+
+
+@receiver(post_save, sender=WalletHistory)
+def add_to_rollups(sender, instance, created, **kwargs):
+    if created:
+        rollups.add([instance])
+
+
+@receiver(post_delete, sender=WalletHistory)
+def remove_from_rollups(sender, instance, **kwargs):
+    rollups.remove([instance])
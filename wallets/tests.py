@@ -1,3 +1,30 @@
 from django.test import TestCase
 
-# Create your tests here.
+from users.models import User
+from users.uplines import UplineResolver
+from . import categories
+from .commission import Posting, credit_recharge
+from .models import WalletHistory
+
+
+class RechargePostingTest(TestCase):
+    def test_credits_uplines_and_cashback_to_wallet(self):
+        User.objects.create(username='sponsor2', wallet=0)
+        User.objects.create(username='sponsor1', referral='sponsor2', wallet=0)
+        user = User.objects.create(username='buyer', referral='sponsor1', wallet=0)
+
+        posting = Posting()
+        credit_recharge(posting, user, UplineResolver().uplines(user, 10), 1000)
+        posting.post()
+
+        # the integer wallet gets whole units, the history rows the exact amounts
+        self.assertEqual(User.objects.get(username='sponsor1').wallet, 2)
+        self.assertEqual(User.objects.get(username='sponsor2').wallet, 1)
+        self.assertEqual(User.objects.get(username='buyer').wallet, 14)
+        rows = WalletHistory.objects.order_by('id')
+        self.assertEqual([row.user_id for row in rows], ['sponsor1', 'sponsor2', 'buyer'])
+        self.assertEqual([row.category for row in rows], [categories.RECHARGE_COMMISSION,
+                                                         categories.RECHARGE_COMMISSION,
+                                                         categories.RECHARGE_CASHBACK])
+        self.assertEqual(rows[1].comment, 'new recharge done by your level2 user')
+        self.assertAlmostEqual(rows[0].amount, 0.3/100*1000*0.70)
@@ -6,6 +6,9 @@ from django.urls import reverse
 from django.views.generic import DetailView, ListView, RedirectView, UpdateView, FormView, CreateView
 from django.shortcuts import render, redirect
 from users.models import User
+from users.uplines import resolver_for
+from . import categories, rollups
+from .commission import Posting, credit_recharge
 from .models import PaymentOption, Withdrawal
 from wallets.models import WalletHistory, Beneficiary, MetatraderAccount, Mtw
 from django.shortcuts import render
@@ -355,6 +358,7 @@ def recharge(request):
                     userwallet.amount = float(amount - amount/100)  
                     userwallet.type = "debit"   
                     userwallet.comment = "spent on recharge"    
+                    userwallet.category = categories.RECHARGE
 
                     amount = float(request.POST.get('amount'))  
                     userspend = WalletHistory()   
@@ -362,6 +366,7 @@ def recharge(request):
                     userspend.amount = amount/100   
                     userspend.type = "debit"    
                     userspend.comment = "Reward Points debit"   
+                    userspend.category = categories.RECHARGE
 
                     amount = float(request.POST.get('amount'))  
                     model = Recharges() 
@@ -376,66 +381,12 @@ def recharge(request):
 
                     userid = request.user   
 
-                    def finduplines(user):  
-                        try:    
-                            user = User.objects.get(username__iexact=str(user)) 
-                            upline = user.referal   
-                        except User.DoesNotExist:   
-                            upline = 'blank'    
-                        return upline   
-
-                    levels = {  
-                    'level1': 0.3/100,  
-                    'level2': 0.25/100, 
-                    'level3': 0.20/100, 
-                    'level4': 0.15/100, 
-                    'level5': 0.10/100, 
-                    'level6': 0.10/100, 
-                    'level7': 0.10/100, 
-                    'level8': 0.10/100, 
-                    'level9': 0.10/100, 
-                    'level10': 0.10/100,    
-                    }   
-
-                    level = 0   
-                    upline_user = userid.referal    
-                    userid = request.user   
                     amount = float(request.POST.get('amount'))  
-                    uplines = [upline_user, ]
-                    while level < 9 and upline_user != 'blank':
-                        upline_user = finduplines(str(upline_user))
-                        uplines.append(upline_user)
-                        level += 1
-
-                    level = 1
-                    for upline in uplines:
-                        try:
-                            upline_user = User.objects.get(username=upline) 
-                        except Exception as e:  
-                            upline_user = 'blank'   
-                        if upline_user != 'blank':  
-                            upline_amount = levels['level{}'.format(level)]*amount*0.70 
-                            upline_user.income += upline_amount*0.9 
-                            upline_user.total_income  += upline_amount  
-                            upline_wallet = WalletHistory()   
-                            upline_wallet.user_id = upline  
-                            upline_wallet.amount = upline_amount    
-                            upline_wallet.type = "credit"   
-                            upline_wallet.comment = "new recharge done by your level{} user".format(level)  
-                            upline_user.save()  
-                            upline_wallet.save()    
-                        level = level + 1   
-                    userid.income += 0.02*amount*0.9*0.70   
-                    userid.total_income  += 0.02*amount*0.70    
-                    usewallet = WalletHistory()   
-                    usewallet.user_id = str(userid) 
-                    usewallet.amount = 0.02*amount*0.70 
-                    usewallet.type = "credit"   
-                    usewallet.comment = "Recharge cashback" 
-                    userid.save()   
-                    usewallet.save()    
-                    userspend.save()    
-                    userwallet.save()   
+                    posting = Posting()
+                    credit_recharge(posting, userid, resolver_for(request).uplines(userid, 10), amount)
+                    posting.add(userspend)
+                    posting.add(userwallet)
+                    posting.post()
                     message = "Recharge Succesful on mobile {} with txn id {} and amount {}".format(mobile, txnid, amount)  
                 else:   
                     message = 'Operator Down, Please try again after some time!'
@@ -585,6 +536,7 @@ def neft(request):
                             userwallet.type = "debit"
                             userwallet.filter = "MT5"
                             userwallet.comment = "MT5 Transfer"
+                            userwallet.category = categories.MT5_TRANSFER
 
                             userwallet.save()
                             user_id.save()
@@ -717,33 +669,15 @@ def history(request):
     except(EmptyPage, InvalidPage):
         histories = paginator.page(1)
 
-    wstart_date = datetime.datetime.now() + datetime.timedelta(-1)
-    wend_date = datetime.datetime.now()
-    dstart_date = datetime.datetime.now() + datetime.timedelta(-600)
-    dend_date = datetime.datetime.now()
-    mstart_date = datetime.datetime.now() + datetime.timedelta(-30)
-    mend_date = datetime.datetime.now()
-    mwhs = WalletHistory.objects.filter(created_at__range=(mstart_date, mend_date), user_id=str(user))
-    wwhs = WalletHistory.objects.filter(created_at__range=(wstart_date, wend_date), user_id=str(user))
-    dwhs = WalletHistory.objects.filter(created_at__range=(dstart_date, dend_date), user_id=str(user))
-    dincome = 0
-    wincome = 0
-    mincome = 0
+    now = timezone.now()
     try:
         fake = FakeHistory.objects.get(user=user)
     except Exception as e:
         fake = 'blank'
     if fake == 'blank':
-        for wh in wwhs:
-            if 'Shopping Income from' in wh.comment or 'Shopping Self Earning' in wh.comment:
-                wincome += wh.amount
-        for wh in dwhs:
-            if wh.type != None:
-                if 'credit' in wh.type or 'income' in wh.type:
-                    dincome += wh.amount
-        for wh in mwhs:
-            if 'Shopping Income from' in wh.comment or 'Shopping Self Earning' in wh.comment:
-                mincome += wh.amount
+        wincome = rollups.income(user, now - datetime.timedelta(days=1), categories.SHOPPING, field='amount')
+        dincome = rollups.income(user, now - datetime.timedelta(days=600))
+        mincome = rollups.income(user, now - datetime.timedelta(days=30), categories.SHOPPING, field='amount')
     else:
         dincome = fake.total
         mincome = fake.month
@@ -990,6 +924,7 @@ def mt5t(request):
         wallet.user_id = user.username
         wallet.amount = amount
         wallet.comment = "Sent to MT5"
+        wallet.category = categories.MT5_DEPOSIT
         wallet.type = 'debit'
         wallet.save()
         user.save()